@@ -0,0 +1,47 @@
+import libcst as cst
+from libcst.metadata import PositionProvider
+
+
+class EvalFixer(cst.CSTTransformer):
+
+    """
+    Заменяет вызовы eval(...) на ast.literal_eval(...)
+    """
+
+    METADATA_DEPENDENCIES = (PositionProvider,)
+    span_edit_imports = ('ast',)
+
+    def __init__(self, eval_calls):
+        super().__init__()
+        self.eval_calls_map = {call['lineno']: call for call in eval_calls} # Сохраняем все вызовы eval, чтобы затем изменить их
+        self.required_imports = set()   # Модули, которые нужно импортировать после фикса
+
+    def leave_Call(self, original_node, updated_node):
+
+        """
+        Заменяем вызов eval() на ast.literal_eval()
+        """
+
+        position = self.get_metadata(PositionProvider, original_node)
+        if not position:
+            return updated_node
+
+        line_number = position.start.line
+        if line_number in self.eval_calls_map:
+            if isinstance(original_node.func, cst.Name) and original_node.func.value == 'eval': # Заменяем eval на ast.literal_eval
+                new_func = cst.Attribute(    # Меняем имя функции на ast.literal_eval
+                    value=cst.Name("ast"),
+                    attr=cst.Name("literal_eval")
+                )
+                self.required_imports.add("ast")
+                return updated_node.with_changes(func=new_func) # Возвращаем обновленный вызов
+
+        return updated_node
+
+    @staticmethod
+    def span_edits(call):
+        """
+        Точечная правка без LibCST: имя eval по координатам из ast
+        заменяем на ast.literal_eval.
+        """
+        return [(call['func_span'], 'ast.literal_eval')]
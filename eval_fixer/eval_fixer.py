@@ -1,158 +1,156 @@
 import ast
-import os
-import argparse
-import libcst as cst
-from libcst.metadata import MetadataWrapper, PositionProvider
 
-class EvalVisitor(ast.NodeVisitor):
+from fixer_core.pipeline import iter_scan
+from fixer_core.records import Record
+from fixer_core.rules import Rule
 
+
+def __getattr__(name):
+    # EvalFixer переехал в cst_fixer (тянет libcst) - отдаём его лениво
+    if name == 'EvalFixer':
+        from eval_fixer.cst_fixer import EvalFixer
+        return EvalFixer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class EvalCall(Record):
     """
-    Анализируем AST для поиска вызовов eval(...)
+    Найденный вызов eval(...). Вместо узлов ast аргументов храним их координаты
+    (args_span); текст аргументов (args) берётся из исходника при первом выводе.
     """
-    
-    def __init__(self, filename):
-        self.filename = filename
-        self.eval_calls = []
 
-    def visit_Call(self, node):
-        if isinstance(node.func, ast.Name) and node.func.id == 'eval':
-            self.eval_calls.append( # Добавляем вызовы eval в список
-                {
-                'file': self.filename,
-                'lineno': node.lineno,
-                'args': node.args  # Сохраняем аргументы eval
-            })
-        self.generic_visit(node)
+    fields = ('file', 'lineno', 'args', 'args_span', 'func_span', 'stmt', 'top_imports', 'import_line')
+    __slots__ = fields
 
 
-class EvalFixer(cst.CSTTransformer):
+class EvalVisitor(Rule):
 
     """
-    Заменяет вызовы eval(...) на ast.literal_eval(...)
+    Анализируем AST для поиска вызовов eval(...)
+    Вместе с вызовом сохраняем строки инструкции верхнего уровня (stmt)
+    и сведения об импортах модуля (из контекста обхода) - их использует точечный фикс.
     """
+    
+    def __init__(self, filename, context=None):
+        super().__init__(filename, context)
+        self.eval_calls = []
 
-    METADATA_DEPENDENCIES = (PositionProvider,)
-
-    def __init__(self, eval_calls):
-        self.eval_calls_map = {call['lineno']: call for call in eval_calls} # Сохраняем все вызовы eval, чтобы затем изменить их
-
-    def leave_Call(self, original_node, updated_node):
+    @staticmethod
+    def to_record(call):
+        """
+        JSON-совместимое представление находки (для --format jsonl/json/sarif).
+        """
+        return {'file': call['file'], 'lineno': call['lineno'], 'args': format_eval_args(call)}
 
+    @staticmethod
+    def describe(call):
         """
-        Заменяем вызов eval() на ast.literal_eval()
+        Одна строка о находке для отчётов (message в SARIF).
         """
+        return f"eval({format_eval_args(call)}) executes arbitrary code; use ast.literal_eval()"
 
-        position = self.get_metadata(PositionProvider, original_node)
-        if not position:
-            return updated_node
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == 'eval':
+            args_span = None
+            if node.args:
+                args_span = (node.args[0].lineno, node.args[0].col_offset,
+                             node.args[-1].end_lineno, node.args[-1].end_col_offset)
+            self.eval_calls.append( # Добавляем вызовы eval в список
+                EvalCall(
+                file=self.filename,
+                lineno=node.lineno,
+                args_span=args_span,  # Координаты аргументов eval (сами узлы не храним)
+                func_span=(node.func.lineno, node.func.col_offset,
+                           node.func.end_lineno, node.func.end_col_offset),
+                stmt=self.context.current_stmt,
+                top_imports=self.context.top_imports,
+                import_line=self.context.import_line,
+            ))
 
-        line_number = position.start.line
-        if line_number in self.eval_calls_map:
-            if isinstance(original_node.func, cst.Name) and original_node.func.value == 'eval': # Заменяем eval на ast.literal_eval
-                new_func = cst.Attribute(    # Меняем имя функции на ast.literal_eval
-                    value=cst.Name("ast"),
-                    attr=cst.Name("literal_eval")
-                )
-                return updated_node.with_changes(func=new_func) # Возвращаем обновленный вызов
 
-        return updated_node
+def format_eval_args(call):
+
+    """
+    Исходный текст аргументов eval(...) для отчёта - отрезок исходника
+    по args_span из буфера находки (файл не перечитывается). Текст запоминается
+    в находке: после этого буфер ей для вывода не нужен.
+    """
+
+    if call['args'] is None:
+        call['args'] = call['source'].segment(call['args_span']) if call['args_span'] else ''
+    return call['args']
 
 
-class InsertImportTransformer(cst.CSTTransformer):
+def iter_eval_calls(path, **scan_options):
 
     """
-    Добавляет импорт ast, если его нет в коде.
+    Генератор: отдаём вызовы eval() по мере того, как обработан очередной файл.
+    Опции scan_options (jobs, cache, files, line_filter, ...) - см. fixer_core.pipeline.iter_scan.
     """
-    
-    def __init__(self, module_name: str):
-        self.module_name = module_name
-        self.import_inserted = False
 
-    def leave_Module(self, original_node, updated_node):
-        if not self.import_inserted:
-            
-            import_node = cst.SimpleStatementLine( # Добавляем импорт в начало файла
-                body=[cst.Import(names=[cst.ImportAlias(name=cst.Name(self.module_name))])]
-            )
-            new_body = [import_node] + list(updated_node.body)
-            self.import_inserted = True
-            return updated_node.with_changes(body=new_body)
-        return updated_node
+    for _, results in iter_scan(path, ('eval',), **scan_options):
+        yield from results['eval']
 
 
-def analyze_eval_calls(path):
+def analyze_eval_calls(path, **scan_options):
 
     """
     Рекурсивно обходим каталог, ищем все вызовы eval() и собираем информацию.
     """
 
-    eval_calls = []
-    for root, _, files in os.walk(path):
-        for filename in files:
-            if filename.endswith('.py'):
-                fullpath = os.path.join(root, filename)
-                with open(fullpath, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                try:
-                    tree = ast.parse(code, filename=fullpath)
-                    visitor = EvalVisitor(fullpath)
-                    visitor.visit(tree)
-                    eval_calls.extend(visitor.eval_calls) # Собираем вызовы eval
-                except SyntaxError as e:
-                    print(f"[SYNTAX ERROR] {fullpath}: {e}")
-    return eval_calls
-
-
-def fix_eval_calls(eval_calls):
+    return list(iter_eval_calls(path, **scan_options))
+
+
+def fix_eval_calls(eval_calls, jobs=1, **fix_options):
 
     """
     Исправляем все вызовы eval() на ast.literal_eval()
+    (импорт ast добавляется, только если его ещё нет; при jobs > 1 - в пуле процессов).
+    eval_calls - список находок или FindingSpool; fix_options - см. apply_fixes.
     """
 
-    from collections import defaultdict
-    eval_calls_by_file = defaultdict(list)
-    for call in eval_calls:
-        eval_calls_by_file[call['file']].append(call)
-
-    for file, calls in eval_calls_by_file.items():
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-            cst_tree = cst.parse_module(source_code)
-            
-            wrapper = MetadataWrapper(cst_tree) # Применяем фикс для eval() вызовов
-            fixer = EvalFixer(calls)
-            new_tree = wrapper.visit(fixer)
-            
-            new_tree = new_tree.visit(InsertImportTransformer("ast"))   # Добавляем импорт ast, если его нет
-
-            new_filename = f"secure_{os.path.basename(file)}"   # Пишем в новый файл
-            secure_path = os.path.join(os.path.dirname(file), new_filename)
-            with open(secure_path, 'w', encoding='utf-8') as f_out:
-                f_out.write(new_tree.code)
-            print(f"[FIXED] Corrected file created: {secure_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to process {file}: {e}")
+    # LibCST и движок фиксов грузим только здесь: анализ без --fix их не импортирует
+    from fixer_core.fix_engine import apply_fixes
+
+    apply_fixes(eval_calls if hasattr(eval_calls, 'by_file') else {'eval': eval_calls}, jobs=jobs, **fix_options)
 
 
 def main():
+    # CLI, отчёты и spool нужны только точке входа: модуль детектора грузят и воркеры
+    import argparse
+
+    from fixer_core.cli import add_scan_arguments, redirect_output_for, scan_options_from_args
+    from fixer_core.output import emit_report
+    from fixer_core.spool import FindingSpool, spooled_findings
+
     parser = argparse.ArgumentParser(description='Autofix eval() usage (simplified example).')
     parser.add_argument('path', help='Path to the directory with Python files')
     parser.add_argument('--fix', action='store_true', help='Automatically fix eval vulnerabilities')
+    add_scan_arguments(parser)
     args = parser.parse_args()
 
-    # Шаг 1. Сбор всех вызовов eval
-    eval_calls = analyze_eval_calls(args.path)
-    if eval_calls:
-        print("[!] eval calls found:")
-        for call in eval_calls:
-            print(f" - {call['file']} (line {call['lineno']}): eval({call['args']})")
-
-        # Шаг 2. При необходимости делаем фиксы
-        if args.fix:
-            fix_eval_calls(eval_calls)
-    else:
-        print("No eval calls found.")
+    # Шаг 1. Сбор всех вызовов eval (печатаем по мере нахождения;
+    # находки - и буферы с исходниками - откладываем только для --fix,
+    # при --max-memory - с выгрузкой на диск)
+    found = 0
+    with scan_options_from_args(args) as scan_options, FindingSpool.for_budget(args.max_memory) as spool:
+        results = iter_scan(args.path, ('eval',), **scan_options)
+        if args.format != 'text':
+            emit_report(results, args.format, ('eval',), spool=spool if args.fix else None)
+        else:
+            for call in spooled_findings(results, 'eval', spool if args.fix else None):
+                if not found:
+                    print("[!] eval calls found:")
+                found += 1
+                print(f" - {call['file']} (line {call['lineno']}): eval({format_eval_args(call)})")
+
+        if len(spool):
+            # Шаг 2. При необходимости делаем фиксы (внутри блока - чтобы попасть в --timings)
+            with redirect_output_for(args.format):
+                fix_eval_calls(spool, jobs=args.jobs, max_tasks_per_child=scan_options.get('max_tasks_per_child'),
+                               max_memory=args.max_memory)
+        elif not found and args.format == 'text':
+            print("No eval calls found.")
 
 
 if __name__ == '__main__':
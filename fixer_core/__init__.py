@@ -0,0 +1,4 @@
+"""
+Package: fixer_core
+Description: Shared scan infrastructure used by all detectors (sql, eval).
+"""
@@ -0,0 +1,408 @@
+"""
+Бенчмарк анализа и исправлений.
+
+    python -m fixer_core.bench synthetic --files 2000 --sql-density 0.3 --eval-density 0.1
+    python -m fixer_core.bench real [--corpus <каталог>]
+    python -m fixer_core.bench synthetic --output new.json --baseline old.json
+    python -m fixer_core.bench startup [--budget-ms 80]
+
+synthetic - корпус генерируется (детерминированно, по --seed) во временном каталоге,
+real      - копия офлайн-корпуса реального кода (по умолчанию site-packages из .venv).
+startup   - холодный старт CLI на маленьком корпусе (python -X importtime): время
+            импортов против бюджета; анализ без --fix не должен грузить libcst и фиксеры.
+Анализ и исправления замеряются раздельно, каждый в отдельном процессе,
+чтобы пик RSS одной фазы не влиял на другую.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fixer_core.pipeline import iter_python_files, resolve_jobs, scan
+
+BENCH_FORMAT = 1
+
+# Доля падения пропускной способности, после которой --baseline сообщает о регрессии
+REGRESSION_THRESHOLD = 0.10
+
+# Бюджет на импорты при запуске анализа без --fix, мс (startup)
+STARTUP_BUDGET_MS = 80
+# Модули, которые анализ без --fix загружать не должен
+ANALYSIS_FORBIDDEN_MODULES = (
+    'libcst',
+    'fixer_core.fix_engine',
+    'sql_injection_fixer_v2.cst_fixer',
+    'eval_fixer.cst_fixer',
+)
+_STARTUP_SNIPPET = "import sys, main; sys.argv[0] = 'autofixer'; main.main()"
+
+_FILLER_TEMPLATES = (
+    "def helper_{n}(items):\n"
+    "    total = 0\n"
+    "    for item in items:\n"
+    "        total += item * {n}\n"
+    "    return total\n",
+    "class Model{n}:\n"
+    "    def __init__(self, value):\n"
+    "        self.value = value\n"
+    "\n"
+    "    def describe(self):\n"
+    "        return 'model {n}: ' + repr(self.value)\n",
+    "def load_{n}(path):\n"
+    "    with open(path) as f:\n"
+    "        data = {{'id': {n}, 'lines': f.readlines()}}\n"
+    "    return data\n",
+)
+
+_SQL_TEMPLATES = (
+    "def get_user_{n}(cursor, user_id):\n"
+    "    query = \"SELECT * FROM users WHERE id = \" + str(user_id)\n"
+    "    cursor.execute(query)\n"
+    "    return cursor.fetchall()\n",
+    "def find_order_{n}(cursor, order_id):\n"
+    "    sql = f\"SELECT * FROM orders WHERE id = {{order_id}}\"\n"
+    "    cursor.execute(sql)\n"
+    "    return cursor.fetchone()\n",
+)
+
+_EVAL_TEMPLATE = (
+    "def parse_config_{n}(raw):\n"
+    "    return eval(raw)\n"
+)
+
+
+def _default_real_corpus():
+    """
+    Ищем site-packages вендоренного виртуального окружения (.venv) рядом с проектом.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for base in (os.getcwd(), project_root, os.path.join(project_root, 'autofixer')):
+        found = sorted(glob.glob(os.path.join(base, '.venv', 'lib', 'python*', 'site-packages')))
+        if found:
+            return found[0]
+    return None
+
+
+def generate_corpus(dest, files=1000, blocks=20, sql_density=0.2, eval_density=0.1, seed=0):
+    """
+    Генерируем files модулей по blocks блоков (функций/классов) в каталоге dest.
+    sql_density / eval_density - вероятность того, что блок окажется уязвимым
+    (конкатенация или f-строка в SQL-запросе / вызов eval).
+    Возвращаем число сгенерированных уязвимостей по детекторам.
+    """
+    rng = random.Random(seed)
+    expected = {'sql': 0, 'eval': 0}
+    for index in range(files):
+        package = os.path.join(dest, f'pkg{index // 100}')
+        os.makedirs(package, exist_ok=True)
+        parts = ['"""Synthetic benchmark module."""\nimport os\n\n']
+        for n in range(blocks):
+            roll = rng.random()
+            if roll < sql_density:
+                template = rng.choice(_SQL_TEMPLATES)
+                expected['sql'] += 1
+            elif roll < sql_density + eval_density:
+                template = _EVAL_TEMPLATE
+                expected['eval'] += 1
+            else:
+                template = rng.choice(_FILLER_TEMPLATES)
+            parts.append(template.format(n=n) + '\n\n')
+        with open(os.path.join(package, f'module{index}.py'), 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+    return expected
+
+
+def copy_corpus(source, dest):
+    """
+    Копируем только .py-файлы: исправления пишут secure_<имя> рядом с исходником,
+    исходный корпус при этом не трогаем.
+    """
+    count = 0
+    for fullpath in iter_python_files(source):
+        target = os.path.join(dest, os.path.relpath(fullpath, source))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(fullpath, target)
+        count += 1
+    return count
+
+
+def _peak_rss_mib():
+    # ru_maxrss: килобайты в Linux, байты в macOS; учитываем и воркеры (RUSAGE_CHILDREN)
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale / (1024 * 1024)
+
+
+def _measure_analyze(path, detectors, jobs):
+    with open(os.devnull, 'w') as devnull:
+        started = time.perf_counter()
+        findings = scan(path, detectors, jobs=jobs, error_stream=devnull)
+        seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'peak_rss_mib': _peak_rss_mib()}, findings
+
+
+def _measure_fix(findings, jobs):
+    from fixer_core.fix_engine import apply_fixes
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        apply_fixes(findings, jobs=jobs)
+        seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'peak_rss_mib': _peak_rss_mib()}
+
+
+def _in_fresh_process(func, *args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(func, *args).result()
+
+
+def _throughput(phase, files, size, found):
+    seconds = phase['seconds'] or 1e-9
+    phase['files_per_sec'] = round(files / seconds, 2)
+    phase['mb_per_sec'] = round(size / (1024 * 1024) / seconds, 3)
+    phase['findings_per_sec'] = round(found / seconds, 2)
+    phase['seconds'] = round(phase['seconds'], 4)
+    phase['peak_rss_mib'] = round(phase['peak_rss_mib'], 1)
+    return phase
+
+
+def run_benchmark(path, detectors=('sql', 'eval'), jobs=1, fix=True):
+    """
+    Замеряем анализ (и, если fix, исправления) корпуса в каталоге path.
+    Возвращаем словарь с files/sec, MB/sec, findings/sec и пиком RSS по фазам.
+    """
+    files = list(iter_python_files(path))
+    size = sum(os.path.getsize(fullpath) for fullpath in files)
+    analyze, findings = _in_fresh_process(_measure_analyze, path, tuple(detectors), jobs)
+    found = sum(len(items) for items in findings.values())
+    result = {
+        'files': len(files),
+        'bytes': size,
+        'findings': {name: len(items) for name, items in findings.items()},
+        'analyze': _throughput(analyze, len(files), size, found),
+    }
+    if fix:
+        fixed_files = {finding['file'] for items in findings.values() for finding in items}
+        fixed_size = sum(os.path.getsize(fullpath) for fullpath in fixed_files)
+        result['fix'] = _throughput(_in_fresh_process(_measure_fix, findings, jobs),
+                                    len(fixed_files), fixed_size, found)
+    return result
+
+
+def parse_importtime(stderr):
+    """
+    Разбираем вывод -X importtime: {модуль: (self, cumulative, глубина)} в микросекундах
+    и суммарное время импортов (сумма cumulative модулей верхнего уровня).
+    """
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        name = name.strip()
+        modules[name] = (int(self_us), int(cumulative_us), depth)
+        if depth == 0:
+            total += int(cumulative_us)
+    return modules, total
+
+
+def measure_startup(corpus, extra_args=(), runs=5):
+    """
+    Запускаем CLI в новом интерпретаторе runs раз: медианы wall-времени
+    и времени импортов, список загруженных модулей и самые тяжёлые импорты.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, AUTOFIXER_NO_DAEMON='1',
+               PYTHONPATH=os.pathsep.join(filter(None, (project_root, os.environ.get('PYTHONPATH')))))
+    command = [sys.executable, '-X', 'importtime', '-c', _STARTUP_SNIPPET,
+               'all', corpus, '--no-cache', *extra_args]
+    walls, imports = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            sys.exit(f"[ERROR] startup run failed:\n{proc.stderr[-2000:]}")
+        modules, total = parse_importtime(proc.stderr)
+        imports.append(total / 1000)
+    heaviest = sorted(((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth == 0),
+                      reverse=True)[:10]
+    return {
+        'wall_ms': round(statistics.median(walls), 1),
+        'import_ms': round(statistics.median(imports), 1),
+        'heaviest_imports_ms': {name: round(cumulative / 1000, 1) for cumulative, name in heaviest},
+        'modules': sorted(modules),
+    }
+
+
+def check_startup(analyze, budget_ms):
+    """
+    Проверяем бюджет запуска анализа; возвращаем список нарушений.
+    """
+    problems = []
+    if analyze['import_ms'] > budget_ms:
+        problems.append(f"imports take {analyze['import_ms']} ms, budget is {budget_ms} ms")
+    for name in analyze['modules']:
+        if any(name == forbidden or name.startswith(forbidden + '.') for forbidden in ANALYSIS_FORBIDDEN_MODULES):
+            problems.append(f"analysis-only run imports {name}")
+    return problems
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Сравниваем пропускную способность с сохранённым прогоном.
+    Возвращаем строки отчёта и признак регрессии.
+    """
+    lines = []
+    regressed = False
+    for phase in ('analyze', 'fix'):
+        if phase not in results or phase not in baseline:
+            continue
+        for metric in ('files_per_sec', 'mb_per_sec'):
+            old = baseline[phase][metric]
+            new = results[phase][metric]
+            change = (new - old) / old if old else 0.0
+            marker = ''
+            if change < -threshold:
+                marker = '  <-- REGRESSION'
+                regressed = True
+            lines.append(f"[BENCH] {phase}.{metric}: {old} -> {new} ({change:+.1%}){marker}")
+    return lines, regressed
+
+
+def report_lines(name, results):
+    lines = [f"[BENCH] {name}: {results['files']} file(s), {results['bytes'] / (1024 * 1024):.2f} MiB, "
+             f"findings: {results['findings']}"]
+    for phase in ('analyze', 'fix'):
+        if phase in results:
+            p = results[phase]
+            lines.append(f"[BENCH] {phase:<8} {p['seconds']:>9.3f} s  {p['files_per_sec']:>10.1f} files/s  "
+                         f"{p['mb_per_sec']:>8.2f} MB/s  {p['findings_per_sec']:>10.1f} findings/s  "
+                         f"peak RSS {p['peak_rss_mib']:.1f} MiB")
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark analysis and fix throughput.')
+    parser.add_argument('--jobs', '-j', type=resolve_jobs, default=1, metavar='N',
+                        help="Worker processes for analysis, or 'auto' (default: 1)")
+    parser.add_argument('--no-fix', dest='fix', action='store_false', help='Benchmark analysis only')
+    parser.add_argument('--output', '-o', metavar='FILE', help='Save results as JSON to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Compare with a previously saved JSON result; exit 1 on a regression')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary corpus directory')
+    corpora = parser.add_subparsers(dest='corpus_kind', required=True)
+
+    synthetic = corpora.add_parser('synthetic', help='Generate a synthetic corpus and benchmark it')
+    synthetic.add_argument('--files', type=int, default=1000, help='Number of modules (default: 1000)')
+    synthetic.add_argument('--blocks', type=int, default=20,
+                           help='Functions/classes per module (default: 20)')
+    synthetic.add_argument('--sql-density', type=float, default=0.2,
+                           help='Probability that a block holds a vulnerable SQL query (default: 0.2)')
+    synthetic.add_argument('--eval-density', type=float, default=0.1,
+                           help='Probability that a block calls eval() (default: 0.1)')
+    synthetic.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    real = corpora.add_parser('real', help='Benchmark a copy of an offline real-world corpus')
+    real.add_argument('--corpus', help='Directory with Python sources (default: site-packages of .venv)')
+
+    startup = corpora.add_parser('startup', help='Measure CLI cold start with -X importtime against a budget')
+    startup.add_argument('--runs', type=int, default=5, help='Interpreter launches per command (default: 5)')
+    startup.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                         help=f'Import time budget for analysis-only runs (default: {STARTUP_BUDGET_MS})')
+    return parser
+
+
+def run_startup(args, corpus):
+    """
+    startup: маленький корпус (как у pre-commit), анализ и анализ с --fix.
+    Нарушение бюджета или импорт libcst без --fix - код выхода 1.
+    """
+    generate_corpus(corpus, files=5, blocks=10)
+    results = {
+        'format': BENCH_FORMAT,
+        'budget_ms': args.budget_ms,
+        'analyze': measure_startup(corpus, runs=args.runs),
+        'fix': measure_startup(corpus, ('--fix',), runs=args.runs),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    for phase in ('analyze', 'fix'):
+        p = results[phase]
+        lines = ', '.join(f'{name} {ms}' for name, ms in p['heaviest_imports_ms'].items())
+        print(f"[BENCH] startup {phase:<8} wall {p['wall_ms']:>7.1f} ms  imports {p['import_ms']:>7.1f} ms")
+        print(f"[BENCH]   heaviest imports (ms): {lines}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"[BENCH] results saved to {args.output}")
+    problems = check_startup(results['analyze'], args.budget_ms)
+    for problem in problems:
+        print(f"[BENCH] STARTUP BUDGET EXCEEDED: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"[BENCH] startup within budget ({args.budget_ms} ms, no libcst/fixer imports without --fix)")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='autofixer-bench-')
+    try:
+        corpus = os.path.join(workdir, 'corpus')
+        os.makedirs(corpus)
+        if args.corpus_kind == 'startup':
+            run_startup(args, corpus)
+            return
+        meta = {'kind': args.corpus_kind}
+        if args.corpus_kind == 'synthetic':
+            meta.update(files=args.files, blocks=args.blocks, sql_density=args.sql_density,
+                        eval_density=args.eval_density, seed=args.seed)
+            meta['expected'] = generate_corpus(corpus, args.files, args.blocks, args.sql_density,
+                                               args.eval_density, args.seed)
+        else:
+            source = args.corpus or _default_real_corpus()
+            if source is None or not os.path.isdir(source):
+                sys.exit('[ERROR] no real-world corpus found; pass --corpus <directory>')
+            meta['source'] = os.path.abspath(source)
+            copy_corpus(source, corpus)
+
+        results = run_benchmark(corpus, jobs=args.jobs, fix=args.fix)
+        results.update(format=BENCH_FORMAT, corpus=meta, jobs=args.jobs,
+                       python=platform.python_version(), platform=platform.platform())
+        for line in report_lines(args.corpus_kind, results):
+            print(line)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f"[BENCH] results saved to {args.output}")
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            lines, regressed = compare(results, baseline)
+            for line in lines:
+                print(line)
+            if regressed:
+                sys.exit(1)
+    finally:
+        if args.keep:
+            print(f"[BENCH] corpus kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+DEFAULT_CACHE_DIR = '.autofixer_cache'
+CACHE_FILENAME = 'scan-cache.sqlite3'
+# Верхняя граница суммарного размера сохранённых находок
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Формат записи; меняем при изменении структуры таблицы или payload
+CACHE_FORMAT = 2
+# Сколько записей накапливаем до commit'а
+COMMIT_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS findings (
+    path      TEXT NOT NULL,
+    detector  TEXT NOT NULL,
+    version   TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    digest    TEXT NOT NULL,
+    payload   BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, detector)
+)
+"""
+
+# Записи по ключу содержимого, а не пути файла: сводки межмодульного анализа (ключ строит
+# сам анализ - хэш содержимого модуля, хэши сводок его зависимостей) и находки git-blob'ов
+_SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key       TEXT PRIMARY KEY,
+    payload   BLOB NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _dump(value):
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def _load(payload, decode):
+    # Файл кэша часто лежит в сканируемом дереве, т.е. его может подложить кто угодно:
+    # payload - только данные JSON, битая запись - как отсутствующая
+    try:
+        return decode(json.loads(payload))
+    except (ValueError, TypeError, RecursionError):
+        return None
+
+
+def _findings_decoder(detector):
+    record_cls = detector.record_cls
+    return lambda rows: [record_cls.from_row(row) for row in rows]
+
+
+class ScanCache:
+    """
+    Постоянный кэш находок по файлам (sqlite).
+    Запись для (путь, детектор) действительна, пока совпадают версия детектора,
+    размер и mtime файла; если изменился только mtime, сверяем хэш содержимого.
+    Находки хранятся в JSON как значения полей (Record.as_row) и собираются
+    заново классом записи детектора (Detector.record_cls); pickle не используется.
+    Рядом - сводки межмодульного анализа по ключу содержимого (load_summary/store_summary)
+    и находки по id git-blob'а (lookup_blob/store_blob): blob не меняется, важна только версия.
+    С базой работает только родительский процесс, воркеры её не трогают;
+    несколько одновременных запусков разводит блокировка sqlite (WAL + timeout).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        # sqlite3 грузим только с кэшем: content_digest нужен и без него
+        import sqlite3
+
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_SUMMARY_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def detector_version(detector):
+        return f"{CACHE_FORMAT}.{detector.cache_version}.py{sys.version_info[0]}{sys.version_info[1]}"
+
+    def lookup(self, fullpath, detectors):
+        """
+        Возвращаем ({детектор: [находки]}, fingerprint) из кэша
+        или None, если файл нужно анализировать заново.
+        """
+        try:
+            st = os.stat(fullpath)
+        except OSError:
+            return None
+        rows = self._conn.execute(
+            'SELECT detector, version, size, mtime_ns, digest, payload FROM findings WHERE path = ?',
+            (fullpath,),
+        ).fetchall()
+        by_detector = {row[0]: row for row in rows}
+
+        results = {}
+        stale_mtime = False
+        digest = None
+        for detector in detectors:
+            row = by_detector.get(detector.name)
+            if row is None or row[1] != self.detector_version(detector) or row[2] != st.st_size:
+                self.misses += 1
+                return None
+            if row[3] != st.st_mtime_ns:
+                # mtime изменился (checkout, touch) - сверяем содержимое
+                if digest is None:
+                    with open(fullpath, 'rb') as f:
+                        digest = content_digest(f.read())
+                if digest != row[4]:
+                    self.misses += 1
+                    return None
+                stale_mtime = True
+            found = _load(row[5], _findings_decoder(detector))
+            if found is None:
+                self.misses += 1
+                return None
+            results[detector.name] = found
+
+        now = time.time()
+        if stale_mtime:
+            self._conn.execute(
+                'UPDATE findings SET mtime_ns = ?, last_used = ? WHERE path = ?',
+                (st.st_mtime_ns, now, fullpath),
+            )
+        else:
+            self._conn.execute('UPDATE findings SET last_used = ? WHERE path = ?', (now, fullpath))
+        self._touch()
+        self.hits += 1
+        return results, (st.st_size, st.st_mtime_ns, rows[0][4])
+
+    def store(self, fullpath, fingerprint, detectors, results):
+        """
+        Сохраняем находки файла; fingerprint = (size, mtime_ns, digest) на момент чтения.
+        """
+        size, mtime_ns, digest = fingerprint
+        now = time.time()
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (fullpath, detector.name, self.detector_version(detector), size, mtime_ns, digest,
+                 _dump([finding.as_row() for finding in results.get(detector.name, [])]), now)
+                for detector in detectors
+            ],
+        )
+        self._touch()
+
+    def known_digest(self, fullpath, st):
+        """
+        Хэш содержимого файла из записей о находках, если размер и mtime
+        не изменились с последнего анализа (файл не нужно читать), иначе None.
+        """
+        row = self._conn.execute(
+            'SELECT digest FROM findings WHERE path = ? AND size = ? AND mtime_ns = ? LIMIT 1',
+            (fullpath, st.st_size, st.st_mtime_ns),
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_summary(self, key, decode):
+        """
+        Сводка по ключу или None. Сводка хранится в JSON (кортежи - списками),
+        decode(данные) собирает из них исходные структуры и бросает ValueError
+        или TypeError, если данные не той формы (такая запись - как отсутствующая).
+        """
+        row = self._conn.execute('SELECT payload FROM summaries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value = _load(row[0], decode)
+        if value is not None:
+            self._conn.execute('UPDATE summaries SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._touch()
+        return value
+
+    def store_summary(self, key, value):
+        """
+        value - строки, числа, None, кортежи (в том числе именованные), списки
+        и словари со строковыми ключами.
+        """
+        self._conn.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)', (key, _dump(value), time.time()))
+        self._touch()
+
+    def _blob_key(self, oid, detector):
+        return f"blob.{self.detector_version(detector)}.{detector.name}.{oid}"
+
+    def lookup_blob(self, oid, detectors):
+        """
+        {детектор: [находки]} для git-blob'а oid или None, если его нужно анализировать.
+        """
+        keys = [self._blob_key(oid, detector) for detector in detectors]
+        rows = dict(self._conn.execute(
+            f'SELECT key, payload FROM summaries WHERE key IN ({", ".join("?" * len(keys))})',
+            keys,
+        ).fetchall())
+        results = {}
+        for detector, key in zip(detectors, keys):
+            found = _load(rows[key], _findings_decoder(detector)) if key in rows else None
+            if found is None:
+                self.misses += 1
+                return None
+            results[detector.name] = found
+        now = time.time()
+        self._conn.executemany('UPDATE summaries SET last_used = ? WHERE key = ?', [(now, key) for key in keys])
+        self._touch()
+        self.hits += 1
+        return results
+
+    def store_blob(self, oid, detectors, results):
+        now = time.time()
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)',
+            [
+                (self._blob_key(oid, detector), _dump([finding.as_row() for finding in results.get(detector.name, [])]),
+                 now)
+                for detector in detectors
+            ],
+        )
+        self._touch()
+
+    def _touch(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def evict(self):
+        """
+        Удаляем давно не использованные записи (находки и сводки),
+        пока кэш не уложится в max_bytes.
+        """
+        total = self._conn.execute(
+            'SELECT (SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM findings)'
+            ' + (SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM summaries)'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            'SELECT path, detector, LENGTH(payload), last_used FROM findings'
+            ' UNION ALL SELECT key, NULL, LENGTH(payload), last_used FROM summaries ORDER BY 4'
+        ).fetchall()
+        victims = []
+        summary_victims = []
+        for key, detector, size, _ in rows:
+            if total <= target:
+                break
+            if detector is None:
+                summary_victims.append((key,))
+            else:
+                victims.append((key, detector))
+            total -= size
+            removed += 1
+        self._conn.executemany('DELETE FROM findings WHERE path = ? AND detector = ?', victims)
+        self._conn.executemany('DELETE FROM summaries WHERE key = ?', summary_victims)
+        return removed
+
+    def commit(self):
+        self.evict()
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_cache(enabled=True, cache_dir=None):
+    """
+    Открываем кэш согласно опциям --no-cache / --cache-dir.
+    """
+    if not enabled:
+        return None
+    return ScanCache(cache_dir or DEFAULT_CACHE_DIR)
@@ -0,0 +1,340 @@
+import argparse
+import contextlib
+import logging
+import os
+import sys
+
+from fixer_core.cache import DEFAULT_CACHE_DIR, open_cache
+from fixer_core.discovery import DEFAULT_EXCLUDES, Discovery, read_files_from
+from fixer_core.git_diff import GitDiffError, changed_line_ranges, changed_python_files
+from fixer_core.pipeline import BOUNDED_TASKS_PER_CHILD, resolve_jobs
+from fixer_core.profiling import Profiler, peak_rss, profiling, write_merged_profile
+from fixer_core.stats import ScanStats
+
+# {каталог кэша: открытый ScanCache} - в режиме демона кэш не закрывается между запросами
+_warm_caches = None
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(value):
+    """
+    Размер для --max-memory: число байт или с суффиксом K/M/G/T (512M, 1.5G, 2GiB).
+    """
+    text = value.strip().upper()
+    for suffix in ('IB', 'B'):
+        if text.endswith(suffix) and text[:-len(suffix)][-1:] in 'KMGT':
+            text = text[:-len(suffix)]
+            break
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+    try:
+        size = int(float(text[:len(text) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}' (expected e.g. 512M or 2G)") from None
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got '{value}'")
+    return size
+
+
+def add_scan_arguments(parser):
+    """
+    Общие опции сканирования для main.py и entry point'ов sql-fix / eval-fix.
+    """
+    parser.add_argument(
+        '--jobs', '-j',
+        type=resolve_jobs,
+        default=1,
+        metavar='N',
+        help="Number of worker processes for analysis, or 'auto' for one per CPU (default: 1)",
+    )
+    parser.add_argument(
+        '--max-memory',
+        type=parse_size,
+        metavar='SIZE',
+        help='Memory budget for the run, e.g. 512M or 4G: smaller worker tasks, at most two '
+             'tasks in flight per worker, recycled workers, and findings kept for --fix spill '
+             'to a temp file beyond a quarter of the budget; the peak RSS is reported at the end',
+    )
+    parser.add_argument(
+        '--max-tasks-per-child',
+        type=int,
+        metavar='N',
+        help=f'Replace each worker process after N tasks (Python 3.11+; '
+             f'default: {BOUNDED_TASKS_PER_CHILD} with --max-memory, otherwise never)',
+    )
+    parser.add_argument(
+        '--interprocedural',
+        action='store_true',
+        help='Also follow SQL queries across functions and modules: per-module summaries '
+             '(cached by content hash) are linked over the import graph; queries built in one '
+             'function and executed in another are reported (not auto-fixed)',
+    )
+    parser.add_argument(
+        '--no-cache',
+        dest='cache',
+        action='store_false',
+        help='Do not read or update the incremental scan cache',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Directory for the incremental scan cache (default: {DEFAULT_CACHE_DIR})',
+    )
+    parser.add_argument(
+        '--diff-base',
+        metavar='REF',
+        help='Scan only .py files changed relative to this git ref (e.g. origin/main)',
+    )
+    parser.add_argument(
+        '--revision',
+        dest='revisions',
+        action='append',
+        default=[],
+        metavar='REV',
+        help='Scan PATH as of git revision REV (tag, branch, commit) straight from the git object '
+             'store, without a checkout; may be repeated. A file identical in several revisions '
+             '(same blob id) is analyzed once and reported under every revision and path',
+    )
+    parser.add_argument(
+        '--history',
+        metavar='RANGE',
+        help="Like --revision for every commit of a git rev-list RANGE (e.g. 'v1.0..v2.0' or 'main'), "
+             "oldest first: each file version is reported at the first commit that has it",
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=[],
+        metavar='GLOB',
+        help='Skip files and directories matching GLOB (name, or path relative to the scanned '
+             'directory if it contains "/"); may be repeated',
+    )
+    parser.add_argument(
+        '--include',
+        action='append',
+        default=[],
+        metavar='GLOB',
+        help='Scan only .py files matching GLOB; may be repeated',
+    )
+    parser.add_argument(
+        '--no-default-excludes',
+        dest='default_excludes',
+        action='store_false',
+        help=f'Also descend into {", ".join(DEFAULT_EXCLUDES)}',
+    )
+    parser.add_argument(
+        '--gitignore',
+        action='store_true',
+        help='Skip files ignored by .gitignore files inside the scanned directory',
+    )
+    parser.add_argument(
+        '--follow-symlinks',
+        action='store_true',
+        help='Descend into symlinked directories (each directory is still visited once)',
+    )
+    parser.add_argument(
+        '--files-from',
+        metavar='FILE',
+        help="Scan the files listed in FILE ('-' for stdin), NUL- or newline-separated, "
+             "e.g. from 'git ls-files -z'",
+    )
+    parser.add_argument(
+        '--changed-lines-only',
+        action='store_true',
+        help='With --diff-base, report only findings located on changed lines',
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Print scan counters (cache hits, files skipped by the prefilter) at the end',
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Print wall/CPU time per phase, files and bytes processed and the slowest files at the end',
+    )
+    parser.add_argument(
+        '--slowest',
+        type=int,
+        default=10,
+        metavar='N',
+        help='Number of slowest files listed by --timings (default: 10)',
+    )
+    parser.add_argument(
+        '--trace-memory',
+        action='store_true',
+        help='Track peak Python memory with tracemalloc (slows the scan down)',
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Collect cProfile data from all processes and write merged stats to FILE (.pstats)',
+    )
+    parser.add_argument(
+        '--format',
+        choices=['text', 'jsonl', 'json', 'sarif'],
+        default='text',
+        help='Output format: human-readable text, one JSON object per finding (jsonl), '
+             'a single JSON report (json) or SARIF 2.1.0 (sarif); reports are written '
+             'to stdout as findings arrive (default: text)',
+    )
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='Print detector debug messages to stderr',
+    )
+    return parser
+
+
+def configure_logging(debug):
+    """
+    Отладочные сообщения детекторов идут через logging и по умолчанию выключены.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format='[DEBUG] %(message)s' if debug else '%(message)s',
+        stream=sys.stderr,
+        force=True,
+    )
+
+
+@contextlib.contextmanager
+def warm_caches():
+    """
+    Внутри блока открытые кэши переиспользуются между вызовами
+    scan_options_from_args() (демон autofixer serve); закрываются на выходе.
+    """
+    global _warm_caches
+    _warm_caches = {}
+    try:
+        yield _warm_caches
+    finally:
+        for cache in _warm_caches.values():
+            cache.close()
+        _warm_caches = None
+
+
+def _open_cache(enabled, cache_dir):
+    if _warm_caches is None or not enabled:
+        return open_cache(enabled, cache_dir)
+    key = os.path.abspath(cache_dir)
+    if key not in _warm_caches:
+        _warm_caches[key] = open_cache(enabled, cache_dir)
+    return _warm_caches[key]
+
+
+@contextlib.contextmanager
+def scan_options_from_args(args):
+    """
+    Собираем keyword-опции для scan()/analyze_*() из разобранных аргументов.
+    Кэш закрывается при выходе из блока, по --stats в конце печатаются счётчики,
+    по --timings / --trace-memory - отчёт профилировщика (фазы внутри блока,
+    включая исправления), по --profile - сводный файл cProfile.
+    """
+    configure_logging(args.debug)
+    # В машинных форматах stdout занят отчётом, служебные сообщения уходят в stderr
+    info_stream = sys.stderr if args.format != 'text' else sys.stdout
+    options = {'jobs': args.jobs, 'error_stream': info_stream}
+    if args.max_memory:
+        options['max_memory'] = args.max_memory
+    if args.max_tasks_per_child or args.max_memory:
+        options['max_tasks_per_child'] = args.max_tasks_per_child or BOUNDED_TASKS_PER_CHILD
+    if args.interprocedural:
+        options['interprocedural'] = True
+    if args.stats:
+        options['stats'] = ScanStats()
+    if args.changed_lines_only and not args.diff_base:
+        sys.exit('[ERROR] --changed-lines-only requires --diff-base')
+    if args.files_from and args.diff_base:
+        sys.exit('[ERROR] --files-from and --diff-base cannot be combined')
+    if args.revisions or args.history:
+        if args.files_from or args.diff_base or args.interprocedural:
+            sys.exit('[ERROR] --revision / --history cannot be combined with --files-from, --diff-base '
+                     'or --interprocedural')
+        if getattr(args, 'fix', False):
+            sys.exit('[ERROR] --fix cannot be used with --revision / --history: revisions are read '
+                     'from git objects, not from files')
+        from fixer_core.git_objects import resolve_revisions
+
+        try:
+            options['revisions'] = resolve_revisions(args.path, args.revisions, args.history)
+        except GitDiffError as e:
+            sys.exit(f"[ERROR] cannot resolve git revisions: {e}")
+    discovery = Discovery(
+        excludes=DEFAULT_EXCLUDES if args.default_excludes else (),
+        exclude=args.exclude,
+        include=args.include,
+        gitignore=args.gitignore,
+        follow_symlinks=args.follow_symlinks,
+    )
+    options['discovery'] = discovery
+    if args.files_from:
+        try:
+            listed = read_files_from(args.files_from)
+        except OSError as e:
+            sys.exit(f"[ERROR] cannot read --files-from '{args.files_from}': {e}")
+        options['files'] = list(discovery.filter_paths(listed, args.path))
+    if args.diff_base:
+        try:
+            options['files'] = list(discovery.filter_paths(changed_python_files(args.diff_base, args.path),
+                                                           args.path))
+            if args.changed_lines_only:
+                options['line_filter'] = changed_line_ranges(args.diff_base, args.path)
+        except GitDiffError as e:
+            sys.exit(f"[ERROR] git diff against '{args.diff_base}' failed: {e}")
+
+    cache = _open_cache(args.cache, args.cache_dir)
+    options['cache'] = cache
+    profiler = None
+    if args.timings or args.trace_memory or args.profile:
+        import tempfile
+
+        cprofile_dir = tempfile.mkdtemp(prefix='autofixer-profile-') if args.profile else None
+        profiler = Profiler(args.slowest, args.trace_memory, cprofile_dir)
+    try:
+        with profiling(profiler) if profiler else contextlib.nullcontext():
+            yield options
+        if args.profile:
+            # Дампы cProfile родителя и воркеров сливаем в один файл
+            write_merged_profile(profiler.profile_dumps, args.profile)
+    finally:
+        if cache is not None:
+            if _warm_caches is None:
+                cache.close()
+            else:
+                cache.commit()
+        if args.profile:
+            import shutil
+
+            shutil.rmtree(profiler.cprofile_dir, ignore_errors=True)
+    if args.stats:
+        for line in options['stats'].report_lines():
+            print(line, file=info_stream)
+    if args.timings or args.trace_memory:
+        for line in profiler.report_lines():
+            print(line, file=info_stream)
+    if args.profile:
+        print(f"[PROFILE] cProfile stats written to {args.profile}", file=info_stream)
+    if args.max_memory:
+        _report_memory(args.max_memory, info_stream)
+
+
+def _report_memory(max_memory, stream):
+    mib = 1024 * 1024
+    own, workers = peak_rss(), peak_rss(children=True)
+    line = f"[MEMORY] peak RSS: {own / mib:.1f} MiB"
+    if workers:
+        line += f", workers: {workers / mib:.1f} MiB"
+    print(f"{line} (budget {max_memory / mib:.1f} MiB)", file=stream)
+    if max(own, workers) > max_memory:
+        print("[MEMORY] warning: the budget was exceeded; lower --jobs or --max-tasks-per-child", file=stream)
+
+
+def redirect_output_for(output_format):
+    """
+    Сообщения фиксеров ([FIXED]/[ERROR]) в машинных форматах (jsonl, json, sarif)
+    уводим в stderr, чтобы в stdout оставался только отчёт.
+    """
+    if output_format != 'text':
+        return contextlib.redirect_stdout(sys.stderr)
+    return contextlib.nullcontext()
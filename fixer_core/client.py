@@ -0,0 +1,210 @@
+"""
+Тонкий клиент autofixer / sql-fix / eval-fix.
+
+Если запущен демон (autofixer serve), команда отправляется ему по Unix-сокету
+и выполняется в "тёплом" процессе: детекторы, libcst и кэш уже загружены.
+Иначе команда выполняется здесь же, как обычно. Модуль импортирует только
+стандартную библиотеку - до решения, куда идти, ничего тяжёлого не грузится.
+
+Протокол - JSON, по одному объекту на строку:
+    запрос:  {"version": 1, "op": "run", "program": "autofixer", "argv": [...],
+              "cwd": "...", "stdin": "..." | null}
+             {"version": 1, "op": "ping"} / {"version": 1, "op": "shutdown"}
+    ответы:  {"stdout": "..."} / {"stderr": "..."} - вывод команды по мере готовности,
+             {"exit": <код>} - последним сообщением,
+             {"error": "..."} - демон не может выполнить запрос (клиент выполнит его сам).
+"""
+import importlib
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+
+PROTOCOL_VERSION = 1
+
+# Программа -> 'модуль:функция' точки входа
+PROGRAMS = {
+    'autofixer': 'main:main',
+    'sql-fix': 'sql_injection_fixer_v2.test_sql_fixer:main',
+    'eval-fix': 'eval_fixer.eval_fixer:main',
+}
+
+CONNECT_TIMEOUT = 1.0
+
+# Режимы без конца (--watch): демон выполняет запросы по одному, такой запрос занял бы его
+# для всех клиентов навсегда, а Ctrl-C в клиенте его не останавливает - выполняем их здесь
+LOCAL_ONLY_OPTIONS = frozenset({'--watch'})
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def default_socket_path():
+    """
+    $AUTOFIXER_SOCKET, иначе autofixer-<uid>.sock в $XDG_RUNTIME_DIR, иначе daemon.sock
+    в личном каталоге autofixer-<uid> (0700) внутри временного: в общем /tmp,
+    где имя может заранее занять другой пользователь, сокет не лежит.
+    """
+    path = os.environ.get('AUTOFIXER_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, f'autofixer-{os.getuid()}.sock')
+    return os.path.join(tempfile.gettempdir(), f'autofixer-{os.getuid()}', 'daemon.sock')
+
+
+def trusted_directory(path):
+    """
+    Каталог, в котором другой пользователь не может подменить сокет: наш,
+    или root'а и либо закрыт для записи остальным, либо со sticky-битом (как /tmp).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_uid == os.getuid():
+        return True
+    return st.st_uid == 0 and (not st.st_mode & 0o022 or bool(st.st_mode & stat.S_ISVTX))
+
+
+def _trusted_socket(socket_path):
+    # Сокет наш и закрыт для остальных (демон создаёт его с правами 0600)
+    try:
+        st = os.lstat(socket_path)
+    except OSError:
+        return False
+    return (stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+            and trusted_directory(os.path.dirname(os.path.abspath(socket_path))))
+
+
+def _peer_uid(sock):
+    # Linux: кто на другом конце соединения (None - узнать нельзя)
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', credentials)[1]
+
+
+def _connect(socket_path):
+    """
+    Соединение с демоном. Сокет чужого пользователя не используем: ему ушли бы
+    аргументы, cwd и stdin команды, а его ответ подменил бы вывод и код выхода.
+    """
+    if not hasattr(socket, 'AF_UNIX') or not _trusted_socket(socket_path):
+        raise DaemonUnavailable(socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        peer_uid = _peer_uid(sock)
+    except OSError:
+        sock.close()
+        raise DaemonUnavailable(socket_path)
+    if peer_uid is not None and peer_uid != os.getuid():
+        sock.close()
+        raise DaemonUnavailable(f"{socket_path} is served by another user")
+    sock.settimeout(None)
+    return sock
+
+
+def request(message, socket_path=None):
+    """
+    Отправляем запрос демону, отдаём сообщения ответа по одному.
+    DaemonUnavailable - демона нет (или он отказался выполнять запрос до начала вывода).
+    """
+    sock = _connect(socket_path or default_socket_path())
+    with sock, sock.makefile('rb') as replies:
+        try:
+            sock.sendall(json.dumps(dict(message, version=PROTOCOL_VERSION)).encode() + b'\n')
+        except OSError:
+            raise DaemonUnavailable(socket_path)
+        started = False
+        for line in replies:
+            reply = json.loads(line)
+            if 'error' in reply and not started:
+                raise DaemonUnavailable(reply['error'])
+            started = True
+            yield reply
+
+
+def _stdin_payload(argv):
+    # Данные stdin нужны только для --files-from -
+    for i, arg in enumerate(argv):
+        if arg == '--files-from=-' or (arg == '--files-from' and argv[i + 1:i + 2] == ['-']):
+            return os.fsdecode(sys.stdin.buffer.read())
+    return None
+
+
+def run_remote(program, argv, stdin=None, socket_path=None):
+    """
+    Выполняем команду в демоне; возвращаем код выхода.
+    """
+    message = {'op': 'run', 'program': program, 'argv': argv, 'cwd': os.getcwd(), 'stdin': stdin}
+    code = 1
+    for reply in request(message, socket_path):
+        if 'stdout' in reply:
+            sys.stdout.write(reply['stdout'])
+        elif 'stderr' in reply:
+            sys.stdout.flush()
+            sys.stderr.write(reply['stderr'])
+            sys.stderr.flush()
+        elif 'exit' in reply:
+            code = reply['exit']
+    sys.stdout.flush()
+    return code
+
+
+def local_only(argv):
+    """
+    Команду нужно выполнить в процессе клиента, а не в демоне (см. LOCAL_ONLY_OPTIONS).
+    """
+    return any(arg in LOCAL_ONLY_OPTIONS for arg in argv)
+
+
+def run_local(program, argv, stdin=None):
+    """
+    Выполняем команду в текущем процессе (так же поступает и демон).
+    stdin - уже прочитанный stdin клиента (для --files-from -).
+    """
+    module_name, attr = PROGRAMS[program].split(':')
+    entry = getattr(importlib.import_module(module_name), attr)
+    sys.argv = [program] + list(argv)
+    if stdin is not None:
+        sys.stdin = io.TextIOWrapper(io.BytesIO(os.fsencode(stdin)))
+    entry()
+    return 0
+
+
+def run(program, argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Интерактивный режим, --watch и явный отказ от демона - всегда локально
+    if not argv or local_only(argv) or os.environ.get('AUTOFIXER_NO_DAEMON') == '1':
+        sys.exit(run_local(program, argv))
+    stdin = _stdin_payload(argv)
+    try:
+        code = run_remote(program, argv, stdin)
+    except DaemonUnavailable:
+        code = run_local(program, argv, stdin)
+    sys.exit(code)
+
+
+def main():
+    if sys.argv[1:2] == ['serve']:
+        from fixer_core.daemon import main as serve_main
+        serve_main(sys.argv[2:])
+        return
+    run('autofixer')
+
+
+def sql_fix():
+    run('sql-fix')
+
+
+def eval_fix():
+    run('eval-fix')
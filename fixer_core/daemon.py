@@ -0,0 +1,218 @@
+"""
+autofixer serve - долгоживущий процесс с "тёплыми" детекторами, libcst и кэшем.
+
+    autofixer serve [--socket PATH] [--idle-timeout SECONDS]
+    autofixer serve --status | --stop
+
+Запросы выполняются по одному, в порядке поступления (протокол - см. fixer_core.client);
+режимы без конца (--watch) демон не берёт - их выполняет клиент.
+Если исходники автофиксера изменились после запуска, демон отвечает ошибкой
+и завершается - клиент выполняет команду сам, со свежим кодом.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import traceback
+
+from fixer_core.client import (
+    PROGRAMS, PROTOCOL_VERSION, DaemonUnavailable, default_socket_path, local_only, request, run_local,
+    trusted_directory,
+)
+from fixer_core.cli import warm_caches
+from fixer_core.pipeline import DETECTORS
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _code_signature():
+    """
+    mtime загруженных модулей проекта: по нему демон замечает, что код обновился.
+    """
+    signature = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and path.startswith(_PROJECT_ROOT):
+            with contextlib.suppress(OSError):
+                signature[path] = os.stat(path).st_mtime_ns
+    return signature
+
+
+def preload():
+    """
+    Импортируем всё, что нужно командам: точки входа, детекторы, фиксеры (и libcst).
+    """
+    for target in PROGRAMS.values():
+        __import__(target.split(':')[0])
+    for detector in DETECTORS.values():
+        detector.rule_cls
+        detector.fixer_cls
+
+
+class _ReplyStream(io.TextIOBase):
+    """
+    stdout/stderr команды: каждая запись сразу уходит клиенту сообщением {name: text}.
+    """
+
+    def __init__(self, send, name):
+        self._send = send
+        self._name = name
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self._send({self._name: text})
+        return len(text)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        if message.get('version') != PROTOCOL_VERSION:
+            self.send({'error': f"protocol version {message.get('version')} is not supported"})
+            return
+        op = message.get('op')
+        if op == 'ping':
+            self.send({'pid': os.getpid(), 'cwd': os.getcwd()})
+        elif op == 'shutdown':
+            self.server.stopping = True
+            self.send({'exit': 0})
+        elif op == 'run':
+            if _code_signature() != self.server.signature:
+                self.server.stopping = True
+                self.send({'error': 'autofixer sources changed, daemon is restarting'})
+                return
+            if message.get('program') not in PROGRAMS:
+                self.send({'error': f"unknown program {message.get('program')!r}"})
+                return
+            if local_only(message.get('argv') or ()):
+                self.send({'error': 'long-running modes (--watch) run in the client'})
+                return
+            self.send({'exit': self.run_command(message)})
+        else:
+            self.send({'error': f'unknown op {op!r}'})
+
+    def run_command(self, message):
+        stdout = _ReplyStream(self.send, 'stdout')
+        stderr = _ReplyStream(self.send, 'stderr')
+        saved = sys.argv, sys.stdin, os.getcwd()
+        try:
+            os.chdir(message['cwd'])
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    return run_local(message['program'], message['argv'], message.get('stdin'))
+                except SystemExit as e:
+                    # sys.exit("[ERROR] ...") печатает сообщение и возвращает 1, как интерпретатор
+                    if e.code is None or isinstance(e.code, int):
+                        return e.code or 0
+                    print(e.code, file=sys.stderr)
+                    return 1
+                except Exception:
+                    traceback.print_exc()
+                    return 1
+        except OSError as e:
+            self.send({'stderr': f"[ERROR] {e}\n"})
+            return 1
+        finally:
+            sys.argv, sys.stdin = saved[0], saved[1]
+            os.chdir(saved[2])
+
+
+class _Server(socketserver.UnixStreamServer):
+
+    def __init__(self, socket_path, idle_timeout=None):
+        self.stopping = False
+        self.timeout = idle_timeout
+        self.signature = _code_signature()
+        super().__init__(socket_path, _Handler)
+
+    def handle_timeout(self):
+        self.stopping = True
+
+
+def _daemon_running(socket_path):
+    try:
+        return next(request({'op': 'ping'}, socket_path))
+    except (DaemonUnavailable, StopIteration, ValueError):
+        return None
+
+
+def serve(socket_path=None, idle_timeout=None):
+    socket_path = socket_path or default_socket_path()
+    # Каталог сокета (по умолчанию без $XDG_RUNTIME_DIR - личный autofixer-<uid>) создаём закрытым
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if not trusted_directory(socket_dir):
+        sys.exit(f'[ERROR] {socket_dir} belongs to another user; choose a private --socket path')
+    if _daemon_running(socket_path):
+        sys.exit(f'[ERROR] autofixer daemon is already running on {socket_path}')
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(socket_path)  # сокет от упавшего процесса
+
+    # Демон меняет cwd под каждый запрос - относительные пути в sys.path фиксируем
+    sys.path[:] = [os.path.abspath(entry or os.curdir) for entry in sys.path]
+    preload()
+    old_umask = os.umask(0o077)  # сокет доступен только владельцу
+    try:
+        server = _Server(socket_path, idle_timeout)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"[SERVE] autofixer daemon (pid {os.getpid()}) listening on {socket_path}", flush=True)
+    try:
+        with server, warm_caches():
+            while not server.stopping:
+                server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='autofixer serve',
+                                     description='Run a warm autofixer daemon on a Unix socket.')
+    parser.add_argument('--socket', metavar='PATH',
+                        help=f'Socket path (default: $AUTOFIXER_SOCKET or {default_socket_path()})')
+    parser.add_argument('--idle-timeout', type=float, metavar='SECONDS',
+                        help='Exit after this many seconds without requests')
+    parser.add_argument('--status', action='store_true', help='Report whether a daemon is running')
+    parser.add_argument('--stop', action='store_true', help='Ask the running daemon to exit')
+    args = parser.parse_args(argv)
+    socket_path = args.socket or default_socket_path()
+
+    if args.status or args.stop:
+        info = _daemon_running(socket_path)
+        if info is None:
+            print(f"[SERVE] no daemon on {socket_path}")
+            sys.exit(1)
+        if args.stop:
+            list(request({'op': 'shutdown'}, socket_path))
+            print(f"[SERVE] daemon (pid {info['pid']}) stopped")
+        else:
+            print(f"[SERVE] daemon (pid {info['pid']}) is running on {socket_path}")
+        return
+    serve(socket_path, args.idle_timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import fnmatch
+import os
+import re
+import sys
+
+# Каталоги, в которые по умолчанию не заходим (сравнение по имени каталога)
+DEFAULT_EXCLUDES = ('.venv', '.git', 'site-packages', '__pycache__', 'node_modules')
+
+
+def _to_posix(path):
+    return path.replace(os.sep, '/') if os.sep != '/' else path
+
+
+def _glob_matches(patterns, rel, name):
+    """
+    Шаблон без '/' сравниваем с именем, с '/' - с путём относительно корня обхода.
+    """
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(rel if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def _translate_gitignore(pattern):
+    """
+    Шаблон .gitignore -> регулярное выражение для пути относительно каталога .gitignore.
+    Поддерживаются *, ?, [...], ** и привязка к каталогу через '/'.
+    """
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append(f'[{body}]')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(prefix + ''.join(parts) + r'\Z')
+
+
+def parse_gitignore(fullpath, base):
+    """
+    Правила одного .gitignore: [(base, regex, negate, dir_only), ...],
+    base - каталог файла относительно корня обхода ('' для корня).
+    """
+    rules = []
+    try:
+        with open(fullpath, encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((base, _translate_gitignore(line), negate, dir_only))
+    return rules
+
+
+def _gitignored(rules, rel, is_dir):
+    # Как в git: выигрывает последнее подошедшее правило
+    ignored = False
+    for base, regex, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel.startswith(base + '/'):
+                continue
+            sub = rel[len(base) + 1:]
+        else:
+            sub = rel
+        if regex.match(sub):
+            ignored = not negate
+    return ignored
+
+
+class Discovery:
+    """
+    Поиск .py-файлов для сканирования (os.scandir, без лишних stat()).
+    excludes        - имена каталогов, в которые не заходим (по умолчанию DEFAULT_EXCLUDES),
+    exclude/include - пользовательские glob'ы: исключаемые каталоги и файлы /
+                      файлы, которые оставляем (если include не задан - все .py),
+    gitignore       - учитывать .gitignore внутри сканируемого каталога,
+    follow_symlinks - заходить в каталоги-симлинки. Каталоги и файлы запоминаются по
+                      (st_dev, st_ino), поэтому петли и повторные обходы
+                      одного и того же дерева или файла невозможны.
+    Порядок обхода детерминированный: записи каталога сортируются по имени.
+    """
+
+    def __init__(self, excludes=DEFAULT_EXCLUDES, exclude=(), include=(), gitignore=False,
+                 follow_symlinks=False):
+        self.excludes = tuple(excludes)
+        self.exclude = tuple(exclude)
+        self.include = tuple(include)
+        self.gitignore = gitignore
+        self.follow_symlinks = follow_symlinks
+
+    def _skip_dir(self, rel, name):
+        return _glob_matches(self.excludes, name, name) or _glob_matches(self.exclude, rel, name)
+
+    def _keep_file(self, rel, name):
+        if not name.endswith('.py') or _glob_matches(self.exclude, rel, name):
+            return False
+        return not self.include or _glob_matches(self.include, rel, name)
+
+    def iter_files(self, path):
+        """
+        Отдаём .py-файлы по указанному пути (каталог или отдельный файл).
+        """
+        if os.path.isfile(path):
+            if path.endswith('.py'):
+                yield path
+            return
+        for _, entries in self.walk(path):
+            for entry in entries:
+                yield entry.path
+
+    def walk(self, path):
+        """
+        Обходим каталог path: для каждого посещённого каталога отдаём
+        (путь каталога, [os.DirEntry подходящих .py-файлов]).
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        visited = {(st.st_dev, st.st_ino)}
+        seen_files = set()
+        stack = [(path, '', [], st.st_dev)]
+        while stack:
+            dirpath, rel_dir, rules, dev = stack.pop()
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            if self.gitignore and any(entry.name == '.gitignore' for entry in entries):
+                rules = rules + parse_gitignore(os.path.join(dirpath, '.gitignore'), rel_dir)
+
+            subdirs = []
+            files = []
+            for entry in entries:
+                rel = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                try:
+                    is_symlink = entry.is_symlink()
+                    if entry.is_dir():
+                        if is_symlink and not self.follow_symlinks:
+                            continue
+                        if self._skip_dir(rel, entry.name) or (rules and _gitignored(rules, rel, True)):
+                            continue
+                        st = entry.stat()
+                        key = (st.st_dev, st.st_ino)
+                        if key in visited:
+                            continue
+                        visited.add(key)
+                        subdirs.append((entry.path, rel, rules, st.st_dev))
+                    elif entry.is_file() and self._keep_file(rel, entry.name):
+                        if rules and _gitignored(rules, rel, False):
+                            continue
+                        # Файл, доступный по нескольким путям (симлинки, жёсткие ссылки),
+                        # сканируем один раз; inode() у scandir не требует stat()
+                        if is_symlink:
+                            st = entry.stat()
+                            key = (st.st_dev, st.st_ino)
+                        else:
+                            key = (dev, entry.inode())
+                        if key in seen_files:
+                            continue
+                        seen_files.add(key)
+                        files.append(entry)
+                except OSError:
+                    continue
+            yield dirpath, files
+            # Как os.walk: сначала файлы каталога, затем подкаталоги по порядку
+            stack.extend(reversed(subdirs))
+
+    def filter_paths(self, paths, root='.'):
+        """
+        Применяем исключения к готовому списку (--files-from, --diff-base):
+        оставляем существующие .py-файлы, не лежащие в исключённых каталогах.
+        Пути считаем относительно root, если они внутри него.
+        """
+        root = os.path.abspath(root)
+        for path in paths:
+            rel = os.path.relpath(os.path.abspath(path), root)
+            if rel.startswith(os.pardir + os.sep) or rel == os.pardir:
+                rel = path
+            if self.keep_path(_to_posix(os.path.normpath(rel))) and os.path.isfile(path):
+                yield path
+
+    def keep_path(self, rel):
+        """
+        Путь rel (через '/', относительно сканируемого каталога) проходит фильтры:
+        это .py-файл, подходящий под include и не лежащий в исключённых каталогах.
+        """
+        parts = rel.split('/')
+        if not self._keep_file(rel, parts[-1]):
+            return False
+        return not any(self._skip_dir('/'.join(parts[:i + 1]), parts[i]) for i in range(len(parts) - 1))
+
+
+_DEFAULT_DISCOVERY = Discovery()
+
+
+def iter_python_files(path, discovery=None):
+    """
+    Отдаём все .py-файлы по указанному пути (каталог или отдельный файл),
+    без каталогов из DEFAULT_EXCLUDES (если не передан свой Discovery).
+    """
+    return (discovery or _DEFAULT_DISCOVERY).iter_files(path)
+
+
+def read_files_from(source):
+    """
+    Список файлов из файла или stdin ('-'): пути через NUL (git ls-files -z)
+    или, если NUL нет, по одному на строку.
+    """
+    if source == '-':
+        data = sys.stdin.buffer.read()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    separator = b'\0' if b'\0' in data else b'\n'
+    return [os.fsdecode(item.rstrip(b'\r')) for item in data.split(separator) if item.strip()]
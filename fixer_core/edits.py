@@ -0,0 +1,76 @@
+from collections import namedtuple
+
+# Правка исходника: заменить байты [start, end) на replacement (bytes).
+# start == end - вставка.
+Edit = namedtuple('Edit', 'start end replacement')
+
+
+class EditConflict(ValueError):
+    pass
+
+
+class LineIndex:
+    """
+    Переводит (строка, колонка) из ast в байтовые смещения буфера.
+    Колонки ast (col_offset/end_col_offset) уже считаются в байтах UTF-8.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        starts = [0]
+        pos = data.find(b'\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = data.find(b'\n', pos + 1)
+        self.line_starts = starts
+
+    def line_start(self, lineno):
+        if lineno - 1 >= len(self.line_starts):
+            return len(self.data)
+        return self.line_starts[lineno - 1]
+
+    def line_end(self, lineno):
+        """
+        Смещение сразу после строки lineno (вместе с переводом строки).
+        """
+        return self.line_start(lineno + 1)
+
+    def offset(self, lineno, col):
+        return self.line_start(lineno) + col
+
+    def span(self, span):
+        lineno, col, end_lineno, end_col = span
+        return self.offset(lineno, col), self.offset(end_lineno, end_col)
+
+
+def merge_edits(edits):
+    """
+    Сортируем правки одного файла и проверяем, что они не пересекаются.
+    Одинаковые правки схлопываются, вставки в одну точку сохраняют порядок,
+    пересечение разных правок - EditConflict.
+    """
+    merged = []
+    for edit in sorted(edits, key=lambda e: (e.start, e.end)):
+        if merged:
+            prev = merged[-1]
+            if edit == prev and edit.start != edit.end:
+                continue
+            if edit.start < prev.end:
+                raise EditConflict(
+                    f"overlapping edits at bytes {prev.start}-{prev.end} and {edit.start}-{edit.end}")
+        merged.append(edit)
+    return merged
+
+
+def apply_edits(data, edits):
+    """
+    Применяем отсортированные непересекающиеся правки за один линейный проход.
+    """
+    out = []
+    pos = 0
+    for edit in edits:
+        out.append(data[pos:edit.start])
+        out.append(edit.replacement)
+        pos = edit.end
+    out.append(data[pos:])
+    return b''.join(out)
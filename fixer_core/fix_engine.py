@@ -0,0 +1,471 @@
+import contextlib
+import os
+import tempfile
+from collections import Counter, defaultdict
+
+import libcst as cst
+from libcst.metadata import MetadataWrapper, PositionProvider
+
+from fixer_core.edits import Edit, EditConflict, LineIndex, apply_edits, merge_edits
+from fixer_core.pipeline import (
+    DETECTORS, IN_FLIGHT_PER_WORKER, bounded_map, chunk_size_for, resolve_jobs, worker_pool,
+)
+from fixer_core.profiling import Profiler, get_profiler, phase, profiling
+from fixer_core.source import SourceBuffer, StaleSourceError, source_of
+
+
+def _is_future_import(statement):
+    return (isinstance(statement, cst.SimpleStatementLine)
+            and any(isinstance(small, cst.ImportFrom) and isinstance(small.module, cst.Name)
+                    and small.module.value == '__future__' for small in statement.body))
+
+
+def _is_docstring(statement):
+    return (isinstance(statement, cst.SimpleStatementLine) and len(statement.body) == 1
+            and isinstance(statement.body[0], cst.Expr)
+            and isinstance(statement.body[0].value, (cst.SimpleString, cst.ConcatenatedString)))
+
+
+def _imported_modules(module):
+    """
+    Имена модулей, импортированных на верхнем уровне как `import x` (без `as`).
+    """
+    names = set()
+    for statement in module.body:
+        if not isinstance(statement, cst.SimpleStatementLine):
+            continue
+        for small in statement.body:
+            if isinstance(small, cst.Import):
+                for alias in small.names:
+                    if alias.asname is None:
+                        names.add(cst.helpers.get_full_name_for_node(alias.name))
+    return names
+
+
+def ensure_imports(module, module_names):
+    """
+    Добавляем `import <name>` для недостающих модулей - идемпотентно:
+    уже импортированные модули не дублируются. Импорт вставляется после
+    docstring'а модуля и `from __future__ import ...`, иначе код станет невалидным.
+    """
+    missing = [name for name in sorted(module_names) if name not in _imported_modules(module)]
+    if not missing:
+        return module
+
+    body = list(module.body)
+    position = 0
+    if body and _is_docstring(body[0]):
+        position = 1
+    while position < len(body) and _is_future_import(body[position]):
+        position += 1
+
+    new_imports = [
+        cst.SimpleStatementLine(body=[cst.Import(names=[cst.ImportAlias(name=cst.parse_expression(name))])])
+        for name in missing
+    ]
+    return module.with_changes(body=body[:position] + new_imports + body[position:])
+
+
+class ComposedFixer(cst.CSTTransformer):
+    """
+    Прогоняем несколько фиксеров за один обход дерева.
+    Для каждого узла по очереди вызываются leave_<Node> всех фиксеров,
+    в конце модуля добавляются импорты, которые запросили фиксеры
+    (атрибут required_imports у фиксера). При manage_imports=False
+    (дерево - лишь фрагмент файла) импорты только собираются.
+    """
+
+    METADATA_DEPENDENCIES = (PositionProvider,)
+
+    def __init__(self, fixers, manage_imports=True):
+        super().__init__()
+        self.fixers = fixers
+        self.manage_imports = manage_imports
+
+    @property
+    def required_imports(self):
+        required = set()
+        for fixer in self.fixers:
+            required.update(getattr(fixer, 'required_imports', ()))
+        return required
+
+    def visit_Module(self, node):
+        # Метаданные уже посчитаны для этого обхода - отдаём их вложенным фиксерам
+        for fixer in self.fixers:
+            fixer.metadata = self.metadata
+        return True
+
+    def on_visit(self, node):
+        visit_children = super().on_visit(node)
+        method_name = f"visit_{type(node).__name__}"
+        for fixer in self.fixers:
+            method = getattr(fixer, method_name, None)
+            if method is not None and method(node) is False:
+                visit_children = False
+        return visit_children
+
+    def on_leave(self, original_node, updated_node):
+        method_name = f"leave_{type(original_node).__name__}"
+        for fixer in self.fixers:
+            method = getattr(fixer, method_name, None)
+            if method is not None:
+                updated_node = method(original_node, updated_node)
+        return super().on_leave(original_node, updated_node)
+
+    def leave_Module(self, original_node, updated_node):
+        if not self.manage_imports:
+            return updated_node
+        return ensure_imports(updated_node, self.required_imports)
+
+
+def secure_path_for(file):
+    return os.path.join(os.path.dirname(file), f"secure_{os.path.basename(file)}")
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _localize(detector, finding, start, end):
+    """
+    Копия находки в координатах фрагмента [start, end]:
+    номера строк сдвигаются, строки вне фрагмента заменяются на None.
+    Возвращает None, если находка не касается фрагмента.
+    """
+    local = dict(finding)
+    touched = False
+    for field in detector.line_fields:
+        line = finding.get(field)
+        if line is not None and start <= line <= end:
+            local[field] = line - start + 1
+            touched = True
+        else:
+            local[field] = None
+    return local if touched else None
+
+
+def _statement_edits(data, index, file_findings):
+    """
+    Правки для фиксеров без span_edits: LibCST разбирает только инструкции
+    верхнего уровня с находками (их строки сохранил детектор), каждая такая
+    инструкция превращается в одну правку. Возвращает (правки, нужные импорты)
+    или None, если у находок нет нужных координат.
+    """
+    ranges = []
+    for tool, found in file_findings.items():
+        detector = DETECTORS[tool]
+        for finding in found:
+            for line_field, stmt_field in detector.stmt_fields.items():
+                if finding.get(line_field) is None:
+                    continue
+                if finding.get(stmt_field) is None:
+                    return None
+                ranges.append(tuple(finding[stmt_field]))
+
+    edits = []
+    required = set()
+    for start, end in _merge_ranges(ranges):
+        fixers = []
+        for tool, found in file_findings.items():
+            detector = DETECTORS[tool]
+            local = [f for f in (_localize(detector, finding, start, end) for finding in found) if f]
+            if local:
+                fixers.append(detector.fixer_cls(local))
+        begin, finish = index.line_start(start), index.line_end(end)
+        fragment = cst.parse_module(data[begin:finish].decode('utf-8'))
+        composed = ComposedFixer(fixers, manage_imports=False)
+        new_code = MetadataWrapper(fragment, unsafe_skip_copy=True).visit(composed).code
+        edits.append(Edit(begin, finish, new_code.encode('utf-8')))
+        required.update(composed.required_imports)
+    return edits, required
+
+
+def _span_edits(index, fixer_cls, found):
+    """
+    Правки прямо по координатам узлов из ast (lineno/col_offset/end_*),
+    без LibCST. Фиксер описывает их методом span_edits(finding).
+    """
+    edits = []
+    for finding in found:
+        for span, text in fixer_cls.span_edits(finding):
+            start, end = index.span(span)
+            edits.append(Edit(start, end, text.encode('utf-8')))
+    return edits
+
+
+def _header_end(data, index):
+    """
+    Конец начальных комментариев и пустых строк (shebang, coding cookie) -
+    как заголовок модуля в LibCST: импорт вставляется после него.
+    """
+    lineno = 1
+    while lineno <= len(index.line_starts):
+        line = data[index.line_start(lineno):index.line_end(lineno)].strip()
+        if line and not line.startswith(b'#'):
+            break
+        lineno += 1
+    return index.line_start(lineno)
+
+
+def _import_edit(data, index, file_findings, required):
+    """
+    Вставка недостающих `import x` по сведениям о модуле из находок
+    (top_imports, import_line). Возвращает правку, None если вставлять нечего,
+    или False, если сведений о модуле нет.
+    """
+    facts = None
+    for found in file_findings.values():
+        for finding in found:
+            if 'top_imports' in finding:
+                facts = finding
+                break
+    missing = sorted(set(required) - set(facts['top_imports'] if facts else ()))
+    if not missing:
+        return None
+    if facts is None:
+        return False
+
+    newline = b'\r\n' if data[:index.line_end(1)].endswith(b'\r\n') else b'\n'
+    if facts['import_line']:
+        position = index.line_end(facts['import_line'])
+    else:
+        position = _header_end(data, index)
+    text = b''.join(b'import ' + name.encode() + newline for name in missing)
+    if position and not data[:position].endswith(b'\n'):
+        text = newline + text
+    return Edit(position, position, text)
+
+
+def build_edits(data, file_findings):
+    """
+    Набор правок для одного файла: точные правки по span'ам ast, где фиксер
+    это умеет, иначе - переразбор LibCST только нужных инструкций.
+    Правки сводятся вместе с проверкой пересечений (EditConflict).
+    Возвращает None, если точечный фикс невозможен.
+    """
+    index = LineIndex(data)
+    edits = []
+    required = set()
+    cst_findings = {}
+    for tool, found in file_findings.items():
+        fixer_cls = DETECTORS[tool].fixer_cls
+        if hasattr(fixer_cls, 'span_edits'):
+            edits.extend(_span_edits(index, fixer_cls, found))
+            required.update(getattr(fixer_cls, 'span_edit_imports', ()))
+        else:
+            cst_findings[tool] = found
+
+    if cst_findings:
+        statement_edits = _statement_edits(data, index, cst_findings)
+        if statement_edits is None:
+            return None
+        edits.extend(statement_edits[0])
+        required.update(statement_edits[1])
+
+    import_edit = _import_edit(data, index, file_findings, required)
+    if import_edit is False:
+        return None
+    if import_edit is not None:
+        edits.append(import_edit)
+    return merge_edits(edits)
+
+
+def _fix_module(source_code, file_findings):
+    """
+    Полный фикс: разбираем весь модуль и обходим его целиком.
+    """
+    cst_tree = cst.parse_module(source_code)
+    fixers = [DETECTORS[tool].fixer_cls(found) for tool, found in file_findings.items()]
+    return MetadataWrapper(cst_tree, unsafe_skip_copy=True).visit(ComposedFixer(fixers)).code
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Права нового secure_-файла - как у open(..., 'w'): 0o666 с учётом umask
+# (mkstemp создаёт 0o600). Читаем umask один раз, при импорте.
+_FILE_MODE = 0o666 & ~_umask()
+
+
+def write_if_changed(path, data):
+    """
+    Атомарная запись: данные - во временный файл в том же каталоге, затем
+    os.replace, так что читатель видит либо старый файл, либо новый целиком.
+    Если на диске уже ровно эти байты, файл не трогаем (и mtime не меняется)
+    и возвращаем False.
+    """
+    with contextlib.suppress(FileNotFoundError), open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == len(data) and f.read() == data:
+            return False
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, _FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+class FixResult:
+    """
+    Итог исправления одного файла - его воркер возвращает родителю.
+    status: 'fixed' (secure_-файл записан), 'unchanged' (на диске уже тот же результат),
+    'stale' (файл изменился после анализа), 'error' (message - текст ошибки).
+    """
+
+    __slots__ = ('file', 'status', 'secure_path', 'message')
+
+    def __init__(self, file, status, secure_path=None, message=None):
+        self.file = file
+        self.status = status
+        self.secure_path = secure_path
+        self.message = message
+
+    def __reduce__(self):
+        return FixResult, (self.file, self.status, self.secure_path, self.message)
+
+    def report_line(self):
+        if self.status == 'fixed':
+            return f"[FIXED] Corrected file created: {self.secure_path}"
+        if self.status == 'unchanged':
+            return f"[UNCHANGED] {self.secure_path} is already up to date"
+        if self.status == 'stale':
+            return f"[STALE] {self.message}; fix skipped, run the scan again"
+        return f"[ERROR] Failed to process {self.file}: {self.message}"
+
+
+def fix_file(file, file_findings, source=None, targeted=True):
+    """
+    Исправляем один файл: file_findings = {детектор: [находки этого файла]},
+    source - SourceBuffer из анализа (по умолчанию - буфер находок, иначе файл
+    читается заново). При targeted=True правки строятся по координатам находок
+    и применяются одним линейным проходом по буферу; если это невозможно (нет
+    координат, конфликт правок), весь модуль разбирается LibCST и обходится целиком.
+    Правки строятся в UTF-8, результат пишется в исходной кодировке файла.
+    """
+    secure_path = secure_path_for(file)
+    try:
+        if source is None:
+            source = source_of(file_findings)
+        with phase('fix.read'):
+            if source is None:
+                source = SourceBuffer.read(file)
+            if not source.is_current():
+                raise StaleSourceError(f"{file} changed since it was analyzed")
+            data = source.utf8
+
+        new_data = None
+        if targeted:
+            try:
+                with phase('fix.edits'):
+                    edits = build_edits(data, file_findings)
+            except (EditConflict, cst.ParserSyntaxError):
+                edits = None
+            if edits is not None:
+                with phase('fix.apply'):
+                    new_data = apply_edits(data, edits)
+        if new_data is None:
+            with phase('fix.module'):
+                new_data = _fix_module(data.decode('utf-8'), file_findings).encode('utf-8')
+
+        with phase('fix.write'):
+            written = write_if_changed(secure_path, source.encode(new_data))
+        return FixResult(file, 'fixed' if written else 'unchanged', secure_path)
+    except StaleSourceError as e:
+        return FixResult(file, 'stale', secure_path, str(e))
+    except Exception as e:
+        return FixResult(file, 'error', secure_path, str(e))
+
+
+def _fix_chunk(task):
+    """
+    Задача воркера: исправляем пачку файлов. Находки приходят без буферов
+    (Record не сериализует source) - воркер читает файл сам и сверяет его
+    с отпечатком, снятым при анализе.
+    """
+    files, targeted, profile_config = task
+    results = []
+    with profiling(Profiler(*profile_config)) if profile_config else contextlib.nullcontext() as profiler:
+        for file, fingerprint, file_findings in files:
+            source = SourceBuffer(file, fingerprint) if fingerprint else None
+            results.append(fix_file(file, file_findings, source, targeted))
+    return results, profiler.state() if profiler else None
+
+
+def _fix_tasks(groups, chunk_size, targeted, profile_config):
+    # Находки без буферов: пачка в воркер - только пути, отпечатки и координаты
+    chunk = []
+    for file, file_findings in groups:
+        source = source_of(file_findings)
+        chunk.append((file, source.fingerprint if source is not None else None, file_findings))
+        if len(chunk) == chunk_size:
+            yield chunk, targeted, profile_config
+            chunk = []
+    if chunk:
+        yield chunk, targeted, profile_config
+
+
+def _fix_parallel(groups, count, targeted, jobs, max_tasks_per_child=None, max_memory=None):
+    profiler = get_profiler()
+    profile_config = profiler.worker_config() if profiler else None
+    tasks = _fix_tasks(groups, chunk_size_for(count, jobs, max_memory), targeted, profile_config)
+    with worker_pool(jobs, max_tasks_per_child) as pool:
+        # Пачки - в порядке файлов -> тот же вывод, что и без --jobs
+        for results, profile_state in bounded_map(pool, _fix_chunk, tasks, jobs * IN_FLIGHT_PER_WORKER):
+            if profile_state is not None:
+                profiler.merge(profile_state)
+            yield from results
+
+
+def _group_by_file(findings):
+    by_file = defaultdict(dict)
+    for tool, found in findings.items():
+        for finding in found:
+            by_file[finding['file']].setdefault(tool, []).append(finding)
+    return by_file
+
+
+def apply_fixes(findings, targeted=True, jobs=1, max_tasks_per_child=None, max_memory=None):
+    """
+    Единый движок исправлений: findings = {детектор: [находки]} или FindingSpool
+    (находки, уже сгруппированные по файлам, возможно - сброшенные на диск).
+    На каждый файл - один набор правок от всех фиксеров и одна атомарная запись
+    в "secure_<filename>" (если результат отличается от уже записанного).
+    Содержимое берётся из SourceBuffer находок (без повторного чтения);
+    если файл изменился после анализа, фикс не применяется (см. fix_file).
+    При jobs > 1 файлы исправляются пачками в пуле процессов (max_tasks_per_child,
+    max_memory - как у pipeline.iter_scan); итог по каждому файлу (FixResult)
+    печатается родителем в порядке файлов; возвращаем Counter по статусам.
+    """
+    if hasattr(findings, 'by_file'):
+        groups, count = findings.by_file(), len(findings)
+    else:
+        by_file = _group_by_file(findings)
+        groups, count = by_file.items(), len(by_file)
+
+    jobs = min(resolve_jobs(jobs), count)
+    if jobs > 1:
+        fixed = _fix_parallel(groups, count, targeted, jobs, max_tasks_per_child, max_memory)
+    else:
+        fixed = (fix_file(file, file_findings, targeted=targeted) for file, file_findings in groups)
+
+    # Итоги не копим: на огромном дереве это ещё по объекту на файл
+    statuses = Counter()
+    for result in fixed:
+        print(result.report_line())
+        statuses[result.status] += 1
+    return statuses
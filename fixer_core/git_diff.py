@@ -0,0 +1,122 @@
+import os
+import re
+
+_HUNK_RE = re.compile(rb'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+# Экранирование в путях, которые git берёт в кавычки ("b/a\tb.py"), как в C
+_C_ESCAPE_RE = re.compile(rb'\\(?:([0-7]{3})|(.))', re.DOTALL)
+_C_ESCAPES = {b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n', b'v': b'\v', b'f': b'\f', b'r': b'\r'}
+
+
+class GitDiffError(RuntimeError):
+    pass
+
+
+def _git(args, cwd):
+    import subprocess
+
+    try:
+        proc = subprocess.run(['git', '-c', 'core.quotepath=off', *args], cwd=cwd, capture_output=True, check=False)
+    except FileNotFoundError:
+        raise GitDiffError('git executable not found')
+    if proc.returncode != 0:
+        raise GitDiffError(proc.stderr.decode('utf-8', 'replace').strip() or f"git {args[0]} failed")
+    return proc.stdout
+
+
+def _repo_dir(path):
+    path = os.path.abspath(path)
+    return path if os.path.isdir(path) else os.path.dirname(path)
+
+
+def _display_path(top, repo_path, path):
+    """
+    Путь из вывода git (относительно корня репозитория) в том же виде,
+    что и остальные пути сканера: абсолютный, если path абсолютный, иначе от cwd.
+    """
+    full = os.path.join(top, os.fsdecode(repo_path))
+    return full if os.path.isabs(path) else os.path.relpath(full)
+
+
+def changed_python_files(base, path):
+    """
+    .py-файлы внутри path, изменённые в рабочем дереве относительно base
+    (добавленные, изменённые, переименованные; удалённые пропускаем).
+    Используем plumbing-команду git diff-index, без checkout'ов.
+    Неотслеживаемые файлы сюда не попадают.
+    """
+    cwd = _repo_dir(path)
+    top = _git(['rev-parse', '--show-toplevel'], cwd).decode().strip()
+    out = _git(
+        ['diff-index', '--name-only', '-z', '--diff-filter=ACMR', base, '--', os.path.abspath(path)],
+        cwd,
+    )
+    files = []
+    for repo_path in out.split(b'\0'):
+        if repo_path.endswith(b'.py'):
+            fullpath = _display_path(top, repo_path, path)
+            if os.path.isfile(fullpath):
+                files.append(fullpath)
+    return files
+
+
+def _unquote_path(path):
+    """
+    Путь из заголовка diff: имена с табуляцией, кавычками, обратной косой чертой
+    или непечатаемыми символами git выводит в кавычках, с C-экранированием (\\t, \\", \\303).
+    """
+    if not (len(path) >= 2 and path.startswith(b'"') and path.endswith(b'"')):
+        return path
+
+    def unescape(match):
+        octal, char = match.groups()
+        if octal is not None:
+            return bytes([int(octal, 8)])
+        return _C_ESCAPES.get(char, char)
+
+    return _C_ESCAPE_RE.sub(unescape, path[1:-1])
+
+
+def changed_line_ranges(base, path):
+    """
+    {файл: [(первая строка, последняя строка), ...]} для добавленных/изменённых строк,
+    по хункам git diff-index -U0.
+    """
+    cwd = _repo_dir(path)
+    top = _git(['rev-parse', '--show-toplevel'], cwd).decode().strip()
+    out = _git(
+        ['diff-index', '-p', '-U0', '--no-color', '--no-ext-diff', '--diff-filter=ACMR',
+         base, '--', os.path.abspath(path)],
+        cwd,
+    )
+    ranges = {}
+    current = None
+    # '+++ ' - заголовок, только между 'diff --git' и первым хунком: добавленная
+    # строка файла с текстом '++ ...' выглядит так же
+    in_header = False
+    # Только по \n: \r в строках файла заголовки не порождает
+    for line in out.split(b'\n'):
+        if line.startswith(b'diff --git '):
+            in_header = True
+            current = None
+            continue
+        if in_header and line.startswith(b'+++ '):
+            target = _unquote_path(line[4:].rstrip(b'\t'))
+            if target.startswith(b'b/'):
+                current = ranges.setdefault(_display_path(top, target[2:], path), [])
+            continue
+        match = _HUNK_RE.match(line)
+        if match:
+            in_header = False
+        if match and current is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                current.append((start, start + count - 1))
+    return ranges
+
+
+def on_changed_lines(lines, ranges):
+    """
+    Попадает ли хотя бы одна из строк находки в изменённые диапазоны.
+    """
+    return any(start <= line <= end for line in lines if line for start, end in ranges)
@@ -0,0 +1,278 @@
+"""
+Сканирование ревизий git без checkout'а (--revision, --history).
+
+Список файлов ревизии даёт git ls-tree, содержимое blob'ов читается из хранилища
+объектов одним долгоживущим процессом git cat-file --batch и сразу уходит
+в анализаторы (в пул воркеров - уже прочитанным). Blob определяется своим id:
+файл, одинаковый в нескольких ревизиях (или по нескольким путям), анализируется
+один раз, а его находки попадают в отчёт под каждым именем, где он встретился;
+с кэшем находки берутся по id и в следующих запусках.
+Находки помечаются именем в синтаксисе git - 'ревизия:путь от корня репозитория'
+(как в git show v1.0:app/db.py).
+"""
+import contextlib
+import os
+import posixpath
+
+from fixer_core.cache import content_digest
+from fixer_core.discovery import Discovery
+from fixer_core.git_diff import GitDiffError, _git, _repo_dir
+from fixer_core.pipeline import (
+    DETECTORS, IN_FLIGHT_PER_WORKER, _attach_source, _record, bounded_map, chunk_size_for, resolve_jobs,
+    scan_data, worker_pool,
+)
+from fixer_core.profiling import Profiler, get_profiler, phase, profiling
+from fixer_core.source import SourceBuffer
+
+# Режим git-объекта для симлинка: содержимое blob'а - путь, а не код
+_SYMLINK_MODE = b'120000'
+
+
+class GitObjectStore:
+    """
+    Один процесс git cat-file --batch на весь прогон: пишем id объекта,
+    читаем заголовок '<id> <тип> <размер>' и ровно размер байт содержимого.
+    """
+
+    def __init__(self, repo_dir):
+        import subprocess
+
+        try:
+            self._proc = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=repo_dir,
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise GitDiffError('git executable not found')
+
+    def read(self, oid):
+        with phase('git.cat_file'):
+            self._proc.stdin.write(oid.encode() + b'\n')
+            self._proc.stdin.flush()
+            header = self._proc.stdout.readline().split()
+            if len(header) != 3:
+                raise GitDiffError(f"git object {oid} is missing")
+            size = int(header[2])
+            data = self._proc.stdout.read(size)
+            # после содержимого git пишет перевод строки
+            if len(data) != size or self._proc.stdout.read(1) != b'\n':
+                raise GitDiffError(f"git cat-file: truncated object {oid}")
+        return data
+
+    def close(self):
+        if self._proc.stdin:
+            self._proc.stdin.close()
+        self._proc.wait()
+        self._proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _toplevel(path):
+    return _git(['rev-parse', '--show-toplevel'], _repo_dir(path)).decode().strip()
+
+
+def resolve_revisions(path, revisions=(), history=None):
+    """
+    [(метка, коммит)] для сканирования репозитория, в котором лежит path.
+    revisions - ссылки git (теги, ветки, хэши; метка - как передана),
+    history - аргументы git rev-list через пробел (например, 'v1.0..v2.0' или 'main'):
+    все коммиты диапазона от старых к новым, метка - короткий хэш.
+    Коммит, названный несколько раз, сканируется один раз - под первым именем.
+    """
+    top = _toplevel(path)
+    resolved = [(revision, _git(['rev-parse', '--verify', f'{revision}^{{commit}}'], top).decode().strip())
+                for revision in revisions]
+    if history:
+        out = _git(['rev-list', '--reverse', *history.split(), '--'], top)
+        resolved.extend((commit[:12], commit) for commit in out.decode().split())
+    seen = set()
+    unique = []
+    for label, commit in resolved:
+        if commit not in seen:
+            seen.add(commit)
+            unique.append((label, commit))
+    return unique
+
+
+def list_blobs(top, commit, prefix=''):
+    """
+    Генератор (id blob'а, путь от корня репозитория) для файлов коммита внутри
+    prefix (путь от корня; '' - весь репозиторий). Симлинки и подмодули пропускаем.
+    """
+    args = ['ls-tree', '-r', '-z', commit]
+    if prefix:
+        args += ['--', prefix]
+    with phase('git.ls_tree'):
+        out = _git(args, top)
+    for entry in out.split(b'\0'):
+        if not entry:
+            continue
+        meta, _, name = entry.partition(b'\t')
+        mode, kind, oid = meta.split()
+        if kind == b'blob' and mode != _SYMLINK_MODE:
+            yield oid.decode(), os.fsdecode(name)
+
+
+def _repo_prefix(top, path):
+    rel = os.path.relpath(os.path.realpath(path), top)
+    if rel == os.curdir:
+        return ''
+    if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+        raise GitDiffError(f"{path} is outside the repository {top}")
+    return rel.replace(os.sep, '/')
+
+
+def _scanned_relative(repo_path, prefix):
+    # Путь для фильтров Discovery - относительно сканируемого каталога, как при обходе диска
+    if not prefix:
+        return repo_path
+    if repo_path == prefix:
+        # path - отдельный файл
+        return posixpath.basename(repo_path)
+    return repo_path[len(prefix) + 1:]
+
+
+def _scan_blob_chunk(task):
+    """
+    Задача воркера: анализ пачки уже прочитанных blob'ов [(имя, содержимое)]
+    (с профилировщиком - как pipeline._scan_chunk).
+    """
+    blobs, detectors, profile_config = task
+    chunk = []
+    with profiling(Profiler(*profile_config)) if profile_config else contextlib.nullcontext() as profiler:
+        for name, data in blobs:
+            file_scan = scan_data(name, data, detectors)
+            file_scan.results = {detector: found for detector, found in file_scan.results.items() if found}
+            chunk.append(file_scan)
+    return chunk, profiler.state() if profiler else None
+
+
+def _iter_parallel(pool, jobs, blobs, store, detectors, max_memory=None):
+    profiler = get_profiler()
+    profile_config = profiler.worker_config() if profiler else None
+    chunk_size = chunk_size_for(len(blobs), jobs, max_memory)
+    # Содержимое читает родитель (процесс cat-file один), воркеры только анализируют;
+    # bounded_map не даёт прочитать больше, чем помещается в полёт
+    tasks = (([(name, store.read(oid)) for name, oid in blobs[i:i + chunk_size]], detectors, profile_config)
+             for i in range(0, len(blobs), chunk_size))
+    for chunk, profile_state in bounded_map(pool, _scan_blob_chunk, tasks, jobs * IN_FLIGHT_PER_WORKER):
+        if profile_state is not None:
+            profiler.merge(profile_state)
+        for file_scan in chunk:
+            file_scan.results = {name: file_scan.results.get(name, []) for name in detectors}
+            yield file_scan
+
+
+def _relabeled(results, name):
+    # Копии находок под другим именем файла (без буфера с исходником)
+    return {detector: [type(finding)(**dict(finding.as_dict(), file=name)) for finding in found]
+            for detector, found in results.items()}
+
+
+def _scan_blobs(blobs, store, detectors, pool, jobs, cache, stats, error_stream, max_memory, known):
+    """
+    (имя, {детектор: [находки]}) для blobs ([(имя, id)]) по порядку. known - {id: находки}
+    blob'ов, уже разобранных в этом прогоне (None - находок нет): такой blob не анализируется
+    и не ищется в кэше, его находки отдаются под новым именем. Сюда же попадают разобранные здесь.
+    """
+    specs = [DETECTORS[name] for name in detectors]
+    new = []
+    pending = set()
+    for name, oid in blobs:
+        if oid not in known and oid not in pending:
+            pending.add(oid)
+            new.append((name, oid))
+    cached = {}
+    if cache is not None:
+        with phase('scan.cache_lookup'):
+            for _, oid in new:
+                results = cache.lookup_blob(oid, specs)
+                if results is not None:
+                    cached[oid] = results
+    misses = [(name, oid) for name, oid in new if oid not in cached]
+
+    if pool is not None and len(misses) > 1:
+        analyzed = _iter_parallel(pool, jobs, misses, store, detectors, max_memory)
+    else:
+        analyzed = (scan_data(name, store.read(oid), detectors) for name, oid in misses)
+
+    for name, oid in blobs:
+        if oid in known:
+            found = known[oid]
+            if found is None:
+                yield name, {detector: [] for detector in detectors}
+                continue
+            results = _relabeled(found, name)
+            _attach_source(results, _blob_source(name, store.read(oid)))
+            yield name, results
+            continue
+        results = cached.pop(oid, None)
+        if results is not None:
+            if stats is not None:
+                stats.record_cached()
+            if any(results.values()):
+                # В кэше - находки того же blob'а, возможно, из другой ревизии:
+                # имя файла текущее, буфер с содержимым - для фрагментов кода в отчёте
+                for found in results.values():
+                    for finding in found:
+                        finding['file'] = name
+                _attach_source(results, _blob_source(name, store.read(oid)))
+                known[oid] = _relabeled(results, None)
+            else:
+                known[oid] = None
+            yield name, results
+            continue
+        file_scan = next(analyzed)
+        _record(file_scan, detectors, stats, error_stream)
+        if cache is not None and file_scan.fingerprint is not None:
+            with phase('scan.cache_store'):
+                cache.store_blob(oid, specs, file_scan.results)
+        if file_scan.source is not None:
+            _attach_source(file_scan.results, file_scan.source)
+        known[oid] = _relabeled(file_scan.results, None) if any(file_scan.results.values()) else None
+        yield name, file_scan.results
+
+
+def _blob_source(name, data):
+    return SourceBuffer(name, (len(data), 0, content_digest(data)), data)
+
+
+def iter_revision_scan(path, revisions, detectors=('sql', 'eval'), jobs=1, cache=None, stats=None,
+                       error_stream=None, discovery=None, max_memory=None, max_tasks_per_child=None):
+    """
+    Генератор ('ревизия:путь', {детектор: [находки]}) - как pipeline.iter_scan, но для
+    .py-файлов внутри path в ревизиях revisions ([(метка, коммит)], см. resolve_revisions),
+    по порядку ревизий. Рабочее дерево не читается и не меняется; discovery применяет
+    исключения к путям внутри path. Каждый blob анализируется один раз, а его находки
+    отдаются под каждым 'ревизия:путь', где он встретился. Остальные опции - как у iter_scan.
+    """
+    detectors = tuple(detectors)
+    jobs = resolve_jobs(jobs)
+    discovery = discovery or Discovery()
+    top = _toplevel(path)
+    prefix = _repo_prefix(top, path)
+    # id blob'а -> находки (без буферов) или None; для повторов blob'а в этом прогоне
+    known = {}
+    seen = set()
+    unique = duplicates = 0
+    with GitObjectStore(top) as store, \
+            worker_pool(jobs, max_tasks_per_child) if jobs > 1 else contextlib.nullcontext() as pool:
+        # Ревизия за ревизией: находки первой печатаются, пока следующие ещё не перечислены
+        for label, commit in revisions:
+            blobs = []
+            for oid, repo_path in list_blobs(top, commit, prefix):
+                if not discovery.keep_path(_scanned_relative(repo_path, prefix)):
+                    continue
+                if oid in seen:
+                    duplicates += 1
+                else:
+                    seen.add(oid)
+                    unique += 1
+                blobs.append((f"{label}:{repo_path}", oid))
+            yield from _scan_blobs(blobs, store, detectors, pool, jobs, cache, stats, error_stream, max_memory,
+                                   known)
+    if stats is not None:
+        stats.record_revisions(len(revisions), unique, duplicates)
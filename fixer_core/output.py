@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+
+from fixer_core.pipeline import DETECTORS
+
+# Сколько строк копим перед одной записью в поток
+JSONL_BUFFER_LINES = 512
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+REPORT_FORMAT_VERSION = 1
+
+
+class _BufferedWriter:
+    """
+    Запись в поток через буфер: в поток уходят пачки строк, а не каждая строка
+    отдельно. Отчёт пишется по мере поступления находок - в памяти только буфер.
+    """
+
+    def __init__(self, stream=None, buffer_lines=JSONL_BUFFER_LINES):
+        self.stream = stream or sys.stdout
+        self.buffer_lines = buffer_lines
+        self._lines = []
+
+    def _emit(self, text):
+        self._lines.append(text)
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self.stream.write(''.join(self._lines))
+            self._lines.clear()
+        self.stream.flush()
+
+    def add_file(self, path):
+        """
+        Очередной просканированный файл (с находками или без).
+        """
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonLinesWriter(_BufferedWriter):
+    """
+    Пишем находки в формате JSON Lines (одна находка - одна строка).
+    detectors - для единообразия с другими писателями отчётов (не нужен).
+    """
+
+    def __init__(self, stream=None, buffer_lines=JSONL_BUFFER_LINES, detectors=()):
+        super().__init__(stream, buffer_lines)
+
+    def write(self, record):
+        self._emit(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def add(self, tool, finding):
+        self.write(finding_record(tool, finding))
+
+
+class JsonReportWriter(_BufferedWriter):
+    """
+    Один JSON-документ на прогон:
+        {"format": "autofixer-report", "version": 1,
+         "findings": [{"tool": ..., ...}, ...],
+         "summary": {"files": N, "findings": {детектор: число}}}
+    Массив findings пишется потоком, итоги (счётчики) - в конце.
+    """
+
+    def __init__(self, stream=None, buffer_lines=JSONL_BUFFER_LINES, detectors=()):
+        super().__init__(stream, buffer_lines)
+        self.files = 0
+        self.count = 0
+        self.counts = {name: 0 for name in detectors}
+        self._emit(f'{{"format": "autofixer-report", "version": {REPORT_FORMAT_VERSION}, "findings": [')
+
+    def add_file(self, path):
+        self.files += 1
+
+    def add(self, tool, finding):
+        self._emit((',\n' if self.count else '\n') + json.dumps(finding_record(tool, finding), ensure_ascii=False))
+        self.count += 1
+        self.counts[tool] = self.counts.get(tool, 0) + 1
+
+    def close(self):
+        summary = {'files': self.files, 'findings': self.counts}
+        self._emit(f'\n], "summary": {json.dumps(summary)}}}\n')
+        self.flush()
+
+
+class SarifWriter(_BufferedWriter):
+    """
+    Отчёт SARIF 2.1.0: один run, правила - детекторы прогона (rule_id, description,
+    severity из DETECTORS). Каждая находка - result со строкой location_field детектора;
+    остальные строки находки (например, присвоение запроса) - relatedLocations,
+    все поля находки - в properties. Пути - относительно текущего каталога
+    (uriBaseId SRCROOT), файлы вне его - абсолютными file:// URI.
+    Массив results пишется потоком.
+    """
+
+    def __init__(self, stream=None, buffer_lines=JSONL_BUFFER_LINES, detectors=()):
+        super().__init__(stream, buffer_lines)
+        self.root = os.getcwd()
+        self._root_prefix = os.path.join(self.root, '')
+        self.rule_index = {name: index for index, name in enumerate(detectors)}
+        self.count = 0
+        self._last_file = None
+        self._last_artifact = None
+        rules = [
+            {
+                'id': DETECTORS[name].rule_id,
+                'shortDescription': {'text': DETECTORS[name].description},
+                'defaultConfiguration': {'level': DETECTORS[name].severity},
+            }
+            for name in detectors
+        ]
+        driver = {'name': 'autofixer', 'rules': rules}
+        # pathlib и urllib.parse нужны только SARIF - не грузим их при каждом запуске
+        import pathlib
+
+        base_ids = {'SRCROOT': {'uri': pathlib.Path(self.root).as_uri() + '/'}}
+        self._emit(f'{{"$schema": "{SARIF_SCHEMA}", "version": "2.1.0", "runs": [{{'
+                   f'"tool": {{"driver": {json.dumps(driver, ensure_ascii=False)}}}, '
+                   f'"originalUriBaseIds": {json.dumps(base_ids, ensure_ascii=False)}, "results": [')
+
+    def _artifact(self, file):
+        # Находки приходят сгруппированными по файлам - помним последний
+        if file != self._last_file:
+            import pathlib
+            from urllib.parse import quote
+
+            path = os.path.abspath(file)
+            if path.startswith(self._root_prefix):
+                relative = path[len(self._root_prefix):]
+                self._last_artifact = {'uri': quote(relative.replace(os.sep, '/')), 'uriBaseId': 'SRCROOT'}
+            else:
+                self._last_artifact = {'uri': pathlib.Path(path).as_uri()}
+            self._last_file = file
+        return self._last_artifact
+
+    def _location(self, file, line):
+        return {'physicalLocation': {'artifactLocation': self._artifact(file), 'region': {'startLine': line}}}
+
+    def add(self, tool, finding):
+        detector = DETECTORS[tool]
+        record = finding_record(tool, finding)
+        line = finding[detector.location_field]
+        result = {
+            'ruleId': detector.rule_id,
+            'ruleIndex': self.rule_index[tool],
+            'level': detector.severity,
+            'message': {'text': detector.describe(finding)},
+            'locations': [self._location(finding['file'], line)],
+        }
+        related = sorted({other for other in detector.finding_lines(finding) if other and other != line})
+        if related:
+            result['relatedLocations'] = [dict(self._location(finding['file'], other), id=index)
+                                          for index, other in enumerate(related, 1)]
+        result['properties'] = record
+        self._emit((',\n' if self.count else '\n') + json.dumps(result, ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        self._emit('\n], "invocations": [{"executionSuccessful": true}]}]}\n')
+        self.flush()
+
+
+# --format -> класс писателя отчёта
+REPORT_WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'json': JsonReportWriter,
+    'sarif': SarifWriter,
+}
+
+
+def finding_record(tool, finding):
+    """
+    JSON-совместимый словарь для находки детектора tool ('sql', 'eval').
+    """
+    record = {'tool': tool}
+    record.update(DETECTORS[tool].to_record(finding))
+    return record
+
+
+def emit_report(results_iter, output_format='jsonl', detectors=('sql', 'eval'), stream=None, spool=None):
+    """
+    Потоково пишем находки из iter_scan() в отчёт формата output_format
+    (jsonl, json, sarif) - документ не собирается в памяти целиком.
+    spool (FindingSpool) - откладываем находки туда, по файлам (для --fix);
+    иначе находки не накапливаются в памяти.
+    """
+    with REPORT_WRITERS[output_format](stream, detectors=detectors) as writer:
+        for fullpath, results in results_iter:
+            writer.add_file(fullpath)
+            for tool, findings in results.items():
+                for finding in findings:
+                    writer.add(tool, finding)
+            if spool is not None:
+                spool.add(fullpath, results)
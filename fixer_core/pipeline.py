@@ -0,0 +1,492 @@
+import ast
+import collections
+import contextlib
+import importlib
+import os
+import sys
+import time
+
+from fixer_core.cache import content_digest
+from fixer_core.discovery import iter_python_files
+from fixer_core.git_diff import on_changed_lines
+from fixer_core.prefilter import may_match, source_view
+from fixer_core.profiling import Profiler, get_profiler, phase, profiling, reset_inherited
+from fixer_core.rules import FileContext, walk
+from fixer_core.source import SourceBuffer
+
+# Общая версия правил; поднимаем при изменениях, влияющих на все детекторы
+RULES_VERSION = 1
+
+
+def _import_object(path):
+    module_name, attr = path.split(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class Detector:
+    """
+    Описание детектора: какое правило (fixer_core.rules.Rule) запускать, в каком
+    атрибуте правила лежат найденные результаты (записи класса record_path,
+    fixer_core.records.Record) и какой CSTTransformer их исправляет.
+    Правила всех активных детекторов прогоняются по дереву за один общий обход.
+    Классы импортируются лениво, по строке 'module:Class'.
+    version поднимаем при любом изменении логики детектора - это сбрасывает кэш.
+    line_fields - ключи находки с номерами строк (для фильтра по изменённым строкам).
+    stmt_fields - {ключ строки: ключ (start, end) инструкции верхнего уровня с этой строкой};
+    по ним точечный фикс понимает, какие куски файла разбирать LibCST.
+    trigger_tokens - байтовые подстроки, без которых детектор ничего не найдёт
+    (файлы без них не парсятся ради этого детектора).
+    rule_id / description / severity - правило в отчётах (SARIF: ruleId, shortDescription,
+    level), location_field - ключ строки, на которую указывает находка в отчёте.
+    linker_path - 'module:function' межмодульного прохода (--interprocedural) или None:
+    функция получает каталог проекта и возвращает {абсолютный путь: [находки]} -
+    находки, которые не видны в пределах одного файла.
+    """
+
+    def __init__(self, name, rule_path, fixer_path, record_path, results_attr, version, line_fields,
+                 stmt_fields=None, trigger_tokens=(), rule_id=None, description='', severity='warning',
+                 location_field=None, linker_path=None):
+        self.name = name
+        self.rule_path = rule_path
+        self.fixer_path = fixer_path
+        self.record_path = record_path
+        self.results_attr = results_attr
+        self.version = version
+        self.line_fields = line_fields
+        self.stmt_fields = stmt_fields or {}
+        self.trigger_tokens = trigger_tokens
+        self.rule_id = rule_id or name
+        self.description = description
+        self.severity = severity
+        self.location_field = location_field or line_fields[0]
+        self.linker_path = linker_path
+        self._rule_cls = None
+        self._record_cls = None
+
+    @property
+    def cache_version(self):
+        return f"{RULES_VERSION}.{self.version}"
+
+    @property
+    def rule_cls(self):
+        if self._rule_cls is None:
+            self._rule_cls = _import_object(self.rule_path)
+        return self._rule_cls
+
+    @property
+    def record_cls(self):
+        if self._record_cls is None:
+            self._record_cls = _import_object(self.record_path)
+        return self._record_cls
+
+    @property
+    def fixer_cls(self):
+        return _import_object(self.fixer_path)
+
+    def finding_lines(self, finding):
+        return [finding[field] for field in self.line_fields]
+
+    def to_record(self, finding):
+        return self.rule_cls.to_record(finding)
+
+    def describe(self, finding):
+        return self.rule_cls.describe(finding)
+
+
+DETECTORS = {
+    'sql': Detector(
+        'sql',
+        rule_path='sql_injection_fixer_v2.test_sql_fixer:SQLInjectionVisitor',
+        fixer_path='sql_injection_fixer_v2.cst_fixer:SQLInjectionFixer',
+        record_path='sql_injection_fixer_v2.test_sql_fixer:SQLInjection',
+        results_attr='vulnerabilities',
+        version=9,
+        line_fields=('lineno_assign', 'lineno_execute'),
+        stmt_fields={'lineno_assign': 'stmt_assign', 'lineno_execute': 'stmt_execute'},
+        # находка - всегда вызов execute
+        trigger_tokens=(b'execute',),
+        rule_id='sql-injection',
+        description='SQL query built from data by concatenation or string formatting',
+        severity='error',
+        location_field='lineno_execute',
+        linker_path='sql_injection_fixer_v2.interproc:link_project',
+    ),
+    'eval': Detector(
+        'eval',
+        rule_path='eval_fixer.eval_fixer:EvalVisitor',
+        fixer_path='eval_fixer.cst_fixer:EvalFixer',
+        record_path='eval_fixer.eval_fixer:EvalCall',
+        results_attr='eval_calls',
+        version=4,
+        line_fields=('lineno',),
+        stmt_fields={'lineno': 'stmt'},
+        trigger_tokens=(b'eval',),
+        rule_id='eval-call',
+        description='Call to eval(); ast.literal_eval() is a safe replacement for literals',
+    ),
+}
+
+# Сколько файлов отдаём воркеру за одну задачу (верхняя граница)
+MAX_CHUNK_SIZE = 64
+# То же при --max-memory: меньше находок и буферов на задачу в полёте
+BOUNDED_CHUNK_SIZE = 16
+# Сколько задач на воркер может быть отправлено, но не забрано родителем
+IN_FLIGHT_PER_WORKER = 2
+# Через сколько задач воркер перезапускается при --max-memory (если не задано явно)
+BOUNDED_TASKS_PER_CHILD = 50
+
+
+def resolve_jobs(jobs):
+    """
+    Превращаем значение --jobs ('auto', '4', 4, None) в число процессов.
+    """
+    if jobs in (None, ''):
+        return 1
+    if jobs == 'auto':
+        return os.cpu_count() or 1
+    jobs = int(jobs)
+    if jobs < 1:
+        raise ValueError(f"--jobs must be >= 1 or 'auto', got {jobs}")
+    return jobs
+
+
+class FileScan:
+    """
+    Результат сканирования одного файла.
+    results     - {имя детектора: [находки]}
+    fingerprint - (size, mtime_ns, sha256) прочитанного содержимого
+                  или None, если результат нельзя кэшировать (синтаксическая ошибка)
+    skipped     - детекторы, отсеянные префильтром (для них ast не строился)
+    error       - текст ошибки разбора; печатает родительский процесс, по порядку файлов
+    source      - SourceBuffer с прочитанным содержимым (только если есть находки)
+    """
+
+    __slots__ = ('path', 'results', 'fingerprint', 'skipped', 'error', 'source')
+
+    def __init__(self, path, results, fingerprint=None, skipped=(), error=None, source=None):
+        self.path = path
+        self.results = results
+        self.fingerprint = fingerprint
+        self.skipped = skipped
+        self.error = error
+        self.source = source
+
+
+def scan_file(fullpath, detectors):
+    """
+    Читаем и парсим файл один раз, затем прогоняем по дереву все детекторы.
+    Детекторы, чьих токенов-триггеров нет в файле, пропускаем;
+    если не осталось ни одного, ast.parse не вызывается вовсе.
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        return _scan_file(fullpath, detectors)
+    started = time.perf_counter()
+    file_scan = _scan_file(fullpath, detectors)
+    size = file_scan.fingerprint[0] if file_scan.fingerprint else os.path.getsize(fullpath)
+    profiler.add_file(fullpath, size, time.perf_counter() - started)
+    return file_scan
+
+
+def scan_data(path, data, detectors):
+    """
+    Как scan_file, но содержимое уже в памяти (например, blob из git):
+    path - имя файла в находках и сообщениях, диск не читается.
+    fingerprint результата - (размер, 0, sha256).
+    """
+    profiler = get_profiler()
+    started = time.perf_counter() if profiler is not None else None
+    active = [name for name in detectors if may_match(data, DETECTORS[name].trigger_tokens)]
+    file_scan = _scan_source(path, data if active else None, (len(data), 0, content_digest(data)),
+                             detectors, active)
+    if profiler is not None:
+        profiler.add_file(path, len(data), time.perf_counter() - started)
+    return file_scan
+
+
+def _scan_file(fullpath, detectors):
+    with phase('scan.read'), open(fullpath, 'rb') as f:
+        st = os.fstat(f.fileno())
+        with source_view(f, st.st_size) as view:
+            active = [name for name in detectors if may_match(view, DETECTORS[name].trigger_tokens)]
+            digest = content_digest(view)
+            data = bytes(view) if active else None
+    return _scan_source(fullpath, data, (st.st_size, st.st_mtime_ns, digest), detectors, active)
+
+
+def _scan_source(fullpath, data, fingerprint, detectors, active):
+    # Разбор и правила для прочитанного содержимого; active - детекторы, прошедшие префильтр
+    results = {name: [] for name in detectors}
+    skipped = tuple(name for name in detectors if name not in active)
+    if not active:
+        return FileScan(fullpath, results, fingerprint, skipped)
+
+    source = SourceBuffer(fullpath, fingerprint, data)
+    try:
+        with phase('scan.parse'):
+            # Кодировка по PEP 263; ast получает текст, его смещения - в UTF-8 (source.utf8)
+            tree = ast.parse(source.text, filename=fullpath)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        return FileScan(fullpath, results, None, skipped, error=f"[SYNTAX ERROR] {fullpath}: {e}")
+    results.update(run_rules(tree, fullpath, active))
+    # Находки ссылаются только на координаты - дерево больше не нужно
+    del tree
+    if not any(results.values()):
+        source = None
+    return FileScan(fullpath, results, fingerprint, skipped, source=source)
+
+
+def run_rules(tree, filename, detectors, context=None, extra=None):
+    """
+    Правила детекторов - за один обход дерева, с общим контекстом.
+    extra - {имя: правило} - ещё правила в том же обходе (созданные с тем же context),
+    их результаты вызывающий забирает сам.
+    При профилировании копим по правилам время, число вызовов обработчиков и находки.
+    """
+    if context is None:
+        context = FileContext()
+    rules = {name: DETECTORS[name].rule_cls(filename, context) for name in detectors}
+    if extra:
+        rules.update(extra)
+    profiler = get_profiler()
+    with phase('scan.visit'):
+        counters = walk(tree, rules, context, timed=profiler is not None)
+    results = {name: getattr(rules[name], DETECTORS[name].results_attr) for name in detectors}
+    if counters is not None:
+        for name, (seconds, hits) in counters.items():
+            profiler.add_rule(name, seconds, hits, len(results.get(name, ())))
+    return results
+
+
+def _scan_chunk(task):
+    """
+    Задача воркера: сканируем пачку файлов.
+    Пустые результаты не пересылаем. При включённом профилировании
+    вместе с пачкой возвращаем состояние профилировщика воркера.
+    """
+    paths, detectors, profile_config = task
+    chunk = []
+    with profiling(Profiler(*profile_config)) if profile_config else contextlib.nullcontext() as profiler:
+        for fullpath in paths:
+            file_scan = scan_file(fullpath, detectors)
+            file_scan.results = {name: found for name, found in file_scan.results.items() if found}
+            chunk.append(file_scan)
+    return chunk, profiler.state() if profiler else None
+
+
+def worker_pool(jobs, max_tasks_per_child=None):
+    """
+    Пул процессов для анализа и исправлений. max_tasks_per_child - через сколько
+    задач воркер заменяется новым (память, набранная воркером, возвращается системе);
+    требует Python 3.11+ (там пул запускает воркеры через spawn), на старых версиях
+    воркеры не перезапускаются.
+    """
+    # multiprocessing нужен только при --jobs > 1 - не грузим его при старте
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = {}
+    if max_tasks_per_child and sys.version_info >= (3, 11):
+        options['max_tasks_per_child'] = max_tasks_per_child
+    return ProcessPoolExecutor(max_workers=jobs, initializer=reset_inherited, **options)
+
+
+def bounded_map(pool, func, tasks, window):
+    """
+    Как pool.map, но с обратным давлением: отправлено и не забрано не больше
+    window задач - следующая уходит в пул, только когда родитель забрал результат
+    самой старой. Результаты - в порядке задач; tasks может быть генератором.
+    """
+    pending = collections.deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(func, task))
+    while pending:
+        yield pending.popleft().result()
+
+
+def chunk_size_for(count, jobs, max_memory=None):
+    limit = BOUNDED_CHUNK_SIZE if max_memory else MAX_CHUNK_SIZE
+    return max(1, min(limit, count // (jobs * 4)))
+
+
+def _iter_parallel(files, detectors, jobs, max_memory=None, max_tasks_per_child=None):
+    profiler = get_profiler()
+    profile_config = profiler.worker_config() if profiler else None
+    chunk_size = chunk_size_for(len(files), jobs, max_memory)
+    tasks = ((files[i:i + chunk_size], detectors, profile_config) for i in range(0, len(files), chunk_size))
+    with worker_pool(jobs, max_tasks_per_child) as pool:
+        # Результаты в порядке задач -> детерминированный вывод
+        for chunk, profile_state in bounded_map(pool, _scan_chunk, tasks, jobs * IN_FLIGHT_PER_WORKER):
+            if profile_state is not None:
+                profiler.merge(profile_state)
+            for file_scan in chunk:
+                file_scan.results = {name: file_scan.results.get(name, []) for name in detectors}
+                yield file_scan
+
+
+def _iter_serial(files, detectors):
+    for fullpath in files:
+        yield scan_file(fullpath, detectors)
+
+
+def _attach_source(results, source):
+    """
+    Находки ссылаются на буфер с содержимым файла: фикс не перечитывает диск.
+    Делаем это после записи в кэш - буфер в кэш не попадает.
+    """
+    for found in results.values():
+        for finding in found:
+            finding['source'] = source
+
+
+def _linked_findings(path, detectors, **link_options):
+    """
+    Межмодульный проход детекторов с linker_path - до анализа файлов:
+    {абсолютный путь: {детектор: [находки]}}. Линкеру передаются все детекторы
+    прогона: разобрав файл, он может заодно закэшировать их находки.
+    """
+    linked = {}
+    for name in detectors:
+        if DETECTORS[name].linker_path is None:
+            continue
+        link = _import_object(DETECTORS[name].linker_path)
+        for fullpath, found in link(path, detectors, **link_options).items():
+            linked.setdefault(fullpath, {})[name] = found
+    return linked
+
+
+def _merge_linked(fullpath, results, linked):
+    # Межмодульные находки файла - после его собственных
+    extra = linked.pop(os.path.abspath(fullpath), None)
+    if extra is None:
+        return
+    for name, found in extra.items():
+        for finding in found:
+            finding['file'] = fullpath
+        results[name] = results.get(name, []) + found
+
+
+def _record(file_scan, detectors, stats, error_stream):
+    if file_scan.error:
+        print(file_scan.error, file=error_stream or sys.stdout)
+    if stats is not None:
+        stats.record_scan(file_scan, detectors)
+
+
+def iter_scan(path, detectors=('sql', 'eval'), jobs=1, cache=None, files=None, line_filter=None,
+              stats=None, error_stream=None, discovery=None, max_memory=None, max_tasks_per_child=None,
+              interprocedural=False, revisions=None):
+    """
+    Генератор: отдаём (файл, {детектор: [находки]}) по мере готовности,
+    в порядке обхода каталога. Файлы, чьи находки есть в кэше, не читаются и не парсятся.
+    files - готовый список файлов вместо обхода path (например, из git diff),
+    discovery - Discovery с исключениями для обхода path (по умолчанию - стандартные),
+    line_filter - {файл: [(start, end), ...]}: оставляем только находки на этих строках,
+    stats - ScanStats, куда складываются счётчики прогона,
+    error_stream - куда печатать ошибки разбора (по умолчанию stdout),
+    max_memory - бюджет памяти в байтах (--max-memory): задачи воркеров мельче,
+    max_tasks_per_child - через сколько задач перезапускать воркер,
+    interprocedural - сначала межмодульный проход по всему path (Detector.linker_path):
+    его находки добавляются к находкам своих файлов,
+    revisions - [(метка, коммит)] (git_objects.resolve_revisions): вместо файлов
+    на диске сканируем blob'ы этих ревизий внутри path прямо из хранилища объектов git
+    (см. git_objects.iter_revision_scan).
+    При jobs > 1 в полёте не больше IN_FLIGHT_PER_WORKER задач на воркер:
+    пока родитель не забрал результаты, новые файлы не анализируются.
+    """
+    if revisions is not None:
+        # git_objects импортирует конвейер - загружаем его только для этого режима
+        from fixer_core.git_objects import iter_revision_scan
+
+        yield from iter_revision_scan(path, revisions, detectors, jobs=jobs, cache=cache, stats=stats,
+                                      error_stream=error_stream, discovery=discovery, max_memory=max_memory,
+                                      max_tasks_per_child=max_tasks_per_child)
+        return
+    if line_filter is not None:
+        for fullpath, results in iter_scan(path, detectors, jobs, cache, files,
+                                           stats=stats, error_stream=error_stream, discovery=discovery,
+                                           max_memory=max_memory, max_tasks_per_child=max_tasks_per_child,
+                                           interprocedural=interprocedural):
+            ranges = line_filter.get(fullpath, ())
+            yield fullpath, {
+                name: [f for f in found if on_changed_lines(DETECTORS[name].finding_lines(f), ranges)]
+                for name, found in results.items()
+            }
+        return
+
+    detectors = tuple(detectors)
+    jobs = resolve_jobs(jobs)
+    specs = [DETECTORS[name] for name in detectors]
+    linked = None
+    if interprocedural:
+        linked = _linked_findings(path, detectors, cache=cache, jobs=jobs, discovery=discovery, stats=stats,
+                                  max_memory=max_memory, max_tasks_per_child=max_tasks_per_child)
+    if files is None:
+        files = iter_python_files(path, discovery)
+
+    if cache is None and jobs == 1:
+        for file_scan in _iter_serial(files, detectors):
+            _record(file_scan, detectors, stats, error_stream)
+            if linked:
+                _merge_linked(file_scan.path, file_scan.results, linked)
+            if file_scan.source is not None:
+                _attach_source(file_scan.results, file_scan.source)
+            yield file_scan.path, file_scan.results
+        return
+
+    with phase('scan.walk'):
+        files = list(files)
+    cached = {}
+    if cache is not None:
+        with phase('scan.cache_lookup'):
+            for fullpath in files:
+                hit = cache.lookup(fullpath, specs)
+                if hit is not None:
+                    results, fingerprint = hit
+                    if any(results.values()):
+                        # Содержимое дочитается при фиксе, со сверкой хэша
+                        _attach_source(results, SourceBuffer(fullpath, fingerprint))
+                    cached[fullpath] = results
+    misses = [fullpath for fullpath in files if fullpath not in cached]
+
+    if jobs > 1 and len(misses) > 1:
+        analyzed = _iter_parallel(misses, detectors, min(jobs, len(misses)), max_memory, max_tasks_per_child)
+    else:
+        analyzed = _iter_serial(misses, detectors)
+
+    # Непроанализированные файлы идут в том же порядке, что и в files
+    for fullpath in files:
+        if fullpath in cached:
+            if stats is not None:
+                stats.record_cached()
+            if linked:
+                _merge_linked(fullpath, cached[fullpath], linked)
+            yield fullpath, cached[fullpath]
+            continue
+        file_scan = next(analyzed)
+        _record(file_scan, detectors, stats, error_stream)
+        if cache is not None and file_scan.fingerprint is not None:
+            with phase('scan.cache_store'):
+                cache.store(fullpath, file_scan.fingerprint, specs, file_scan.results)
+        if linked:
+            _merge_linked(fullpath, file_scan.results, linked)
+        if file_scan.source is not None:
+            _attach_source(file_scan.results, file_scan.source)
+        yield fullpath, file_scan.results
+
+
+def scan(path, detectors=('sql', 'eval'), **scan_options):
+    """
+    Общий конвейер: один обход каталога, одно чтение и один ast.parse на файл.
+    При jobs > 1 файлы раздаются пачками в пул процессов,
+    при заданном cache неизменившиеся файлы берутся из кэша
+    (остальные опции - см. iter_scan).
+    Результаты сгруппированы по детекторам: {'sql': [...], 'eval': [...]}.
+    """
+    detectors = tuple(detectors)
+    grouped = {name: [] for name in detectors}
+    for _, results in iter_scan(path, detectors, **scan_options):
+        for name, findings in results.items():
+            grouped[name].extend(findings)
+    return grouped
@@ -0,0 +1,29 @@
+import contextlib
+import mmap
+
+# Файлы от этого размера просматриваем через mmap, не копируя в память целиком
+MMAP_THRESHOLD = 1024 * 1024
+
+
+@contextlib.contextmanager
+def source_view(f, size):
+    """
+    Содержимое открытого в 'rb' файла: bytes для небольших файлов,
+    mmap (только чтение) для крупных.
+    """
+    if size < MMAP_THRESHOLD:
+        yield f.read()
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        yield view
+
+
+def may_match(view, tokens):
+    """
+    Дешёвая побайтовая проверка перед ast.parse: детектор может что-то найти,
+    только если в файле есть хотя бы один из его токенов-триггеров.
+    Пустой набор токенов означает "проверять всегда".
+    """
+    if not tokens:
+        return True
+    return any(view.find(token) != -1 for token in tokens)
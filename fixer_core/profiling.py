@@ -0,0 +1,229 @@
+import contextlib
+import heapq
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Пустой контекст для выключенного профилирования (переиспользуется, без аллокаций)
+_NULL_PHASE = contextlib.nullcontext()
+
+_active = None
+
+
+def peak_rss(children=False):
+    """
+    Пик RSS текущего процесса (children=True - завершившихся дочерних, максимум по ним)
+    в байтах (ru_maxrss: КиБ в Linux, байты в macOS); 0, если неизвестен.
+    """
+    if resource is None:
+        return 0
+    scale = 1 if sys.platform == 'darwin' else 1024
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss * scale
+
+
+class Profiler:
+    """
+    Инструментация прогона (--timings, --trace-memory, --profile):
+    - wall/CPU-время и число вызовов по фазам (walk, read, parse, visit, fix...)
+      и пик RSS, до которого процесс дорос внутри фазы (какая фаза задаёт потолок памяти);
+    - обработанные файлы и байты;
+    - top-N самых медленных файлов;
+    - по правилам детекторов: время в обработчиках, число их вызовов и находки;
+    - пик памяти по tracemalloc (если включён trace_memory);
+    - данные cProfile, собранные во всех процессах (если задан cprofile_dir).
+    Состояние воркера передаётся родителю через state() / merge().
+    """
+
+    def __init__(self, top_n=10, trace_memory=False, cprofile_dir=None):
+        self.top_n = top_n
+        self.trace_memory = trace_memory
+        self.cprofile_dir = cprofile_dir
+        self.phases = {}
+        self.files = 0
+        self.bytes = 0
+        self.slow_files = []
+        self.rules = {}
+        self.memory_peak = 0
+        self.worker_rss = 0
+        self.profile_dumps = []
+        self._cprofile = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = peak_rss()
+        try:
+            yield
+        finally:
+            record = self.phases.get(name)
+            if record is None:
+                record = self.phases[name] = [0.0, 0.0, 0, 0]
+            record[0] += time.perf_counter() - wall
+            record[1] += time.process_time() - cpu
+            record[2] += 1
+            # Пик вырос внутри фазы - значит, его задала она
+            new_rss = peak_rss()
+            if new_rss > rss:
+                record[3] = max(record[3], new_rss)
+
+    def add_file(self, path, size, seconds):
+        self.files += 1
+        self.bytes += size
+        item = (seconds, path)
+        if len(self.slow_files) < self.top_n:
+            heapq.heappush(self.slow_files, item)
+        elif item > self.slow_files[0]:
+            heapq.heapreplace(self.slow_files, item)
+
+    def add_rule(self, name, seconds, hits, findings):
+        record = self.rules.get(name)
+        if record is None:
+            record = self.rules[name] = [0.0, 0, 0]
+        record[0] += seconds
+        record[1] += hits
+        record[2] += findings
+
+    def state(self):
+        return {
+            'phases': self.phases,
+            'files': self.files,
+            'bytes': self.bytes,
+            'slow_files': self.slow_files,
+            'rules': self.rules,
+            'memory_peak': self.memory_peak,
+            'rss_peak': max(peak_rss(), self.worker_rss),
+            'profile_dumps': self.profile_dumps,
+        }
+
+    def merge(self, state):
+        for name, (wall, cpu, calls, rss) in state['phases'].items():
+            record = self.phases.setdefault(name, [0.0, 0.0, 0, 0])
+            record[0] += wall
+            record[1] += cpu
+            record[2] += calls
+            record[3] = max(record[3], rss)
+        for name, (seconds, hits, findings) in state['rules'].items():
+            self.add_rule(name, seconds, hits, findings)
+        self.files += state['files']
+        self.bytes += state['bytes']
+        self.slow_files = heapq.nlargest(self.top_n, self.slow_files + state['slow_files'])
+        heapq.heapify(self.slow_files)
+        self.memory_peak = max(self.memory_peak, state['memory_peak'])
+        self.worker_rss = max(self.worker_rss, state['rss_peak'])
+        self.profile_dumps.extend(state['profile_dumps'])
+
+    def worker_config(self):
+        """
+        Что нужно воркеру, чтобы завести собственный Profiler.
+        """
+        return self.top_n, self.trace_memory, self.cprofile_dir
+
+    def report_lines(self):
+        lines = ["[TIMINGS] phase                       wall, s      cpu, s     calls  peak RSS, MiB"]
+        for name, (wall, cpu, calls, rss) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            rss_text = f"{rss / (1024 * 1024):.1f}" if rss else '-'
+            lines.append(f"[TIMINGS] {name:<24} {wall:>10.3f} {cpu:>11.3f} {calls:>9} {rss_text:>14}")
+        if self.rules:
+            lines.append("[TIMINGS] rule                        time, s        hits  findings")
+            for name, (seconds, hits, findings) in sorted(self.rules.items(), key=lambda item: -item[1][0]):
+                lines.append(f"[TIMINGS] {name:<24} {seconds:>10.3f} {hits:>11} {findings:>9}")
+        lines.append(f"[TIMINGS] analyzed {self.files} file(s), {self.bytes / (1024 * 1024):.2f} MiB")
+        rss_line = f"[TIMINGS] peak RSS: {peak_rss() / (1024 * 1024):.1f} MiB"
+        if self.worker_rss:
+            rss_line += f", workers: {self.worker_rss / (1024 * 1024):.1f} MiB (max over processes)"
+        lines.append(rss_line)
+        if self.trace_memory:
+            lines.append(f"[TIMINGS] tracemalloc peak: {self.memory_peak / (1024 * 1024):.2f} MiB "
+                         f"(max over processes)")
+        if self.slow_files:
+            lines.append("[TIMINGS] slowest files:")
+            for seconds, path in sorted(self.slow_files, reverse=True):
+                lines.append(f"[TIMINGS]   {seconds:>8.3f} s  {path}")
+        return lines
+
+
+def get_profiler():
+    return _active
+
+
+def phase(name):
+    """
+    Контекст для замера фазы; при выключенном профилировании ничего не делает.
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)
+
+
+@contextlib.contextmanager
+def profiling(profiler):
+    """
+    Включаем профилировщик на время блока (в родителе или в задаче воркера).
+    """
+    global _active
+    previous = _active
+    _active = profiler
+    if profiler.trace_memory:
+        import tracemalloc
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    if profiler.cprofile_dir:
+        import cProfile
+
+        profiler._cprofile = cProfile.Profile()
+        profiler._cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if profiler._cprofile is not None:
+            profiler._cprofile.disable()
+            import tempfile
+
+            fd, dump_path = tempfile.mkstemp(suffix='.pstats', dir=profiler.cprofile_dir)
+            os.close(fd)
+            profiler._cprofile.dump_stats(dump_path)
+            profiler._cprofile = None
+            profiler.profile_dumps.append(dump_path)
+        if profiler.trace_memory:
+            profiler.memory_peak = max(profiler.memory_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        _active = previous
+
+
+def reset_inherited():
+    """
+    Инициализатор воркера: при fork процесс наследует включённые в родителе
+    cProfile и tracemalloc - выключаем их, воркер заводит собственные.
+    """
+    global _active
+    if _active is not None and _active._cprofile is not None:
+        _active._cprofile.disable()
+    # tracemalloc импортирован, только если его включал родитель
+    tracemalloc = sys.modules.get('tracemalloc')
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _active = None
+
+
+def write_merged_profile(dumps, out_path):
+    """
+    Сливаем дампы cProfile всех процессов в один файл .pstats и удаляем временные.
+    """
+    if not dumps:
+        return
+    import pstats
+
+    stats = pstats.Stats(dumps[0])
+    for dump in dumps[1:]:
+        stats.add(dump)
+    stats.dump_stats(out_path)
+    for dump in dumps:
+        os.remove(dump)
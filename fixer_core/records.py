@@ -0,0 +1,87 @@
+import sys
+from collections.abc import Mapping
+
+
+def plain_tuples(value):
+    """
+    Списки из JSON обратно в кортежи (во всех вложенных значениях).
+    """
+    if type(value) is not list:
+        return value
+    return tuple([plain_tuples(item) if type(item) is list else item for item in value])
+
+
+def _restore(cls, values):
+    record = cls.__new__(cls)
+    for name, value in zip(cls.fields, values):
+        setattr(record, name, value)
+    # Находки из кэша и от воркеров ссылаются на одну строку с именем файла
+    record.file = sys.intern(record.file)
+    record.source = None
+    return record
+
+
+class Record(Mapping):
+    """
+    Компактная находка: __slots__ вместо dict, без ссылок на узлы ast -
+    только имя файла (интернированное), номера строк, координаты и короткие строки.
+    Читается как словарь (finding['file'], .get(), dict(finding)), поэтому
+    фиксеры, вывод и движок исправлений работают с ней так же, как со словарём.
+    fields - поля находки; source (SourceBuffer) в них не входит, в кэш
+    и в ответы воркеров не сериализуется - его прикрепляет pipeline.
+    """
+
+    __slots__ = ('source',)
+    fields = ()
+
+    def __init__(self, **values):
+        for name in self.fields:
+            setattr(self, name, values.pop(name, None))
+        self.source = values.pop('source', None)
+        if values:
+            raise TypeError(f"{type(self).__name__} has no fields {', '.join(values)}")
+
+    def __getitem__(self, key):
+        if key in self.fields or key == 'source':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields and key != 'source':
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.fields + ('source',))
+
+    def __len__(self):
+        return len(self.fields) + 1
+
+    def __reduce__(self):
+        return _restore, (type(self), tuple(getattr(self, name) for name in self.fields))
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields)
+        return f'{type(self).__name__}({values})'
+
+    def as_row(self):
+        """
+        Значения полей по порядку fields - для JSON (кэш находок).
+        """
+        return [getattr(self, name) for name in self.fields]
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Находка из as_row() после JSON: кортежи восстанавливаются, лишние или
+        недостающие поля - ValueError.
+        """
+        if not isinstance(row, list) or len(row) != len(cls.fields):
+            raise ValueError(f"malformed {cls.__name__} row")
+        return _restore(cls, plain_tuples(row))
+
+    def as_dict(self):
+        """
+        Поля находки без буфера с исходником (для JSON).
+        """
+        return {name: getattr(self, name) for name in self.fields}
@@ -0,0 +1,350 @@
+import ast
+import sys
+import time
+
+from fixer_core.spans import module_facts, statement_lines
+
+
+class FileContext:
+    """
+    Общее состояние обхода одного файла - его ведёт движок, правила только читают:
+    current_stmt - (start, end) строк текущей инструкции верхнего уровня,
+    top_imports / import_line - сведения о модуле (см. spans.module_facts),
+    scopes - стек областей видимости (номер области, это тело класса?), 0 - модуль,
+    block - номер текущего списка инструкций (тело функции, ветка if, тело цикла...),
+    loops - глубина циклов в текущей функции.
+    """
+
+    __slots__ = ('current_stmt', 'top_imports', 'import_line', 'scopes', 'block', 'loops',
+                 '_scope_count', '_block_count')
+
+    def __init__(self):
+        self.current_stmt = None
+        self.top_imports = ()
+        self.import_line = 0
+        self.scopes = [(0, False)]
+        self.block = 0
+        self.loops = 0
+        self._scope_count = 1
+        self._block_count = 1
+
+    @property
+    def scope(self):
+        return self.scopes[-1][0]
+
+    def push_scope(self, is_class=False):
+        self.scopes.append((self._scope_count, is_class))
+        self._scope_count += 1
+
+    def pop_scope(self):
+        self.scopes.pop()
+
+    def new_block(self):
+        self._block_count += 1
+        return self._block_count - 1
+
+
+# Префиксы методов-обработчиков правила, в порядке слотов таблицы диспетчеризации
+_HANDLER_KINDS = ('visit', 'leave', 'branch')
+
+
+class Rule:
+    """
+    Правило анализа. Типы узлов, которые нужны правилу, оно объявляет методами:
+    visit_<Узел>(node) вызывается при входе в узел, leave_<Узел>(node) - после
+    обхода его детей, branch_<Узел>(node) - между альтернативными ветками
+    (у If - после body, перед orelse; у Try и TryStar - перед каждым обработчиком except,
+    перед orelse и перед finalbody, даже пустыми). Сами деревья обходит движок (walk) - один раз на файл
+    для всех правил, каждый узел получают только правила с обработчиком для его типа.
+    Для FunctionDef, AsyncFunctionDef, Lambda и ClassDef visit_ вызывается уже
+    в новой области видимости - после декораторов, базовых классов, аннотаций
+    и значений по умолчанию (они вычисляются в объемлющей области), для For и AsyncFor -
+    после обхода итерируемого.
+    """
+
+    def __init__(self, filename, context=None):
+        self.filename = sys.intern(filename)
+        self.context = context if context is not None else FileContext()
+
+    @classmethod
+    def handlers(cls):
+        """
+        {тип узла ast: (имя visit_-метода, имя leave_-метода, имя branch_-метода)},
+        отсутствующие - None.
+        """
+        handlers = cls.__dict__.get('_handlers')
+        if handlers is None:
+            handlers = {}
+            for attr in dir(cls):
+                kind, _, type_name = attr.partition('_')
+                node_type = getattr(ast, type_name, None) if kind in _HANDLER_KINDS else None
+                if not (isinstance(node_type, type) and issubclass(node_type, ast.AST)):
+                    continue
+                methods = list(handlers.get(node_type, (None, None, None)))
+                methods[_HANDLER_KINDS.index(kind)] = attr
+                handlers[node_type] = tuple(methods)
+            cls._handlers = handlers
+        return handlers
+
+    def visit(self, tree):
+        """
+        Обход дерева одним этим правилом (как ast.NodeVisitor.visit).
+        """
+        walk(tree, {type(self).__name__: self})
+
+
+# (классы правил) -> {тип узла: ([(индекс правила, метод)] входа, выхода, между ветками)}
+_dispatch_tables = {}
+
+
+def dispatch_table(rule_classes):
+    """
+    Таблица диспетчеризации для набора правил: по типу узла - обработчики
+    входа, выхода и между ветками. Считается один раз на набор классов.
+    """
+    key = tuple(rule_classes)
+    table = _dispatch_tables.get(key)
+    if table is None:
+        table = {}
+        for index, rule_cls in enumerate(key):
+            for node_type, methods in rule_cls.handlers().items():
+                slots = table.setdefault(node_type, tuple([] for _ in _HANDLER_KINDS))
+                for slot, method in zip(slots, methods):
+                    if method:
+                        slot.append((index, method))
+        _dispatch_tables[key] = table
+    return table
+
+
+def _timed(handler, counter):
+    def timed(node):
+        started = time.perf_counter()
+        try:
+            handler(node)
+        finally:
+            counter[0] += time.perf_counter() - started
+            counter[1] += 1
+    return timed
+
+
+class _Walker:
+    """
+    Один обход дерева для всех правил. Узлы, задающие области видимости
+    и списки инструкций, обходятся в порядке вычисления (_STRUCTURE),
+    остальные - по полям, как ast.NodeVisitor.generic_visit.
+    """
+
+    def __init__(self, handlers, context):
+        self.handlers = handlers
+        self.context = context
+
+    def walk(self, node):
+        handlers = self.handlers.get(type(node))
+        structure = _STRUCTURE.get(type(node))
+        if structure is not None:
+            structure(self, node, handlers)
+            return
+        if handlers is not None:
+            for handler in handlers[0]:
+                handler(node)
+        self.children(node)
+        if handlers is not None:
+            for handler in handlers[1]:
+                handler(node)
+
+    def children(self, node):
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        self.walk(item)
+            elif isinstance(value, ast.AST):
+                self.walk(value)
+
+    def walk_all(self, nodes):
+        for node in nodes:
+            if node is not None:
+                self.walk(node)
+
+    def block(self, stmts):
+        context = self.context
+        saved = context.block
+        context.block = context.new_block()
+        for stmt in stmts:
+            self.walk(stmt)
+        context.block = saved
+
+
+def _enter(handlers, node):
+    if handlers is not None:
+        for handler in handlers[0]:
+            handler(node)
+
+
+def _leave(handlers, node):
+    if handlers is not None:
+        for handler in handlers[1]:
+            handler(node)
+
+
+def _branch(handlers, node):
+    if handlers is not None:
+        for handler in handlers[2]:
+            handler(node)
+
+
+def _walk_module(walker, node, handlers):
+    context = walker.context
+    context.top_imports, context.import_line = module_facts(node)
+    _enter(handlers, node)
+    for stmt in node.body:
+        context.current_stmt = statement_lines(stmt)
+        walker.walk(stmt)
+    context.current_stmt = None
+    _leave(handlers, node)
+
+
+def _outer_parts(args):
+    # Значения по умолчанию и аннотации вычисляются в объемлющей области
+    annotated = args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]
+    return args.defaults + args.kw_defaults + [arg.annotation for arg in annotated]
+
+
+def _walk_function(walker, node, handlers):
+    context = walker.context
+    if isinstance(node, ast.Lambda):
+        walker.walk_all(_outer_parts(node.args))
+    else:
+        walker.walk_all(node.decorator_list + _outer_parts(node.args) + [node.returns])
+    context.push_scope()
+    saved_loops, context.loops = context.loops, 0
+    _enter(handlers, node)
+    if isinstance(node, ast.Lambda):
+        walker.walk(node.body)
+    else:
+        walker.block(node.body)
+    _leave(handlers, node)
+    context.loops = saved_loops
+    context.pop_scope()
+
+
+def _walk_class(walker, node, handlers):
+    context = walker.context
+    walker.walk_all(node.decorator_list + node.bases + [keyword.value for keyword in node.keywords])
+    context.push_scope(is_class=True)
+    _enter(handlers, node)
+    walker.block(node.body)
+    _leave(handlers, node)
+    context.pop_scope()
+
+
+def _walk_if(walker, node, handlers):
+    _enter(handlers, node)
+    walker.walk(node.test)
+    walker.block(node.body)
+    _branch(handlers, node)
+    walker.block(node.orelse)
+    _leave(handlers, node)
+
+
+def _walk_loop(walker, node, handlers):
+    context = walker.context
+    if isinstance(node, ast.While):
+        _enter(handlers, node)
+        walker.walk(node.test)
+    else:
+        # Итерируемое вычисляется один раз до цикла - до привязки переменной цикла
+        walker.walk(node.iter)
+        _enter(handlers, node)
+        walker.walk(node.target)
+    context.loops += 1
+    walker.block(node.body)
+    context.loops -= 1
+    walker.block(node.orelse)
+    _leave(handlers, node)
+
+
+def _walk_try(walker, node, handlers):
+    _enter(handlers, node)
+    walker.block(node.body)
+    for handler in node.handlers:
+        _branch(handlers, node)
+        walker.walk(handler)
+    _branch(handlers, node)
+    walker.block(node.orelse)
+    _branch(handlers, node)
+    walker.block(node.finalbody)
+    _leave(handlers, node)
+
+
+def _walk_handler(walker, node, handlers):
+    _enter(handlers, node)
+    walker.walk_all([node.type])
+    walker.block(node.body)
+    _leave(handlers, node)
+
+
+def _walk_match(walker, node, handlers):
+    _enter(handlers, node)
+    walker.walk(node.subject)
+    walker.walk_all(node.cases)
+    _leave(handlers, node)
+
+
+def _walk_case(walker, node, handlers):
+    _enter(handlers, node)
+    walker.walk(node.pattern)
+    walker.walk_all([node.guard])
+    walker.block(node.body)
+    _leave(handlers, node)
+
+
+_STRUCTURE = {
+    ast.Module: _walk_module,
+    ast.FunctionDef: _walk_function,
+    ast.AsyncFunctionDef: _walk_function,
+    ast.Lambda: _walk_function,
+    ast.ClassDef: _walk_class,
+    ast.If: _walk_if,
+    ast.For: _walk_loop,
+    ast.AsyncFor: _walk_loop,
+    ast.While: _walk_loop,
+    ast.Try: _walk_try,
+    ast.ExceptHandler: _walk_handler,
+    ast.Match: _walk_match,
+    ast.match_case: _walk_case,
+}
+if hasattr(ast, 'TryStar'):
+    _STRUCTURE[ast.TryStar] = _walk_try
+
+
+def walk(tree, rules, context=None, timed=False):
+    """
+    Прогоняем правила по дереву за один обход.
+    rules - {имя правила: экземпляр Rule}; все правила делят один FileContext
+    (context; по умолчанию - контекст первого правила).
+    timed=True - считаем время в обработчиках и число их вызовов по правилам:
+    возвращаем {имя правила: (секунды, вызовы)}, иначе None.
+    """
+    names = list(rules)
+    instances = [rules[name] for name in names]
+    if context is None:
+        context = instances[0].context
+    counters = [[0.0, 0] for _ in instances] if timed else None
+
+    handlers = {}
+    for node_type, slots in dispatch_table(type(rule) for rule in instances).items():
+        bound = []
+        for methods in slots:
+            calls = []
+            for index, method in methods:
+                handler = getattr(instances[index], method)
+                calls.append(_timed(handler, counters[index]) if timed else handler)
+            bound.append(tuple(calls))
+        handlers[node_type] = tuple(bound)
+
+    _Walker(handlers, context).walk(tree)
+    if timed:
+        return {name: tuple(counter) for name, counter in zip(names, counters)}
+    return None
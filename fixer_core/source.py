@@ -0,0 +1,138 @@
+import io
+import os
+import tokenize
+
+from fixer_core.cache import content_digest
+
+
+class StaleSourceError(RuntimeError):
+    """
+    Файл изменился на диске после анализа - находки к нему уже не относятся.
+    """
+
+
+class SourceBuffer:
+    """
+    Содержимое файла, прочитанное один раз на этапе анализа.
+    Находки хранят ссылку на буфер (ключ 'source'), фикс берёт байты отсюда,
+    а не с диска. fingerprint = (size, mtime_ns, sha256) на момент чтения.
+    Буфер без данных (находки из кэша) дочитывает файл при первом обращении
+    и сверяет хэш - если файл изменился, бросает StaleSourceError.
+    Кодировка определяется по PEP 263 (BOM / coding cookie), как у интерпретатора.
+    Координаты узлов ast - смещения в UTF-8, поэтому правки применяются к utf8,
+    а результат перекодируется обратно в исходную кодировку (encode()).
+    """
+
+    __slots__ = ('path', 'fingerprint', '_data', '_encoding')
+
+    def __init__(self, path, fingerprint, data=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._data = data
+        self._encoding = None
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        return cls(path, (st.st_size, st.st_mtime_ns, content_digest(data)), data)
+
+    @property
+    def nbytes(self):
+        """
+        Сколько байт содержимого держит буфер (0, если ещё не прочитано).
+        """
+        return len(self._data) if self._data is not None else 0
+
+    @property
+    def digest(self):
+        return self.fingerprint[2]
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if content_digest(data) != self.digest:
+                raise StaleSourceError(f"{self.path} changed since it was analyzed")
+            self._data = data
+        return self._data
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            self._encoding, _ = tokenize.detect_encoding(io.BytesIO(self.data).readline)
+        return self._encoding
+
+    @property
+    def text(self):
+        """
+        Декодированный текст (без BOM); не кэшируется, чтобы не держать копию в памяти.
+        """
+        return self.data.decode(self.encoding)
+
+    @property
+    def utf8(self):
+        # Для обычного UTF-8 - те же байты, без копии
+        if self.encoding == 'utf-8':
+            return self.data
+        return self.text.encode('utf-8')
+
+    def segment(self, span):
+        """
+        Текст по координатам ast (lineno, col_offset, end_lineno, end_col_offset);
+        колонки ast - смещения в UTF-8.
+        """
+        data = self.utf8
+        lineno, col, end_lineno, end_col = span
+        start = 0
+        for _ in range(lineno - 1):
+            start = data.index(b'\n', start) + 1
+        end = start
+        for _ in range(end_lineno - lineno):
+            end = data.index(b'\n', end) + 1
+        return data[start + col:end + end_col].decode('utf-8')
+
+    def encode(self, utf8_data):
+        """
+        Исправленный текст из utf8 обратно в кодировку исходного файла.
+        """
+        if self.encoding == 'utf-8':
+            return utf8_data
+        return utf8_data.decode('utf-8').encode(self.encoding)
+
+    def is_current(self):
+        """
+        Файл на диске всё ещё тот, что анализировали: размер и mtime совпадают,
+        а если нет - совпадает хэш содержимого.
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        size, mtime_ns, digest = self.fingerprint
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime_ns:
+            return True
+        with open(self.path, 'rb') as f:
+            return content_digest(f.read()) == digest
+
+    def __getstate__(self):
+        return self.path, self.fingerprint, self._data
+
+    def __setstate__(self, state):
+        self.path, self.fingerprint, self._data = state
+        self._encoding = None
+
+
+def source_of(findings):
+    """
+    Буфер, на который ссылаются находки одного файла (первый найденный).
+    """
+    for found in findings.values():
+        for finding in found:
+            if finding.get('source') is not None:
+                return finding['source']
+    return None
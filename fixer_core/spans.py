@@ -0,0 +1,35 @@
+import ast
+
+
+def statement_lines(stmt):
+    """
+    (первая строка, последняя строка) инструкции вместе с декораторами.
+    """
+    start = min([stmt.lineno] + [dec.lineno for dec in getattr(stmt, 'decorator_list', ())])
+    return start, stmt.end_lineno
+
+
+def _is_docstring(stmt):
+    return (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)
+            and isinstance(stmt.value.value, str))
+
+
+def module_facts(module):
+    """
+    Сведения о модуле, нужные фиксеру без повторного разбора файла:
+        top_imports - модули, импортированные как `import x` на верхнем уровне,
+        import_line - после какой строки можно вставить новый импорт
+                      (после docstring'а и `from __future__ import ...`).
+    """
+    imports = set()
+    import_line = 0
+    header = True
+    for index, stmt in enumerate(module.body):
+        if header and ((index == 0 and _is_docstring(stmt)) or
+                       (isinstance(stmt, ast.ImportFrom) and stmt.module == '__future__')):
+            import_line = stmt.end_lineno
+        else:
+            header = False
+        if isinstance(stmt, ast.Import):
+            imports.update(alias.name for alias in stmt.names if alias.asname is None)
+    return tuple(sorted(imports)), import_line
@@ -0,0 +1,120 @@
+import os
+
+from fixer_core.profiling import phase
+from fixer_core.source import SourceBuffer, source_of
+
+# Какую долю --max-memory могут занимать находки, отложенные для --fix
+SPOOL_SHARE = 4
+# Примерный размер одной находки в памяти (Record со слотами и короткими строками)
+FINDING_OVERHEAD = 512
+
+
+class FindingSpool:
+    """
+    Находки, отложенные до фазы исправлений, сгруппированные по файлам
+    (в порядке анализа). Пока их оценка в памяти (буферы с исходниками плюс
+    FINDING_OVERHEAD на находку) не превышает limit, они лежат в памяти; дальше
+    накопленное сбрасывается во временный файл (pickle по группе на файл),
+    буферы с исходниками отпускаются. При чтении (by_file) сброшенным находкам
+    подставляется SourceBuffer без данных: фикс дочитает файл и сверит хэш
+    с отпечатком, снятым при анализе. limit=None - всё в памяти.
+    """
+
+    def __init__(self, limit=None, directory=None):
+        self.limit = limit
+        self.directory = directory
+        self.files = 0
+        self.spilled = 0
+        self._groups = []
+        self._size = 0
+        self._path = None
+
+    @classmethod
+    def for_budget(cls, max_memory=None):
+        return cls(max_memory // SPOOL_SHARE if max_memory else None)
+
+    def __len__(self):
+        return self.files
+
+    def add(self, path, results):
+        """
+        results = {детектор: [находки]} одного файла (как из iter_scan).
+        """
+        if not any(results.values()):
+            return
+        source = source_of(results)
+        results = {tool: list(found) for tool, found in results.items() if found}
+        self._groups.append((path, source, results))
+        self.files += 1
+        self._size += (source.nbytes if source is not None else 0) + FINDING_OVERHEAD * sum(
+            len(found) for found in results.values())
+        if self.limit is not None and self._size > self.limit:
+            self.spill()
+
+    def spill(self):
+        """
+        Сбрасываем накопленные в памяти группы во временный файл.
+        """
+        if not self._groups:
+            return
+        import pickle
+        import tempfile
+
+        with phase('scan.spill'):
+            if self._path is None:
+                fd, self._path = tempfile.mkstemp(prefix='autofixer-spool-', suffix='.pickle', dir=self.directory)
+                os.close(fd)
+            with open(self._path, 'ab') as f:
+                for path, source, results in self._groups:
+                    fingerprint = source.fingerprint if source is not None else None
+                    pickle.dump((path, fingerprint, results), f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.spilled += len(self._groups)
+            self._groups = []
+            self._size = 0
+
+    def by_file(self):
+        """
+        Генератор (файл, {детектор: [находки]}) в порядке добавления; находки
+        ссылаются на буфер файла (ключ 'source').
+        """
+        if self._path is not None:
+            import pickle
+
+            with open(self._path, 'rb') as f:
+                for _ in range(self.spilled):
+                    path, fingerprint, results = pickle.load(f)
+                    source = SourceBuffer(path, fingerprint) if fingerprint else None
+                    yield path, _with_source(results, source)
+        for path, source, results in self._groups:
+            yield path, _with_source(results, source)
+
+    def close(self):
+        if self._path is not None:
+            os.remove(self._path)
+            self._path = None
+        self._groups = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def spooled_findings(results, tool, spool=None):
+    """
+    Находки детектора tool по одной из потока (файл, {детектор: [находки]}) (как из iter_scan);
+    группы файлов по пути откладываются в spool (для --fix; None - не откладываем).
+    """
+    for path, file_results in results:
+        if spool is not None:
+            spool.add(path, file_results)
+        yield from file_results[tool]
+
+
+def _with_source(results, source):
+    if source is not None:
+        for found in results.values():
+            for finding in found:
+                finding['source'] = source
+    return results
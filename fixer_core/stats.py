@@ -0,0 +1,53 @@
+from collections import Counter
+
+
+class ScanStats:
+    """
+    Счётчики одного прогона сканера (печатаются по --stats).
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.cached = 0
+        self.parsed = 0
+        self.parse_skipped = 0
+        self.prefilter_skipped = Counter()
+        # межмодульный проход (--interprocedural): модули, разобранные заново, связанные заново
+        self.link = None
+        # ревизии git (--revision / --history): сколько ревизий, уникальных blob'ов, повторов
+        self.git = None
+
+    def record_cached(self):
+        self.files += 1
+        self.cached += 1
+
+    def record_scan(self, file_scan, detectors):
+        self.files += 1
+        self.prefilter_skipped.update(file_scan.skipped)
+        if len(file_scan.skipped) == len(detectors):
+            self.parse_skipped += 1
+        else:
+            self.parsed += 1
+
+    def record_link(self, modules, summarized, relinked):
+        self.link = (modules, summarized, relinked)
+
+    def record_revisions(self, revisions, blobs, duplicates):
+        self.git = (revisions, blobs, duplicates)
+
+    def report_lines(self):
+        lines = [
+            f"[STATS] files: {self.files}, from cache: {self.cached}, "
+            f"parsed: {self.parsed}, parse skipped by prefilter: {self.parse_skipped}",
+        ]
+        for name, count in sorted(self.prefilter_skipped.items()):
+            lines.append(f"[STATS] prefilter skipped {count} file(s) for detector '{name}'")
+        if self.link is not None:
+            modules, summarized, relinked = self.link
+            lines.append(f"[STATS] interprocedural: {modules} module(s), summarized: {summarized}, "
+                         f"relinked: {relinked} (the rest from cache)")
+        if self.git is not None:
+            revisions, blobs, duplicates = self.git
+            lines.append(f"[STATS] git: {revisions} revision(s), {blobs} unique blob(s), "
+                         f"{duplicates} repeated blob(s) not analyzed again")
+        return lines
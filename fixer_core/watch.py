@@ -0,0 +1,292 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter
+
+from fixer_core.discovery import Discovery
+from fixer_core.pipeline import DETECTORS, iter_scan
+
+# Пауза после первого события inotify: редакторы сохраняют файл несколькими операциями
+DEBOUNCE_SECONDS = 0.05
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct('iIII')
+
+# Сведения о модуле в находках (см. fixer_core.spans) - не часть самой находки
+_MODULE_FACTS = ('top_imports', 'import_line')
+
+
+class WatchBackendUnavailable(RuntimeError):
+    pass
+
+
+class PollingWatcher:
+    """
+    Индекс {файл: (mtime_ns, size)}; раз в interval секунд обходим дерево
+    (только scandir + stat, без чтения и разбора) и сравниваем с индексом.
+    """
+
+    def __init__(self, root, discovery=None, interval=1.0):
+        self.root = root
+        self.discovery = discovery or Discovery()
+        self.interval = interval
+        self.index = {}
+
+    def _build(self):
+        index = {}
+        dirs = []
+        if os.path.isfile(self.root):
+            st = os.stat(self.root)
+            return {self.root: (st.st_mtime_ns, st.st_size)}, [os.path.dirname(self.root) or os.curdir]
+        for dirpath, entries in self.discovery.walk(self.root):
+            dirs.append(dirpath)
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                index[entry.path] = (st.st_mtime_ns, st.st_size)
+        return index, dirs
+
+    def _resync(self):
+        """
+        Полный проход по дереву: (изменённые или новые файлы, удалённые файлы).
+        """
+        index, dirs = self._build()
+        changed = [path for path, stamp in index.items() if self.index.get(path) != stamp]
+        removed = [path for path in self.index if path not in index]
+        self.index = index
+        self._watch_dirs(dirs)
+        return changed, removed
+
+    def _watch_dirs(self, dirs):
+        pass
+
+    def snapshot(self):
+        """
+        Исходный список файлов; с него начинается наблюдение.
+        """
+        self.index, dirs = self._build()
+        self._watch_dirs(dirs)
+        return list(self.index)
+
+    def wait(self):
+        """
+        Блокируемся до первых изменений; возвращаем (изменённые, удалённые).
+        """
+        while True:
+            time.sleep(self.interval)
+            changed, removed = self._resync()
+            if changed or removed:
+                return changed, removed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(PollingWatcher):
+    """
+    Linux inotify через ctypes: ядро сообщает, какие файлы изменились,
+    и повторный обход дерева не нужен. Новые каталоги, переполнение очереди
+    событий и новые .py-файлы обрабатываются полным проходом (как у PollingWatcher).
+    """
+
+    def __init__(self, root, discovery=None, interval=1.0):
+        super().__init__(root, discovery, interval)
+        if not sys.platform.startswith('linux'):
+            raise WatchBackendUnavailable('inotify is only available on Linux')
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        except OSError as e:
+            raise WatchBackendUnavailable(f'cannot load libc: {e}')
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise WatchBackendUnavailable(f'inotify_init1 failed: {os.strerror(ctypes.get_errno())}')
+        self._dirs = {}     # wd -> каталог
+        self._watched = set()
+
+    def _watch_dirs(self, dirs):
+        for dirpath in dirs:
+            if dirpath in self._watched:
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                # Чаще всего ENOSPC - исчерпан fs.inotify.max_user_watches
+                raise WatchBackendUnavailable(
+                    f'inotify_add_watch({dirpath}) failed: {os.strerror(ctypes.get_errno())}')
+            self._dirs[wd] = dirpath
+            self._watched.add(dirpath)
+
+    def _read_events(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def wait(self):
+        while True:
+            events = self._read_events(None)
+            # Досчитываем пачку событий одного сохранения
+            while True:
+                more = self._read_events(DEBOUNCE_SECONDS)
+                if not more:
+                    break
+                events.extend(more)
+
+            resync = False
+            touched = set()
+            for wd, mask, name in events:
+                if mask & _IN_Q_OVERFLOW or mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    resync = True
+                    if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                        self._watched.discard(self._dirs.pop(wd, None))
+                    continue
+                dirpath = self._dirs.get(wd)
+                if dirpath is None or not name:
+                    continue
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        resync = True
+                    continue
+                if name.endswith('.py'):
+                    touched.add(os.path.join(dirpath, name))
+
+            if resync or any(path not in self.index for path in touched):
+                # Новый каталог или новый файл: исключения и .gitignore проверит полный проход
+                changed, removed = self._resync()
+            else:
+                changed, removed = [], []
+                for path in sorted(touched):
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        del self.index[path]
+                        removed.append(path)
+                        continue
+                    stamp = (st.st_mtime_ns, st.st_size)
+                    if self.index[path] != stamp:
+                        self.index[path] = stamp
+                        changed.append(path)
+            if changed or removed:
+                return changed, removed
+
+    def close(self):
+        os.close(self._fd)
+
+
+WATCH_BACKENDS = {'poll': PollingWatcher, 'inotify': InotifyWatcher}
+
+
+def finding_identity(tool, record):
+    """
+    Ключ находки без номеров строк и координат: правка выше по файлу
+    сдвигает строки, но не превращает находку в "исправленную + новую".
+    """
+    detector = DETECTORS[tool]
+    positional = set(detector.line_fields) | set(detector.stmt_fields.values()) | set(_MODULE_FACTS)
+    return json.dumps({key: value for key, value in record.items()
+                       if key not in positional and not key.endswith(('_span', '_lines'))}, sort_keys=True)
+
+
+def _file_state(results):
+    # В памяти держим только JSON-записи находок - без ast-узлов и буферов с исходником
+    state = []
+    for tool, found in results.items():
+        for finding in found:
+            record = DETECTORS[tool].to_record(finding)
+            state.append((tool, finding_identity(tool, record), record))
+    return state
+
+
+def _delta(old, new):
+    """
+    (добавленные, исправленные) между двумя состояниями файла, с учётом кратности.
+    """
+    def unmatched(items, other):
+        remaining = Counter(item[:2] for item in other)
+        result = []
+        for item in items:
+            if remaining[item[:2]]:
+                remaining[item[:2]] -= 1
+            else:
+                result.append((item[0], item[2]))
+        return result
+
+    return unmatched(new, old), unmatched(old, new)
+
+
+def watch(path, detectors, on_delta, backend='poll', interval=1.0, discovery=None, **scan_options):
+    """
+    Наблюдаем за path и после каждого сохранения анализируем заново только
+    изменившиеся файлы. Находки по файлам хранятся в памяти; on_delta(added, resolved)
+    получает списки (детектор, запись находки). Первый вызов - все находки дерева,
+    дальше - только непустые изменения (сдвиг строк изменением не считается).
+    Выход - по KeyboardInterrupt (его обрабатывает вызывающий).
+    """
+    detectors = tuple(detectors)
+    watcher = None
+    try:
+        watcher = WATCH_BACKENDS[backend](path, discovery, interval)
+        files = watcher.snapshot()
+    except WatchBackendUnavailable as e:
+        if watcher is not None:
+            # inotify_add_watch упал уже после inotify_init1 - дескриптор не должен утечь
+            watcher.close()
+        print(f"[WATCH] {backend} backend unavailable ({e}), falling back to polling", file=sys.stderr)
+        watcher = PollingWatcher(path, discovery, interval)
+        files = watcher.snapshot()
+
+    state = {}
+    changed, removed = files, []
+    initial = True
+    try:
+        while True:
+            added, resolved = [], []
+            for fullpath in removed:
+                resolved.extend((tool, record) for tool, _, record in state.pop(fullpath, ()))
+            if changed:
+                for fullpath, results in iter_scan(path, detectors, files=changed, **scan_options):
+                    new = _file_state(results)
+                    file_added, file_resolved = _delta(state.get(fullpath, ()), new)
+                    added.extend(file_added)
+                    resolved.extend(file_resolved)
+                    if new:
+                        state[fullpath] = new
+                    else:
+                        state.pop(fullpath, None)
+            if added or resolved or initial:
+                on_delta(added, resolved)
+            initial = False
+            changed, removed = watcher.wait()
+    finally:
+        watcher.close()
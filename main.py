@@ -1,4 +1,5 @@
 import argparse
+import contextlib
 import sys
 import os
 
@@ -8,8 +9,12 @@ YELLOW = "\033[93m"
 RESET = "\033[0m"
 
 # from sql_injection_fixer_v2.sql_fixer import analyze_sql_injections, fix_sql_injections
-from sql_injection_fixer_v2.test_sql_fixer import analyze_sql_injections, fix_sql_injections
-from eval_fixer.eval_fixer import analyze_eval_calls, fix_eval_calls
+from sql_injection_fixer_v2.test_sql_fixer import iter_sql_injections
+from eval_fixer.eval_fixer import iter_eval_calls, format_eval_args
+from fixer_core.cli import add_scan_arguments, redirect_output_for, scan_options_from_args
+from fixer_core.output import JsonLinesWriter, emit_report
+from fixer_core.pipeline import iter_scan
+from fixer_core.spool import FindingSpool
 
 def print_banner():
     """
@@ -26,34 +31,179 @@ def print_banner():
     print(f"{YELLOW}AutoFixer: исправление SQL-инъекций и eval-вызовов в Python-коде{RESET}\n")
 
 
-def run_sql_injection_fixer(path, fix):
-    vulnerabilities = analyze_sql_injections(path)
-    if vulnerabilities:
-        print(f"{BLUE}[!] Найдены уязвимости SQL-инъекций:{RESET}")
-        for v in vulnerabilities:
-            print(f" - {v['file']} (строка {v['lineno_assign']}): опасная конкатенация для переменной '{v['var_name']}' -> {v['param_name']}")
-            if v['lineno_execute']:
-                print(f"      Вызов cursor.execute(...) на строке {v['lineno_execute']}")
-        if fix:
-            fix_sql_injections(vulnerabilities)
-    else:
+def run_sql_injection_fixer(path, vulnerabilities=None, **scan_options):
+    # Находки печатаются по мере готовности и не копятся:
+    # для --fix их откладывает FindingSpool (см. run_tool)
+    if vulnerabilities is None:
+        vulnerabilities = iter_sql_injections(path, **scan_options)
+    count = 0
+    for v in vulnerabilities:
+        if not count:
+            print(f"{BLUE}[!] Найдены уязвимости SQL-инъекций:{RESET}")
+        count += 1
+        params = ", ".join(v['params'])
+        if v['executed_in']:
+            print(f" - {v['file']} (строка {v['lineno_execute']}): собранный здесь запрос выполняется в {v['executed_in']}() -> {params}")
+            print("      Находка между функциями: только отчёт, без автоисправления")
+            continue
+        if v['built_in']:
+            print(f" - {v['file']} (строка {v['lineno_execute']}): запрос собран в {v['built_in']}() -> {params}")
+        elif v['var_name']:
+            print(f" - {v['file']} (строка {v['lineno_assign']}): опасная конкатенация для переменной '{v['var_name']}' -> {params}")
+        else:
+            print(f" - {v['file']} (строка {v['lineno_execute']}): запрос собран прямо в вызове -> {params}")
+        print(f"      Вызов cursor.execute(...) на строке {v['lineno_execute']}")
+        if v['built_in']:
+            print("      Находка между функциями: только отчёт, без автоисправления")
+        elif not v['fixable']:
+            print("      Запрос собирается в цикле, ветвлении, другой области видимости, из переприсвоенных значений "
+                  "или с именем таблицы из данных: только отчёт, без автоисправления")
+    if not count:
         print("Уязвимостей SQL-инъекций не обнаружено.")
 
-def run_eval_fixer(path, fix):
-    eval_calls = analyze_eval_calls(path)
-    if eval_calls:
-        print(f"{BLUE}[!] Найдены вызовы eval():{RESET}")
-        for call in eval_calls:
-            print(f" - {call['file']} (строка {call['lineno']}): eval({call['args']})")
-        if fix:
-            fix_eval_calls(eval_calls)
-    else:
+def run_eval_fixer(path, eval_calls=None, **scan_options):
+    if eval_calls is None:
+        eval_calls = iter_eval_calls(path, **scan_options)
+    count = 0
+    for call in eval_calls:
+        if not count:
+            print(f"{BLUE}[!] Найдены вызовы eval():{RESET}")
+        count += 1
+        print(f" - {call['file']} (строка {call['lineno']}): eval({format_eval_args(call)})")
+    if not count:
         print("Вызовов eval() не обнаружено.")
 
+def fix_options(scan_options):
+    # Пул исправлений настраивается так же, как пул анализа
+    return {name: scan_options[name] for name in ("jobs", "max_tasks_per_child", "max_memory") if name in scan_options}
+
+def apply_spooled_fixes(spool, scan_options):
+    # Один проход исправлений на файл: SQL- и eval-фиксы вместе
+    from fixer_core.fix_engine import apply_fixes
+    apply_fixes(spool, **fix_options(scan_options))
+
+def run_tool(tool, path, fix, **scan_options):
+    # Находки для --fix откладываются по файлам (при --max-memory - с выгрузкой на диск)
+    detectors = ("sql", "eval") if tool == "all" else (tool,)
+    spool = FindingSpool.for_budget(scan_options.get("max_memory")) if fix else None
+    eval_calls = []
+
+    def findings(name):
+        for fullpath, results in iter_scan(path, detectors, **scan_options):
+            if spool is not None:
+                spool.add(fullpath, results)
+            if tool == "all":
+                # Один обход и один ast.parse на файл для обоих детекторов:
+                # eval-находки копятся до своей секции - текст аргументов берём сразу,
+                # тогда буфер с исходником им не нужен (для фикса его хранит spool)
+                for call in results["eval"]:
+                    format_eval_args(call)
+                    call["source"] = None
+                eval_calls.extend(results["eval"])
+            yield from results[name]
+
+    with spool if spool is not None else contextlib.nullcontext():
+        if tool == "sql":
+            run_sql_injection_fixer(path, findings("sql"))
+        elif tool == "eval":
+            run_eval_fixer(path, findings("eval"))
+        elif tool == "all":
+            print(f"{GREEN}--= Запуск SQL Injection Fixer =--{RESET}")
+            run_sql_injection_fixer(path, findings("sql"))
+            print("\n" + "-" * 50 + "\n")
+            print(f"{GREEN}--= Запуск eval() Fixer =--{RESET}")
+            run_eval_fixer(path, eval_calls)
+        if spool is not None:
+            apply_spooled_fixes(spool, scan_options)
+
+def run_tool_report(tool, path, fix, output_format, **scan_options):
+    # jsonl / json / sarif: отчёт пишется в stdout по мере анализа файлов
+    detectors = ("sql", "eval") if tool == "all" else (tool,)
+    spool = FindingSpool.for_budget(scan_options.get("max_memory")) if fix else None
+    with spool if spool is not None else contextlib.nullcontext():
+        emit_report(iter_scan(path, detectors, **scan_options), output_format, detectors, spool=spool)
+        if spool is not None:
+            with redirect_output_for(output_format):
+                apply_spooled_fixes(spool, scan_options)
+
+def format_watch_finding(tool, record):
+    if tool == "sql":
+        return (f"{record['file']} (строка {record['lineno_execute']}): SQL-инъекция, "
+                f"запрос '{record['var_name'] or '<в вызове>'}' -> {', '.join(record['params'])}")
+    return f"{record['file']} (строка {record['lineno']}): eval({record['args']})"
+
+def run_tool_watch(tool, path, output_format, backend, interval, **scan_options):
+    # Первый проход печатает все находки как новые, дальше - только изменения
+    from fixer_core.watch import watch
+
+    detectors = ("sql", "eval") if tool == "all" else (tool,)
+    writer = JsonLinesWriter()
+
+    def on_delta(added, resolved):
+        if output_format == "jsonl":
+            for change, items in (("resolved", resolved), ("added", added)):
+                for found_tool, record in items:
+                    writer.write({"tool": found_tool, **record, "change": change})
+            writer.flush()
+            return
+        for found_tool, record in resolved:
+            print(f"{GREEN}[-]{RESET} {format_watch_finding(found_tool, record)}")
+        for found_tool, record in added:
+            print(f"{BLUE}[+]{RESET} {format_watch_finding(found_tool, record)}")
+        print(f"{YELLOW}[WATCH] новых: {len(added)}, исправлено: {len(resolved)}; ожидание изменений...{RESET}",
+              flush=True)
+
+    try:
+        watch(path, detectors, on_delta, backend=backend, interval=interval, **scan_options)
+    except KeyboardInterrupt:
+        pass
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Запуск автофикса SQL-инъекций и eval-вызовов."
+    )
+    parser.add_argument(
+        "tool",
+        choices=["sql", "eval", "all"],
+        help="Какой инструмент запустить: sql, eval или all (оба).",
+    )
+    parser.add_argument(
+        "path",
+        help="Путь к каталогу или файлу, который нужно просканировать."
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="Автоматически исправлять уязвимости, если они найдены."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Не завершаться: следить за изменениями файлов, анализировать заново только "
+             "изменённые и печатать добавленные [+] и исправленные [-] находки."
+    )
+    parser.add_argument(
+        "--watch-backend",
+        choices=["poll", "inotify"],
+        default="poll",
+        help="Как отслеживать изменения в режиме --watch: poll - опрос mtime (по умолчанию), "
+             "inotify - события ядра Linux."
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Период опроса для --watch-backend poll (по умолчанию 1 секунда)."
+    )
+    add_scan_arguments(parser)
+    return parser
+
 def main():
-    print_banner()
+    parser = build_parser()
 
     if len(sys.argv) == 1:
+        print_banner()
         print("Вы не передали аргументы. Переходим в интерактивный режим.\n")
 
         while True:
@@ -81,40 +231,25 @@ def main():
             else:
                 print("Неверный ввод. Введите 'y' или 'n'.\n")
 
+        # Остальные опции - по умолчанию, как при запуске из командной строки
+        args = parser.parse_args([tool, path] + (["--fix"] if fix else []))
     else:
-        parser = argparse.ArgumentParser(
-            description="Запуск автофикса SQL-инъекций и eval-вызовов."
-        )
-        parser.add_argument(
-            "tool",
-            choices=["sql", "eval", "all"],
-            help="Какой инструмент запустить: sql, eval или all (оба).",
-        )
-        parser.add_argument(
-            "path",
-            help="Путь к каталогу или файлу, который нужно просканировать."
-        )
-        parser.add_argument(
-            "--fix",
-            action="store_true",
-            help="Автоматически исправлять уязвимости, если они найдены."
-        )
         args = parser.parse_args()
+        if args.watch and (args.fix or args.diff_base or args.files_from or args.revisions or args.history):
+            parser.error("--watch нельзя совмещать с --fix, --diff-base, --files-from, --revision и --history")
+        if args.watch and args.format in ("json", "sarif"):
+            parser.error("в режиме --watch доступны только форматы text и jsonl")
+        if args.format == "text":
+            print_banner()
 
-        tool = args.tool
-        path = args.path
-        fix = args.fix
-
-    if tool == "sql":
-        run_sql_injection_fixer(path, fix)
-    elif tool == "eval":
-        run_eval_fixer(path, fix)
-    elif tool == "all":
-        print(f"{GREEN}--= Запуск SQL Injection Fixer =--{RESET}")
-        run_sql_injection_fixer(path, fix)
-        print("\n" + "-" * 50 + "\n")
-        print(f"{GREEN}--= Запуск eval() Fixer =--{RESET}")
-        run_eval_fixer(path, fix)
+    with scan_options_from_args(args) as scan_options:
+        if args.watch:
+            run_tool_watch(args.tool, args.path, args.format, args.watch_backend, args.watch_interval,
+                           **scan_options)
+        elif args.format != "text":
+            run_tool_report(args.tool, args.path, args.fix, args.format, **scan_options)
+        else:
+            run_tool(args.tool, args.path, args.fix, **scan_options)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,14 +6,17 @@ setup(
     name='sql_injection_fixer',
     version='0.1',
     packages=find_packages(),
+    py_modules=['main'],
     install_requires=[
         'libcst'
     ],
     entry_points={
         'console_scripts': [
-            'sql-fix=sql_injection_fixer_v2.sql_fixer:main',
-            'eval-fix=eval_fixer.eval_fixer:main',
+            'autofixer=fixer_core.client:main',
+            'sql-fix=fixer_core.client:sql_fix',
+            'eval-fix=fixer_core.client:eval_fix',
             'test-sql=sql_injection_fixer_v2.test_sql_fixer:main',
+            'autofixer-bench=fixer_core.bench:main',
         ],
     },
 )
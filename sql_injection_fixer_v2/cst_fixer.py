@@ -0,0 +1,104 @@
+import logging
+
+import libcst as cst
+from libcst.metadata import PositionProvider
+
+from sql_injection_fixer_v2.taint import params_tuple, string_literal
+
+logger = logging.getLogger(__name__)
+
+
+def _execute_args(vuln):
+    """
+    Новые аргументы execute: query, (param1, param2, ...).
+    Запрос, собранный прямо в аргументе, заменяется параметризованным литералом.
+    """
+    query = vuln['var_name'] or string_literal(vuln['query'])
+    return f"{query}, {params_tuple(vuln['params'])}"
+
+
+class SQLInjectionFixer(cst.CSTTransformer):
+    """
+    Исправляем найденные уязвимости: последнее присвоение запроса получает
+    параметризованный литерал (с %s), а execute - параметры отдельным кортежем.
+    Находки с fixable=False (запрос собран в цикле или ветвлении) не трогаем.
+    """
+    METADATA_DEPENDENCIES = (PositionProvider,)
+
+    def __init__(self, vulnerabilities):
+        super().__init__()
+        self.assigns_by_line = {}
+        self.executes_by_line = {}
+        for vuln in vulnerabilities:
+            if not vuln['fixable']:
+                continue
+            if vuln['lineno_assign']:
+                self.assigns_by_line[vuln['lineno_assign']] = vuln
+            self.executes_by_line[vuln['lineno_execute']] = vuln
+
+    def _assigned_vuln(self, original_node, target):
+        position = self.get_metadata(PositionProvider, original_node)
+        if not position:
+            return None
+        vuln = self.assigns_by_line.get(position.start.line)
+        if vuln and isinstance(target, cst.Name) and target.value == vuln['var_name']:
+            return vuln
+        return None
+
+    def leave_Assign(self, original_node, updated_node):
+        """
+        Исправляем присвоение SQL-запроса, оставляя оригинальную структуру.
+        """
+        if len(original_node.targets) != 1:
+            return updated_node
+        vuln = self._assigned_vuln(original_node, original_node.targets[0].target)
+        if vuln and not vuln['augmented']:
+            new_value = cst.parse_expression(string_literal(vuln['query']))
+            logger.debug("Replaced query: %s", new_value.value)
+            return updated_node.with_changes(value=new_value)
+        return updated_node
+
+    def leave_AugAssign(self, original_node, updated_node):
+        """
+        query += ...: последнее звено накопления становится query = "<весь запрос>".
+        """
+        vuln = self._assigned_vuln(original_node, original_node.target)
+        if vuln and vuln['augmented']:
+            return cst.Assign(targets=[cst.AssignTarget(target=cst.Name(vuln['var_name']))],
+                              value=cst.parse_expression(string_literal(vuln['query'])))
+        return updated_node
+
+    def leave_Call(self, original_node, updated_node):
+        """
+        Исправляем вызов cursor.execute().
+        """
+        position = self.get_metadata(PositionProvider, original_node)
+        if not position:
+            return updated_node
+
+        vuln = self.executes_by_line.get(position.start.line)
+        if vuln and isinstance(original_node.func, cst.Attribute) and original_node.func.attr.value == 'execute':
+            new_args = cst.parse_expression(f"f({_execute_args(vuln)})").args
+            logger.debug("Replaced execute: %s", _execute_args(vuln))
+            return updated_node.with_changes(args=new_args)
+
+        return updated_node
+
+    @staticmethod
+    def span_edits(vuln):
+        """
+        Точечные правки без LibCST по координатам из ast: значение последнего
+        присвоения заменяем запросом с %s (для '+=' - всю инструкцию на
+        query = "..."), аргументы execute - на query, (params...).
+        """
+        if not vuln['fixable']:
+            return []
+        edits = []
+        if vuln['lineno_assign']:
+            literal = string_literal(vuln['query'])
+            if vuln['augmented']:
+                edits.append((vuln['value_span'], f"{vuln['var_name']} = {literal}"))
+            else:
+                edits.append((vuln['value_span'], literal))
+        edits.append((vuln['args_span'], _execute_args(vuln)))
+        return edits
@@ -0,0 +1,699 @@
+"""
+Межмодульный анализ SQL-запросов (--interprocedural).
+
+Запрос часто собирается в одной функции (или модуле), а выполняется в другой -
+в пределах одного файла SQLInjectionVisitor этого не видит. Анализ идёт по сводкам:
+
+1. Сводка модуля (ModuleSummary) - компактное описание без ссылок на ast:
+   импорты, функции верхнего уровня (параметры и что они возвращают), вызовы
+   execute, запрос которых пришёл из параметра или из вызова другой функции,
+   и вызовы функций с аргументами-строками. Что течёт по выражению, описывает
+   поток (flow) - кортеж:
+       ('data', подстановки)            - строка, собранная из данных прямо здесь,
+       ('param', имя)                   - параметр функции как есть,
+       ('call', имя, аргументы, именованные) - результат вызова функции как есть.
+   Сводка зависит только от содержимого файла и кэшируется по его хэшу.
+2. Связывание: модули - вершины графа импортов. Его компоненты сильной связности
+   обходятся от зависимостей к зависимым, внутри компоненты факты о функциях
+   (Facts: возвращает ли собранную из данных строку, какие параметры возвращает
+   как есть, какие доходят до execute) уточняются до неподвижной точки.
+   Итог компоненты кэшируется по ключу из хэшей её модулей и хэшей экспорта
+   зависимостей: после правки одного модуля заново считаются только он и те
+   зависимые, до которых дошло изменение его экспорта.
+"""
+import ast
+import contextlib
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+
+from fixer_core.cache import ScanCache, content_digest
+from fixer_core.discovery import iter_python_files
+from fixer_core.pipeline import (
+    DETECTORS, IN_FLIGHT_PER_WORKER, bounded_map, chunk_size_for, resolve_jobs, run_rules, worker_pool,
+)
+from fixer_core.prefilter import may_match
+from fixer_core.profiling import Profiler, get_profiler, phase, profiling
+from fixer_core.records import plain_tuples
+from fixer_core.rules import FileContext
+from fixer_core.source import SourceBuffer
+from sql_injection_fixer_v2.taint import Param, Value
+from sql_injection_fixer_v2.test_sql_fixer import SQLInjection, SQLInjectionVisitor
+
+# Формат сводок и связывания; поднимаем при изменении структур ниже
+SUMMARY_FORMAT = 2
+# Глубина цепочки реэкспортов (from .helpers import build в __init__.py и т.п.)
+MAX_ALIAS_DEPTH = 8
+
+# name - локальное имя, level - уровень относительного импорта, target - что импортировано
+Import = namedtuple('Import', 'name level target')
+# params - позиционные параметры по порядку, kwonly - только именованные, returns - потоки return
+Function = namedtuple('Function', 'name params kwonly returns')
+# owner - функция верхнего уровня, в которой лежит вызов (None - модуль, метод, вложенная функция)
+Sink = namedtuple('Sink', 'owner flow line stmt var_name args_span')
+CallSite = namedtuple('CallSite', 'owner callee args keywords line stmt args_span')
+ModuleSummary = namedtuple('ModuleSummary', 'imports functions sinks calls')
+EMPTY_SUMMARY = ModuleSummary((), (), (), ())
+
+# Что известно о функции после связывания: tainted - подстановки строки из данных,
+# которую функция может вернуть (или None), passes - параметры, которые она возвращает
+# как есть, sinks - параметры, доходящие до execute
+Facts = namedtuple('Facts', 'params kwonly tainted passes sinks')
+
+# Находка межмодульного анализа: built_in / executed_in - как у SQLInjection
+Finding = namedtuple('Finding', 'line stmt var_name params built_in executed_in args_span')
+
+
+def _callee(func):
+    """
+    Имя вызываемой функции: f -> 'f', helpers.build -> 'helpers.build', иначе None.
+    """
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if not isinstance(func, ast.Name):
+        return None
+    parts.append(func.id)
+    return '.'.join(reversed(parts))
+
+
+def _args_span(node):
+    if not node.args:
+        return None
+    return node.args[0].lineno, node.args[0].col_offset, node.args[-1].end_lineno, node.args[-1].end_col_offset
+
+
+class SummaryVisitor(SQLInjectionVisitor):
+    """
+    Строит сводку модуля. Значения строк отслеживаются так же, как в SQL-детекторе,
+    но параметры функций верхнего уровня и результаты вызовов функций становятся
+    подстановками, которые можно узнать: по ним видно, что запрос пришёл снаружи.
+    Собственных находок не собирает.
+    """
+
+    def __init__(self, filename, context=None):
+        super().__init__(filename, context)
+        self.imports = []
+        # имя функции -> ([позиционные], [только именованные], [потоки return])
+        self.functions = {}
+        self.sinks = []
+        self.calls = []
+        self._owners = []
+
+    @property
+    def _owner(self):
+        return self._owners[-1] if self._owners else None
+
+    def _value(self, node):
+        value = super()._value(node)
+        if value is None and isinstance(node, ast.Call) and _callee(node.func):
+            # Результат вызова - строка, о которой знает сводка вызываемой функции
+            value = Value((Param(node),), (), True)
+        return value
+
+    def _flow(self, value):
+        if value is None or not value.tainted:
+            return None
+        if len(value.parts) != 1:
+            return ('data', value.params)
+        node = value.parts[0].node
+        if isinstance(node, ast.arg):
+            return ('param', node.arg)
+        if isinstance(node, ast.Call):
+            ref = _callee(node.func)
+            if ref is not None:
+                return ('call', ref) + self._arguments(node)
+        # Неизвестное значение (не строка из данных) - как в SQL-детекторе, не запрос
+        return None
+
+    def _arguments(self, node):
+        args = []
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                break
+            args.append(self._flow(self._value(arg)))
+        keywords = []
+        for keyword in node.keywords:
+            flow = self._flow(self._value(keyword.value)) if keyword.arg else None
+            if flow is not None:
+                keywords.append((keyword.arg, flow))
+        return tuple(args), tuple(keywords)
+
+    # --- функции ---
+
+    def _enter_function(self, node):
+        if len(self.context.scopes) != 2 or isinstance(node, ast.Lambda):
+            # Метод, вложенная функция, lambda: параметры - просто данные
+            self._bind_arguments(node)
+            self._owners.append(None)
+            return
+        args = node.args
+        positional = args.posonlyargs + args.args
+        for arg in positional + args.kwonlyargs:
+            # Подстановка - сам параметр (ast.arg без аннотации: в тексте - только имя)
+            self._bind(arg.arg, Value((Param(ast.arg(arg=arg.arg)),), (), True))
+        for arg in (args.vararg, args.kwarg):
+            if arg:
+                self._bind(arg.arg, None)
+        self.functions[node.name] = ([arg.arg for arg in positional], [arg.arg for arg in args.kwonlyargs], [])
+        self._owners.append(node.name)
+
+    def _leave_function(self, node):
+        self._owners.pop()
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = _leave_function
+
+    def visit_Return(self, node):
+        owner = self._owner
+        if owner is not None and node.value is not None:
+            flow = self._flow(self._value(node.value))
+            if flow is not None:
+                self.functions[owner][2].append(flow)
+
+    # --- импорты ---
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.imports.append(Import(alias.asname, 0, alias.name))
+            else:
+                head = alias.name.partition('.')[0]
+                self.imports.append(Import(head, 0, head))
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name != '*':
+                target = f"{node.module}.{alias.name}" if node.module else alias.name
+                self.imports.append(Import(alias.asname or alias.name, node.level, target))
+
+    # --- вызовы ---
+
+    def leave_Call(self, node):
+        if isinstance(node.func, ast.Attribute) and node.func.attr == 'execute' and node.args:
+            query_arg = node.args[0]
+            flow = self._flow(self._value(query_arg))
+            # ('data', ...) - запрос собран здесь же, это находка самого SQL-детектора
+            if flow is not None and flow[0] != 'data' and (flow[0] == 'call' or self._owner is not None):
+                var_name = query_arg.id if isinstance(query_arg, ast.Name) else None
+                self.sinks.append(Sink(self._owner, flow, node.lineno, self.context.current_stmt, var_name,
+                                       _args_span(node)))
+            return
+        ref = _callee(node.func)
+        if ref is None:
+            return
+        args, keywords = self._arguments(node)
+        if keywords or any(flow is not None for flow in args):
+            self.calls.append(CallSite(self._owner, ref, args, keywords, node.lineno, self.context.current_stmt,
+                                       _args_span(node)))
+
+    def summary(self):
+        # Вызовы имён, которые не импортированы и не определены в модуле (методы объектов,
+        # встроенные функции), связывание всё равно не разрешит
+        known = {item.name for item in self.imports}
+        known.update(self.functions)
+        return ModuleSummary(
+            imports=tuple(self.imports),
+            functions=tuple(Function(name, tuple(params), tuple(kwonly), tuple(returns))
+                            for name, (params, kwonly, returns) in self.functions.items()),
+            sinks=tuple(sink for sink in self.sinks
+                        if sink.flow[0] != 'call' or sink.flow[1].partition('.')[0] in known),
+            calls=tuple(call for call in self.calls if call.callee.partition('.')[0] in known),
+        )
+
+
+def summarize_file(path, detectors=()):
+    """
+    (отпечаток, сводка, {детектор: [находки]}) файла. Сводка строится в том же
+    обходе дерева, что и правила detectors (с учётом префильтра) - их находки
+    можно сразу положить в кэш, и анализ файла не разберёт его второй раз.
+    Файл с синтаксической ошибкой - пустая сводка и находки None.
+    """
+    with phase('link.read'):
+        source = SourceBuffer.read(path)
+    active = [name for name in detectors if may_match(source.data, DETECTORS[name].trigger_tokens)]
+    try:
+        with phase('link.parse'):
+            tree = ast.parse(source.text, filename=path)
+    except (SyntaxError, UnicodeDecodeError):
+        return source.fingerprint, EMPTY_SUMMARY, None
+    context = FileContext()
+    visitor = SummaryVisitor(path, context)
+    results = {name: [] for name in detectors}
+    results.update(run_rules(tree, path, active, context, {'link.summary': visitor}))
+    return source.fingerprint, visitor.summary(), results
+
+
+def _summarize_chunk(task):
+    """
+    Задача воркера: сводки пачки файлов (с профилировщиком - как pipeline._scan_chunk).
+    """
+    paths, detectors, profile_config = task
+    chunk = []
+    with profiling(Profiler(*profile_config)) if profile_config else contextlib.nullcontext() as profiler:
+        for path in paths:
+            try:
+                chunk.append((path,) + summarize_file(path, detectors))
+            except OSError:
+                continue
+    return chunk, profiler.state() if profiler else None
+
+
+def _summary_key(digest):
+    return f"sql-summary.{SUMMARY_FORMAT}.{ScanCache.detector_version(DETECTORS['sql'])}.{digest}"
+
+
+def _summary_from_data(data):
+    # Сводка из кэша (JSON): кортежи пришли списками
+    imports, functions, sinks, calls = plain_tuples(data)
+    return ModuleSummary(tuple(Import(*item) for item in imports), tuple(Function(*item) for item in functions),
+                         tuple(Sink(*item) for item in sinks), tuple(CallSite(*item) for item in calls))
+
+
+def _linked_from_data(data):
+    # Итог связывания компоненты из кэша: (хэш экспорта, {модуль: (факты функций, находки)})
+    export_hash, exports = data
+    if not isinstance(export_hash, str) or not isinstance(exports, dict):
+        raise ValueError('malformed link result')
+    linked = {}
+    for name, (functions, findings) in exports.items():
+        linked[name] = (tuple((function, Facts(*plain_tuples(facts))) for function, facts in functions),
+                        tuple(Finding(*plain_tuples(finding)) for finding in findings))
+    return export_hash, linked
+
+
+def _stable_hash(value):
+    # Сводки и факты - кортежи строк и чисел: pickle детерминирован
+    return hashlib.sha256(pickle.dumps(value, protocol=4)).hexdigest()
+
+
+def import_root(path):
+    """
+    Каталог, от которого считаются имена модулей: сканируемый каталог
+    или ближайший над ним каталог, который уже не пакет (без __init__.py).
+    """
+    root = path if os.path.isdir(path) else os.path.dirname(path) or '.'
+    root = os.path.abspath(root)
+    while os.path.exists(os.path.join(root, '__init__.py')) and os.path.dirname(root) != root:
+        root = os.path.dirname(root)
+    return root
+
+
+def module_name(root, path):
+    """
+    Имя модуля по пути: pkg/sub/mod.py -> 'pkg.sub.mod', pkg/__init__.py -> 'pkg'.
+    """
+    parts = os.path.relpath(os.path.abspath(path), root)[:-len('.py')].split(os.sep)
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+class _Module:
+    __slots__ = ('name', 'path', 'digest', 'summary', 'is_package', 'aliases', 'deps',
+                 'export_hash', 'findings')
+
+    def __init__(self, name, path, digest, summary):
+        self.name = name
+        self.path = path
+        self.digest = digest
+        self.summary = summary
+        self.is_package = os.path.basename(path) == '__init__.py'
+        self.aliases = {}
+        self.deps = set()
+        self.export_hash = None
+        self.findings = ()
+
+
+# Имя модуля встречается в проекте больше одного раза (суффиксный индекс)
+_AMBIGUOUS = object()
+
+
+class ProjectLinker:
+    """
+    Связывание сводок модулей проекта: разрешение импортов, граф зависимостей,
+    факты о функциях (Facts) по компонентам сильной связности и находки.
+    """
+
+    def __init__(self, modules, cache=None):
+        self.cache = cache
+        self.modules = {module.name: module for module in modules}
+        # 'b.c' и 'c' для модуля 'a.b.c': импорты относительно src/ и т.п. каталогов
+        self.suffixes = {}
+        for name in self.modules:
+            parts = name.split('.')
+            for cut in range(1, len(parts)):
+                suffix = '.'.join(parts[cut:])
+                if suffix not in self.modules:
+                    previous = self.suffixes.get(suffix)
+                    self.suffixes[suffix] = name if previous in (None, name) else _AMBIGUOUS
+        self.facts = {}
+        self._resolved = {}
+        self.relinked = 0
+        for module in self.modules.values():
+            self._resolve_imports(module)
+
+    # --- имена ---
+
+    def find(self, name):
+        module = self.modules.get(name)
+        if module is None:
+            found = self.suffixes.get(name)
+            module = self.modules[found] if isinstance(found, str) else None
+        return module
+
+    def _module_prefix(self, dotted):
+        """
+        (модуль проекта с самым длинным префиксом имени, [остаток имени]) или (None, None).
+        """
+        parts = dotted.split('.')
+        for cut in range(len(parts), 0, -1):
+            module = self.find('.'.join(parts[:cut]))
+            if module is not None:
+                return module, parts[cut:]
+        return None, None
+
+    def _resolve_imports(self, module):
+        package = module.name.split('.') if module.is_package else module.name.split('.')[:-1]
+        package = [part for part in package if part]
+        for item in module.summary.imports:
+            if item.level:
+                if item.level - 1 > len(package):
+                    continue
+                base = package[:len(package) - (item.level - 1)]
+                target = '.'.join(base + [item.target])
+            else:
+                target = item.target
+            module.aliases[item.name] = target
+            dep, _ = self._module_prefix(target)
+            if dep is not None and dep is not module:
+                module.deps.add(dep.name)
+
+    def lookup(self, module, ref):
+        """
+        Функция, которую вызывает ref ('build', 'helpers.build') из модуля:
+        (имя модуля, имя функции) или None.
+        """
+        key = (module.name, ref)
+        if key not in self._resolved:
+            self._resolved[key] = self._function(module, ref.split('.'), 0)
+        return self._resolved[key]
+
+    def _function(self, module, names, depth):
+        if depth > MAX_ALIAS_DEPTH or not names:
+            return None
+        head, rest = names[0], names[1:]
+        if not rest and any(function.name == head for function in module.summary.functions):
+            return module.name, head
+        target = module.aliases.get(head)
+        if target is None:
+            return None
+        found, remainder = self._module_prefix('.'.join([target] + rest))
+        if found is None:
+            return None
+        return self._function(found, remainder, depth + 1)
+
+    # --- потоки ---
+
+    def _taint(self, module, flow):
+        """
+        (подстановки строки из данных или None, параметры текущей функции) для потока.
+        """
+        kind = flow[0]
+        if kind == 'data':
+            return flow[1], ()
+        if kind == 'param':
+            return None, (flow[1],)
+        target = self.lookup(module, flow[1])
+        facts = self.facts.get(target) if target else None
+        if facts is None:
+            return None, ()
+        tainted = facts.tainted
+        params = set()
+        for name, arg in _bound(facts, flow[2], flow[3]):
+            if name in facts.passes:
+                arg_tainted, arg_params = self._taint(module, arg)
+                tainted = tainted or arg_tainted
+                params.update(arg_params)
+        return tainted, tuple(sorted(params))
+
+    def _function_facts(self, module, function, sinks, calls, old):
+        tainted, passes, reached = old.tainted, set(old.passes), set(old.sinks)
+        for flow in function.returns:
+            flow_tainted, params = self._taint(module, flow)
+            tainted = tainted or flow_tainted
+            passes.update(params)
+        for sink in sinks:
+            reached.update(self._taint(module, sink.flow)[1])
+        for call in calls:
+            target = self.lookup(module, call.callee)
+            facts = self.facts.get(target) if target else None
+            if facts is None or not facts.sinks:
+                continue
+            for name, arg in _bound(facts, call.args, call.keywords):
+                if name in facts.sinks:
+                    reached.update(self._taint(module, arg)[1])
+        return Facts(function.params, function.kwonly, tainted, tuple(sorted(passes)), tuple(sorted(reached)))
+
+    def _link_group(self, group):
+        """
+        Факты о функциях компоненты - до неподвижной точки (множества только растут).
+        """
+        by_owner = {}
+        for module in group:
+            for function in module.summary.functions:
+                self.facts[(module.name, function.name)] = Facts(function.params, function.kwonly, None, (), ())
+                by_owner[(module.name, function.name)] = ([], [])
+            for sink in module.summary.sinks:
+                if (module.name, sink.owner) in by_owner:
+                    by_owner[(module.name, sink.owner)][0].append(sink)
+            for call in module.summary.calls:
+                if (module.name, call.owner) in by_owner:
+                    by_owner[(module.name, call.owner)][1].append(call)
+        changed = True
+        while changed:
+            changed = False
+            for module in group:
+                for function in module.summary.functions:
+                    key = (module.name, function.name)
+                    old = self.facts[key]
+                    new = self._function_facts(module, function, *by_owner[key], old)
+                    if new != old:
+                        self.facts[key] = new
+                        changed = True
+        for module in group:
+            module.findings = self._findings(module)
+
+    def _findings(self, module):
+        found = {}
+        for sink in module.summary.sinks:
+            if sink.flow[0] != 'call':
+                continue
+            tainted, _ = self._taint(module, sink.flow)
+            if tainted:
+                built_in = '.'.join(self.lookup(module, sink.flow[1]))
+                found.setdefault((sink.line, built_in, None), Finding(
+                    sink.line, sink.stmt, sink.var_name, tainted, built_in, None, sink.args_span))
+        for call in module.summary.calls:
+            target = self.lookup(module, call.callee)
+            facts = self.facts.get(target) if target else None
+            if facts is None or not facts.sinks:
+                continue
+            for name, arg in _bound(facts, call.args, call.keywords):
+                if name not in facts.sinks or arg[0] == 'param':
+                    continue
+                tainted, _ = self._taint(module, arg)
+                if tainted:
+                    executed_in = '.'.join(target)
+                    found.setdefault((call.line, None, executed_in), Finding(
+                        call.line, call.stmt, None, tainted, None, executed_in, call.args_span))
+        return tuple(found[key] for key in sorted(found, key=lambda key: (key[0], key[1] or '', key[2] or '')))
+
+    def _exports(self, module):
+        return tuple((function.name, self.facts[(module.name, function.name)])
+                     for function in module.summary.functions)
+
+    # --- компоненты ---
+
+    def components(self):
+        """
+        Компоненты сильной связности графа импортов (Тарьян, без рекурсии):
+        каждая - после всех, от которых она зависит.
+        """
+        index, low, on_stack, stack, result = {}, {}, set(), [], []
+        counter = 0
+        for start in sorted(self.modules):
+            if start in index:
+                continue
+            work = [(start, iter(sorted(self.modules[start].deps)))]
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                name, deps = work[-1]
+                for dep in deps:
+                    if dep not in index:
+                        index[dep] = low[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(sorted(self.modules[dep].deps))))
+                        break
+                    if dep in on_stack:
+                        low[name] = min(low[name], index[dep])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[name])
+                    if low[name] == index[name]:
+                        group = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            group.append(self.modules[member])
+                            if member == name:
+                                break
+                        result.append(sorted(group, key=lambda module: module.name))
+        return result
+
+    def link(self):
+        for group in self.components():
+            names = {module.name for module in group}
+            external = sorted({(dep, self.modules[dep].export_hash)
+                               for module in group for dep in module.deps if dep not in names})
+            key = 'sql-link.' + _stable_hash((
+                SUMMARY_FORMAT, ScanCache.detector_version(DETECTORS['sql']),
+                [(module.name, module.digest, module.is_package) for module in group], external,
+            ))
+            linked = self.cache.load_summary(key, _linked_from_data) if self.cache is not None else None
+            if linked is None:
+                self.relinked += len(group)
+                self._link_group(group)
+                exports = {module.name: (self._exports(module), module.findings) for module in group}
+                # Хэш экспорта учитывает зависимости: через реэкспорт они видны зависимым
+                linked = (_stable_hash((sorted(exports.items()), external)), exports)
+                if self.cache is not None:
+                    self.cache.store_summary(key, linked)
+            export_hash, exports = linked
+            for module in group:
+                module.export_hash = export_hash
+                functions, module.findings = exports[module.name]
+                for name, facts in functions:
+                    self.facts[(module.name, name)] = facts
+
+
+def _bound(facts, args, keywords):
+    """
+    (параметр вызываемой функции, поток аргумента) для аргументов вызова.
+    """
+    for name, flow in zip(facts.params, args):
+        if flow is not None:
+            yield name, flow
+    for name, flow in keywords:
+        if name in facts.params or name in facts.kwonly:
+            yield name, flow
+
+
+def _summaries(paths, cache, jobs, detectors=(), max_memory=None, max_tasks_per_child=None):
+    """
+    ([(путь, хэш содержимого, сводка)], сколько файлов разобрано). Хэш берётся
+    из кэша находок, если файл не менялся, сводка - из кэша по хэшу; остальные
+    файлы разбираются (при jobs > 1 - в пуле процессов). С кэшем при разборе
+    заодно работают правила detectors, их находки кэшируются для анализа файлов.
+    """
+    if cache is None:
+        detectors = ()
+    found = []
+    misses = []
+    for path in paths:
+        digest = None
+        if cache is not None:
+            with phase('link.lookup'):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest = cache.known_digest(path, st)
+                if digest is None:
+                    with open(path, 'rb') as f:
+                        digest = content_digest(f.read())
+                summary = cache.load_summary(_summary_key(digest), _summary_from_data)
+            if summary is not None:
+                found.append((path, digest, summary))
+                continue
+        misses.append(path)
+
+    jobs = min(resolve_jobs(jobs), len(misses))
+    if jobs <= 1:
+        found.extend(_stored(_summarize_chunk((misses, detectors, None))[0], cache, detectors))
+    else:
+        profiler = get_profiler()
+        profile_config = profiler.worker_config() if profiler else None
+        chunk_size = chunk_size_for(len(misses), jobs, max_memory)
+        tasks = ((misses[i:i + chunk_size], detectors, profile_config) for i in range(0, len(misses), chunk_size))
+        with worker_pool(jobs, max_tasks_per_child) as pool:
+            for chunk, profile_state in bounded_map(pool, _summarize_chunk, tasks, jobs * IN_FLIGHT_PER_WORKER):
+                if profile_state is not None:
+                    profiler.merge(profile_state)
+                found.extend(_stored(chunk, cache, detectors))
+    return found, len(misses)
+
+
+def _stored(chunk, cache, detectors):
+    specs = [DETECTORS[name] for name in detectors]
+    for path, fingerprint, summary, results in chunk:
+        digest = fingerprint[2]
+        if cache is not None:
+            cache.store_summary(_summary_key(digest), summary)
+            if results is not None:
+                cache.store(path, fingerprint, specs, results)
+        yield path, digest, summary
+
+
+def link_project(path, detectors=('sql',), cache=None, jobs=1, discovery=None, stats=None, max_memory=None,
+                 max_tasks_per_child=None):
+    """
+    Межмодульные SQL-находки по всем .py-файлам под path (Detector.linker_path):
+    {абсолютный путь: [SQLInjection]}. Имена модулей считаются от import_root(path).
+    detectors - детекторы всего прогона: разобранные здесь файлы сразу получают
+    их находки в cache, и pipeline.iter_scan возьмёт их оттуда.
+    """
+    root = import_root(path)
+    paths = list(iter_python_files(path, discovery)) if os.path.isdir(path) else [path]
+    summaries, summarized = _summaries(paths, cache, jobs, detectors, max_memory, max_tasks_per_child)
+    modules = [_Module(module_name(root, fullpath), fullpath, digest, summary)
+               for fullpath, digest, summary in summaries]
+    with phase('link.resolve'):
+        linker = ProjectLinker(modules, cache)
+        linker.link()
+
+    linked = {}
+    for module in modules:
+        if module.findings:
+            linked[os.path.abspath(module.path)] = [_record(module.path, finding) for finding in module.findings]
+    if stats is not None:
+        stats.record_link(len(modules), summarized, linker.relinked)
+    return linked
+
+
+def _record(path, finding):
+    return SQLInjection(
+        file=path,
+        var_name=finding.var_name,
+        param_name=finding.params[0],
+        params=finding.params,
+        lineno_execute=finding.line,
+        query_part='',
+        is_simple=False,
+        fixable=False,
+        augmented=False,
+        def_lines=(),
+        stmt_execute=finding.stmt,
+        args_span=finding.args_span,
+        built_in=finding.built_in,
+        executed_in=finding.executed_in,
+    )
@@ -0,0 +1,288 @@
+"""
+Строковые значения для SQL-детектора: из чего собран запрос.
+
+Значение (Value) - последовательность частей: статический текст (str)
+или подстановка данных (Param - узел выражения; в текст он превращается
+только для находок - значения живут, пока идёт обход одного файла). Значения строятся
+за один проход по ast: литералы, '+', '+=', f-строки, .format() и '%'.
+Присвоения (Def) помнят, где переменная получила значение - по ним фиксер
+понимает, какую инструкцию переписать.
+"""
+import ast
+import json
+import re
+import string
+from collections import namedtuple
+
+# Значение длиннее этого числа частей дальше не растёт (запрос в цикле на тысячи '+=')
+MAX_PARTS = 64
+
+Param = namedtuple('Param', 'node')
+
+# Присвоение, давшее значение переменной:
+# kind - 'assign' (x = ...) или 'augassign' (x += ...),
+# span - координаты значения (assign) или всей инструкции (augassign),
+# block - номер списка инструкций, в котором лежит присвоение, stmt - инструкция верхнего уровня,
+# scope - номер области видимости, order - номер последней привязки имени к моменту присвоения.
+Def = namedtuple('Def', 'lineno kind span block stmt scope order')
+
+
+class Value(namedtuple('Value', 'parts defs exact')):
+    """
+    parts - части строки, defs - присвоения, через которые прошло значение,
+    exact - значение известно точно (не накапливалось в цикле или ветвлении,
+    все подстановки разобраны) - только такой запрос можно переписать.
+    """
+
+    __slots__ = ()
+
+    @property
+    def tainted(self):
+        return any(isinstance(part, Param) for part in self.parts)
+
+    @property
+    def params(self):
+        return tuple(ast.unparse(part.node) for part in self.parts if isinstance(part, Param))
+
+    @property
+    def static_text(self):
+        return ''.join(part for part in self.parts if isinstance(part, str))
+
+
+def static(text):
+    return Value((text,), (), True)
+
+
+def concat(left, right):
+    parts = left.parts + right.parts
+    exact = left.exact and right.exact
+    if len(parts) > MAX_PARTS:
+        parts, exact = parts[:MAX_PARTS], False
+    return Value(parts, left.defs + right.defs, exact)
+
+
+def param(node):
+    """
+    Подстановка данных - выражение (str(x) -> x).
+    """
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'str'
+            and len(node.args) == 1 and not node.keywords):
+        node = node.args[0]
+    return Value((Param(node),), (), True)
+
+
+def evaluate(node, resolve):
+    """
+    Значение строкового выражения или None, если выражение не строит строку.
+    resolve(name) - текущее значение переменной (или None).
+    """
+    if isinstance(node, ast.Constant):
+        return static(node.value) if isinstance(node.value, str) else None
+    if isinstance(node, ast.Name):
+        return resolve(node.id)
+    if isinstance(node, ast.JoinedStr):
+        value = static('')
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                value = concat(value, static(part.value))
+            else:
+                # {x!r:>10} - всё равно подстановка x
+                inner = evaluate(part.value, resolve) if part.conversion == -1 and part.format_spec is None else None
+                value = concat(value, inner if inner is not None else param(part.value))
+        return value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = evaluate(node.left, resolve)
+        right = evaluate(node.right, resolve)
+        if left is None and right is None:
+            return None
+        return concat(left if left is not None else param(node.left),
+                      right if right is not None else param(node.right))
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
+        template = evaluate(node.left, resolve)
+        if template is None:
+            return None
+        return percent_format(template, node.right, resolve)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == 'format'):
+        template = evaluate(node.func.value, resolve)
+        if template is None:
+            return None
+        return str_format(template, node.args, node.keywords, resolve)
+    return None
+
+
+def _argument(node, resolve):
+    value = evaluate(node, resolve)
+    return value if value is not None else param(node)
+
+
+def _inexact(template, extra):
+    # Шаблон не разобрать - данные всё равно попали в запрос
+    value = concat(template, extra)
+    return value._replace(exact=False)
+
+
+_PERCENT_SPEC = re.compile(r'%(?:\((?P<key>[^)]*)\))?[#0\- +]*(?:\*|\d+)?(?:\.(?:\*|\d+))?[hlL]?(?P<type>[diouxXeEfFgGcrsa%])')
+
+
+def percent_format(template, right, resolve):
+    """
+    "... %s ..." % args: спецификаторы - подстановки аргументов по порядку
+    (или по ключу для %(name)s и словаря).
+    """
+    if template.tainted or not template.exact:
+        return _inexact(template, param(right))
+    text = template.static_text
+    if isinstance(right, ast.Tuple):
+        positional, named = list(right.elts), {}
+    elif isinstance(right, ast.Dict) and all(isinstance(k, ast.Constant) for k in right.keys):
+        positional, named = [], {k.value: v for k, v in zip(right.keys, right.values)}
+    else:
+        positional, named = [right], {}
+    if any(isinstance(node, ast.Starred) for node in positional):
+        return _inexact(template, param(right))
+
+    value = static('')
+    pos = 0
+    for match in _PERCENT_SPEC.finditer(text):
+        value = concat(value, static(text[pos:match.start()]))
+        pos = match.end()
+        if match.group('type') == '%':
+            value = concat(value, static('%'))
+            continue
+        key = match.group('key')
+        if key is not None and key in named:
+            value = concat(value, _argument(named[key], resolve))
+        elif key is None and positional:
+            value = concat(value, _argument(positional.pop(0), resolve))
+        else:
+            return _inexact(template, param(right))
+    if positional:
+        return _inexact(template, param(right))
+    value = concat(value, static(text[pos:]))
+    return value._replace(defs=template.defs)
+
+
+def str_format(template, args, keywords, resolve):
+    """
+    "...{}...{name}...".format(...): поля - подстановки аргументов.
+    """
+    extra = [param(node) for node in list(args) + [kw.value for kw in keywords]]
+    if template.tainted or not template.exact or any(isinstance(a, ast.Starred) for a in args) \
+            or any(kw.arg is None for kw in keywords):
+        value = template
+        for item in extra:
+            value = _inexact(value, item)
+        return value
+    named = {kw.arg: kw.value for kw in keywords}
+    value = static('')
+    auto = 0
+    try:
+        fields = list(string.Formatter().parse(template.static_text))
+    except ValueError:
+        return _inexact(template, extra[0] if extra else static(''))
+    for literal, field, _, _ in fields:
+        value = concat(value, static(literal))
+        if field is None:
+            continue
+        # {0.attr} / {name[key]} в параметр не переписать - подстановка сама по себе
+        head = re.match(r'[^.\[]*', field).group(0)
+        if head != field:
+            return _inexact(template, extra[0] if extra else static(''))
+        if head == '':
+            index = auto
+            auto += 1
+            node = args[index] if index < len(args) else None
+        elif head.isdigit():
+            node = args[int(head)] if int(head) < len(args) else None
+        else:
+            node = named.get(head)
+        if node is None:
+            return _inexact(template, extra[0] if extra else static(''))
+        value = concat(value, _argument(node, resolve))
+    return value._replace(defs=template.defs)
+
+
+# Подстановка после этих слов - имя таблицы/столбца: его нельзя передать параметром
+_IDENTIFIER_CONTEXT = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE|BY)\s*$', re.IGNORECASE)
+
+
+def substitutes_identifier(value):
+    """
+    Есть ли подстановка на месте идентификатора (SELECT * FROM {table}, ORDER BY {col}).
+    """
+    before = ''
+    for part in value.parts:
+        if isinstance(part, Param):
+            if _IDENTIFIER_CONTEXT.search(before):
+                return True
+            before = ''
+        else:
+            before += part
+    return False
+
+
+def merge(values):
+    """
+    Значение переменной там, где сходятся ветки (после if, цикла, try, match):
+    values - значения в конце каждой ветки (None - не строка или не присвоено).
+    Совпадающие значения остаются как есть. Иначе результат неточный: подстановки
+    всех веток с данными (находка покажет каждую), присвоения всех веток.
+    Если данных нет ни в одной ветке, а строкой значение известно не везде - None.
+    """
+    distinct = []
+    for value in values:
+        if value not in distinct:
+            distinct.append(value)
+    if len(distinct) == 1:
+        return distinct[0]
+    known = [value for value in distinct if value is not None]
+    tainted = [value for value in known if value.tainted]
+    if not tainted and len(known) < len(distinct):
+        return None
+    parts = ()
+    for value in tainted or known[:1]:
+        parts += value.parts
+    defs = sorted({d for value in known for d in value.defs}, key=lambda d: (d.lineno, d.span))
+    return Value(parts[:MAX_PARTS], tuple(defs), False)
+
+
+def with_def(value, definition, exact=True):
+    """
+    Значение переменной после присвоения definition.
+    """
+    return Value(value.parts, value.defs + (definition,), value.exact and exact)
+
+
+def query_template(value):
+    """
+    Параметризованный запрос для DB-API (paramstyle format): подстановки -> %s,
+    литеральный '%' удваивается. Кавычки вокруг подстановки ('%s') убираются -
+    значение экранирует драйвер.
+    """
+    pieces = []
+    parts = list(value.parts)
+    for index, part in enumerate(parts):
+        if isinstance(part, Param):
+            before = pieces[-1] if pieces else ''
+            after = parts[index + 1] if index + 1 < len(parts) and isinstance(parts[index + 1], str) else ''
+            if before[-1:] in ("'", '"') and after[:1] == before[-1:]:
+                pieces[-1] = before[:-1]
+                parts[index + 1] = after[1:]
+            pieces.append('%s')
+        else:
+            pieces.append(part.replace('%', '%%'))
+    return ''.join(pieces)
+
+
+def string_literal(text):
+    """
+    Python-литерал в двойных кавычках (экранирование JSON допустимо и в Python).
+    """
+    return json.dumps(text, ensure_ascii=False)
+
+
+def params_tuple(params):
+    if len(params) == 1:
+        return f"({params[0]},)"
+    return f"({', '.join(params)})"
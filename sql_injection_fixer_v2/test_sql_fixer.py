@@ -1,267 +1,549 @@
 import ast
-import os
-import argparse
-import libcst as cst
-from libcst.metadata import MetadataWrapper, PositionProvider
+import logging
 
+from fixer_core.pipeline import iter_scan
+from fixer_core.records import Record
+from fixer_core.rules import Rule
+from sql_injection_fixer_v2.taint import (
+    Def, Param, concat, evaluate, merge, param, query_template, substitutes_identifier, with_def,
+)
 
-class SQLInjectionVisitor(ast.NodeVisitor):
+logger = logging.getLogger(__name__)
+
+# Имя ещё не было привязано в области видимости к началу развилки
+_UNBOUND = object()
+
+
+def __getattr__(name):
+    # SQLInjectionFixer переехал в cst_fixer (тянет libcst) - отдаём его лениво
+    if name == 'SQLInjectionFixer':
+        from sql_injection_fixer_v2.cst_fixer import SQLInjectionFixer
+        return SQLInjectionFixer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _node_span(node):
+    return node.lineno, node.col_offset, node.end_lineno, node.end_col_offset
+
+
+class SQLInjection(Record):
     """
-    Ищем небезопасную конкатенацию строк для SQL‑запросов
-    и f‑строки вида  f"... {param} ..."
+    Находка SQL-детектора - вызов execute с запросом, собранным из данных.
+    params - подстановки (исходный текст выражений) в порядке их появления в запросе,
+    param_name - первая из них; query - тот же запрос с %s вместо подстановок
+    (None, если запрос не переписать),
+    query_part - весь статический текст запроса.
+    lineno_assign / value_span / stmt_assign - последнее присвоение переменной-запроса
+    (None, если запрос собран прямо в аргументе execute), def_lines - все присвоения,
+    через которые прошёл запрос. augmented - последнее присвоение было '+=' (фиксер
+    переписывает инструкцию целиком). fixable - запрос известен точно и его можно
+    переписать (не накапливался в цикле или ветвлении, собран в той же области видимости,
+    имена в подстановках не переприсвоены до execute, подстановки - не имена таблиц).
+    built_in / executed_in - находки межмодульного анализа (--interprocedural, см. interproc):
+    запрос для execute на этой строке собран в функции built_in, или собранный здесь
+    запрос передаётся в функцию executed_in и выполняется там (тогда lineno_execute -
+    строка вызова этой функции). Такие находки не исправляются автоматически.
     """
-    def __init__(self, filename):
-        self.filename = filename
+
+    fields = ('file', 'lineno_assign', 'var_name', 'param_name', 'params', 'lineno_execute', 'query_part',
+              'query', 'is_simple', 'fixable', 'augmented', 'def_lines', 'stmt_assign', 'stmt_execute',
+              'value_span', 'args_span', 'built_in', 'executed_in')
+    __slots__ = fields
+
+
+def _param_names(value):
+    # Имена, которые читают подстановки запроса
+    return {node.id for part in value.parts if isinstance(part, Param)
+            for node in ast.walk(part.node) if isinstance(node, ast.Name)}
+
+
+def _assigned_names(node):
+    # Имена, которым что-то присваивается внутри node
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+            names.add(child.id)
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            names.add(child.name)
+    return names
+
+
+class SQLInjectionVisitor(Rule):
+    """
+    Ищем вызовы execute(...), чей запрос собран из данных: конкатенация ('+', '+='),
+    f-строки, .format() и '%' - в том числе через несколько инструкций и переменных.
+    Правило работает в общем обходе (fixer_core.rules): строковые значения
+    переменных (taint.Value) обновляются по мере обхода присвоений и хранятся
+    в индексе (область видимости, имя), вызов execute разрешается поиском по этому индексу.
+    Ветки if и case проходятся каждая от состояния до развилки, обработчики except -
+    от слияния состояний до и после try; после if, цикла, try и match
+    значения веток (и пути в обход тела) сливаются (taint.merge): если они разные,
+    значение неточное и несёт подстановки всех веток - находка есть на каждом пути,
+    автоисправления нет. Накопленное в цикле '+=' и присвоенное через ':=' тоже неточное.
+    stmt_assign / stmt_execute - строки инструкций верхнего уровня,
+    в которых лежат присвоение и вызов execute,
+    value_span / args_span - точные координаты значения и аргументов execute.
+    """
+    def __init__(self, filename, context=None):
+        super().__init__(filename, context)
         self.vulnerabilities = []
+        # (область видимости, имя) -> taint.Value переменной или None, если
+        # ей присвоено не строковое значение. Области, блоки и циклы ведёт движок (self.context)
+        self._bindings = {}
+        # Каждая привязка получает следующий номер: ключ -> номер последней привязки
+        self._order = 0
+        self._stamps = {}
+        # Стек развилок: ({ключ: (значение, номер) до развилки (значение _UNBOUND - не было)},
+        # [значения в конце пройденных веток])
+        self._forks = []
+        # Стек циклов: [номер привязки перед циклом, узел цикла, имена, присваиваемые в цикле (лениво)]
+        self._loops = []
+        # Стек try: снимки состояния в точках branch_Try (см. _branch_try)
+        self._tries = []
+
+    @staticmethod
+    def to_record(vuln):
+        """
+        JSON-совместимое представление находки (для --format jsonl/json/sarif).
+        Буфер с содержимым файла (source) в запись не попадает.
+        """
+        return vuln.as_dict()
 
-    def _extract_param_name(self, binop_node):
+    @staticmethod
+    def describe(vuln):
         """
-        Если binop_node = <string> + str(...), пытаемся вытащить имя переменной.
+        Одна строка о находке для отчётов (message в SARIF).
         """
-        for side in (binop_node.left, binop_node.right):
-            if isinstance(side, ast.Call):
-                if isinstance(side.func, ast.Name) and side.func.id == 'str' and \
-                        side.args and isinstance(side.args[0], ast.Name):
-                    return side.args[0].id
-        return None
+        params = ', '.join(vuln['params'])
+        if vuln['built_in']:
+            return f"Query passed to execute() is built from data in {vuln['built_in']}(): {params}; not auto-fixed"
+        if vuln['executed_in']:
+            return f"Query built here from data ({params}) reaches execute() in {vuln['executed_in']}(); not auto-fixed"
+        query = f"Query '{vuln['var_name']}'" if vuln['var_name'] else 'Query'
+        text = f"{query} passed to execute() is built from data: {params}"
+        if vuln['fixable']:
+            return f"{text}; pass the values as query parameters"
+        return (f"{text}; built in a loop, a branch, another scope, from reassigned values "
+                "or with a data-driven identifier, not auto-fixed")
+
+    # --- области видимости ---
+
+    def _value(self, node):
+        """
+        Строковое значение выражения (taint.Value) в текущей точке обхода или None.
+        """
+        return evaluate(node, self._resolve)
 
-    def _extract_query_part(self, binop_node):
+    def _bind(self, name, value):
+        self._set((self.context.scope, name), value)
+
+    def _set(self, key, value):
+        if self._forks:
+            saved = self._forks[-1][0]
+            if key not in saved:
+                saved[key] = (self._bindings.get(key, _UNBOUND), self._stamps.get(key, 0))
+        self._bindings[key] = value
+        self._order += 1
+        self._stamps[key] = self._order
+
+    def _restore(self, key, saved):
+        value, self._stamps[key] = saved
+        if value is _UNBOUND:
+            self._bindings.pop(key, None)
+        else:
+            self._bindings[key] = value
+
+    # --- развилки ---
+
+    def _fork(self, node=None):
+        self._forks.append(({}, []))
+
+    def _next_branch(self, node=None):
         """
-        Ищем статичную часть запроса.
+        Очередная ветка начинается с состояния до развилки; значения прошлой запоминаем.
         """
-        for side in (binop_node.left, binop_node.right):
-            if isinstance(side, ast.Constant) and isinstance(side.value, str):
-                return side.value
-        return None
+        saved, branches = self._forks[-1]
+        branches.append({key: self._bindings.get(key, _UNBOUND) for key in saved})
+        for key, before in saved.items():
+            self._restore(key, before)
 
-    def _extract_from_fstring(self, joined: ast.JoinedStr):
+    def _join(self, may_skip):
         """
-        Разбираем f‑строку, возвращаем (param_name, static_part).
-        Берём только **первую** подстановку вида {param}.
+        Слияние веток; may_skip - тело может не выполниться (цикл, try, match):
+        значение до развилки - ещё один путь.
         """
-        param_name = None
-        static_parts = []
-        for part in joined.values:
-            # Статическая строка
-            if isinstance(part, ast.Constant) and isinstance(part.value, str):
-                static_parts.append(part.value)
-            # Подстановка {param}
-            elif isinstance(part, ast.FormattedValue) and isinstance(part.value, ast.Name):
-                if param_name is None:  # берём только первое вхождение
-                    param_name = part.value.id
-        return param_name, ''.join(static_parts)
-
-    def _is_simple_concatenation(self, binop_node):
+        saved, branches = self._forks.pop()
+        branches.append({key: self._bindings.get(key, _UNBOUND) for key in saved})
+        if may_skip:
+            branches.append({key: value for key, (value, _) in saved.items()})
+        for key, before in saved.items():
+            values = [branch.get(key, before[0]) for branch in branches]
+            # Сначала - значение до развилки: объемлющая развилка запомнит именно его
+            self._restore(key, before)
+            self._set(key, merge([None if value is _UNBOUND else value for value in values]))
+
+    visit_If = visit_Match = _fork
+    branch_If = visit_match_case = _next_branch
+
+    def leave_If(self, node):
+        self._join(may_skip=False)
+
+    def leave_Match(self, node):
+        self._join(may_skip=True)
+
+    def _snapshot(self):
+        # Значения и номера привязок имён, изменённых в текущей развилке
+        return {key: (self._bindings.get(key, _UNBOUND), self._stamps.get(key, 0)) for key in self._forks[-1][0]}
+
+    def _apply(self, state):
+        for key, before in self._forks[-1][0].items():
+            self._restore(key, state.get(key, before))
+
+    def _merged(self, key, states):
+        before = self._forks[-1][0][key]
+        return merge([None if value is _UNBOUND else value for value, _ in (state.get(key, before) for state in states)])
+
+    def _merge_states(self, states):
         """
-        Проверяем, является ли конкатенация "простой" (одна переменная).
+        Текущее состояние - слияние снимков states; совпадающие привязки остаются как есть.
         """
-        return isinstance(binop_node.left, ast.Constant) and isinstance(binop_node.right, ast.Call)
-
-    def visit_Assign(self, node):
+        for key, before in self._forks[-1][0].items():
+            pairs = {state.get(key, before) for state in states}
+            if len(pairs) == 1:
+                self._restore(key, pairs.pop())
+            else:
+                self._restore(key, before)
+                self._set(key, self._merged(key, states))
+
+    def _enter_try(self, node):
+        self._fork()
+        self._tries.append({'points': 0, 'ends': []})
+
+    def _branch_try(self, node):
         """
-        Ищем присвоение вида:
-            query = "SELECT ... " + str(param)
-            query = f"SELECT ... {param}"
+        Точки branch_Try: перед каждым обработчиком except, перед else, перед finally.
+        Исключение прерывает body где угодно - обработчик начинается со слияния
+        состояний до и после body; else продолжает body; finally проходит после
+        любого пути, в том числе с исключением, которое дальше не обработано.
         """
-        if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
-            var_name = node.targets[0].id
-
-            # --- вариант 1: конкатенация ---
-            if isinstance(node.value, ast.BinOp) and isinstance(node.value.op, ast.Add):
-                param_name = self._extract_param_name(node.value)
-                query_part = self._extract_query_part(node.value)
-
-                if param_name or query_part:
-                    is_simple = self._is_simple_concatenation(node.value)
-
-                    self.vulnerabilities.append({
-                        'file': self.filename,
-                        'lineno_assign': node.lineno,
-                        'var_name': var_name,
-                        'param_name': param_name,
-                        'lineno_execute': None,
-                        'query_part': query_part,
-                        'is_simple': is_simple
-                    })
-                    print(f"[DEBUG] Found vulnerability at line {node.lineno} in {self.filename}: "
-                          f"query = {var_name} + {param_name} (simple: {is_simple})")
-
-            # --- вариант 2: f‑строка ---
-            elif isinstance(node.value, ast.JoinedStr):
-                param_name, query_part = self._extract_from_fstring(node.value)
-                if param_name:
-                    self.vulnerabilities.append({
-                        'file': self.filename,
-                        'lineno_assign': node.lineno,
-                        'var_name': var_name,
-                        'param_name': param_name,
-                        'lineno_execute': None,
-                        'query_part': query_part,
-                        'is_simple': True          # для f‑строки считаем "простой"
-                    })
-                    print(f"[DEBUG] Found f‑string vulnerability at line {node.lineno} "
-                          f"in {self.filename}: query = {var_name} (param: {param_name})")
-
-        self.generic_visit(node)
-
-    def visit_Call(self, node):
+        frame = self._tries[-1]
+        point = frame['points']
+        frame['points'] += 1
+        saved = self._forks[-1][0]
+        handlers = len(node.handlers)
+        if point == 0:
+            frame['body'] = self._snapshot()
+            self._merge_states([saved, frame['body']])
+            frame['handled'] = self._snapshot()
+        elif point <= handlers:
+            frame['ends'].append(self._snapshot())
+        if 0 < point < handlers:
+            self._apply(frame['handled'])
+        elif point == handlers:
+            self._apply(frame['body'])
+        elif point == handlers + 1:
+            # Обычный выход из try - после else или после обработчика
+            frame['normal'] = [self._snapshot()] + frame['ends']
+            self._merge_states(frame['normal'] + [saved, frame['body']])
+            frame['finally'] = self._snapshot()
+
+    def _leave_try(self, node):
         """
-        Ищем cursor.execute(...).
+        После try: имя, привязанное в finally, - его значение там, остальные - слияние
+        обычных выходов (после else и после каждого обработчика).
         """
-        if isinstance(node.func, ast.Attribute) and node.func.attr == 'execute' and node.args:
-            first_arg = node.args[0]
-            if isinstance(first_arg, ast.Name):
-                call_var = first_arg.id
-                for vuln in self.vulnerabilities:
-                    if vuln['var_name'] == call_var and vuln['lineno_execute'] is None:
-                        vuln['lineno_execute'] = node.lineno
-                        print(f"[DEBUG] Found cursor.execute() call at line {node.lineno} for {call_var}")
-
-        self.generic_visit(node)
-
-
-class SQLInjectionFixer(cst.CSTTransformer):
-    """
-    Исправляем найденные уязвимости.
-    """
-    METADATA_DEPENDENCIES = (PositionProvider,)
-
-    def __init__(self, vulnerabilities):
-        self.vulns_by_line = {}
-        for vuln in vulnerabilities:
-            lineno_assign = vuln['lineno_assign']
-            lineno_execute = vuln['lineno_execute']
-            self.vulns_by_line[lineno_assign] = vuln
-            if lineno_execute:
-                self.vulns_by_line[lineno_execute] = vuln
-
-    def leave_Assign(self, original_node, updated_node):
+        frame = self._tries.pop()
+        saved = self._forks[-1][0]
+        after = {}
+        for key, before in saved.items():
+            current = (self._bindings.get(key, _UNBOUND), self._stamps.get(key, 0))
+            if current != frame['finally'].get(key, before):
+                after[key] = None if current[0] is _UNBOUND else current[0]
+            else:
+                after[key] = self._merged(key, frame['normal'])
+        self._forks.pop()
+        for key, before in saved.items():
+            self._restore(key, before)
+            self._set(key, after[key])
+
+    visit_Try = visit_TryStar = _enter_try
+    branch_Try = branch_TryStar = _branch_try
+    leave_Try = leave_TryStar = _leave_try
+
+    def _enter_loop(self, node):
+        self._loops.append([self._order, node, None])
+        self._fork()
+
+    def _leave_loop(self, node):
+        self._loops.pop()
+        self._join(may_skip=True)
+
+    visit_While = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+
+    def _key(self, name):
         """
-        Исправляем присвоение SQL-запроса, оставляя оригинальную структуру.
+        Ключ имени в текущей области видимости: ищем от текущей области
+        к модулю (тело класса из вложенных функций не видно). None - имя не привязано.
         """
-        position = self.get_metadata(PositionProvider, original_node)
-        if not position:
-            return updated_node
-
-        line_number = position.start.line
-        vuln = self.vulns_by_line.get(line_number)
-        if vuln:
-            var_name = vuln['var_name']
-            if len(original_node.targets) == 1 and isinstance(original_node.targets[0].target, cst.Name) and \
-                    original_node.targets[0].target.value == var_name:
-
-                query_part = vuln.get('query_part')
-
-                # Если `query_part` найден, оставляем его без изменений
-                if query_part:
-                    print(f"[DEBUG] Keeping original query structure: {query_part}")
-                    new_value = cst.SimpleString(f'"{query_part} %s"')
-                else:
-                    new_value = cst.SimpleString('"SELECT * FROM users WHERE nickname = %s"')
-
-                print(f"[DEBUG] Replaced query: {new_value.value}")
-                return updated_node.with_changes(value=new_value)
+        for depth, (scope, is_class) in enumerate(reversed(self.context.scopes)):
+            if is_class and depth:
+                continue
+            key = (scope, name)
+            if key in self._bindings:
+                return key
+        return None
 
-        return updated_node
+    def _resolve(self, name):
+        key = self._key(name)
+        return self._bindings[key] if key is not None else None
 
-    def leave_Call(self, original_node, updated_node):
+    def _rebound_since(self, names, order):
         """
-        Исправляем вызов cursor.execute().
+        Привязано ли какое-то из имён names заново после привязки номер order -
+        в обходе до текущей точки или в цикле, начатом позже (следующая итерация).
         """
-        position = self.get_metadata(PositionProvider, original_node)
-        if not position:
-            return updated_node
-
-        line_number = position.start.line
-        vuln = self.vulns_by_line.get(line_number)
-        if vuln:
-            if isinstance(original_node.func, cst.Attribute) and original_node.func.attr.value == 'execute':
-                query_var = vuln['var_name']
-                param_var = vuln['param_name']
-                query_arg = cst.Arg(value=cst.Name(query_var))
-                param_arg = cst.Arg(value=cst.Tuple([cst.Element(cst.Name(param_var))]))
-                print(f"[DEBUG] Replaced execute: {query_var}, ({param_var})")
-                return updated_node.with_changes(args=[query_arg, param_arg])
+        for name in names:
+            key = self._key(name)
+            if key is not None and self._stamps.get(key, 0) > order:
+                return True
+        for loop in self._loops:
+            if loop[0] <= order:
+                continue
+            if loop[2] is None:
+                loop[2] = _assigned_names(loop[1])
+            if not names.isdisjoint(loop[2]):
+                return True
+        return False
+
+    def _bind_targets(self, target):
+        if isinstance(target, ast.Name):
+            self._bind(target.id, None)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                self._bind_targets(element)
+        elif isinstance(target, ast.Starred):
+            self._bind_targets(target.value)
+
+    def _bind_arguments(self, node):
+        # Параметр функции перекрывает одноимённый запрос объемлющей области
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]:
+            self._bind(arg.arg, None)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _bind_arguments
+
+    def _bind_loop_target(self, node):
+        self._enter_loop(node)
+        self._bind_targets(node.target)
+
+    visit_For = visit_AsyncFor = _bind_loop_target
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self._bind(node.name, None)
+
+    def leave_withitem(self, node):
+        if node.optional_vars is not None:
+            self._bind_targets(node.optional_vars)
+
+    def _bind_capture(self, node):
+        # case [q, *rest], case {**rest}, case str() as q - захваченное значение - данные
+        name = node.rest if isinstance(node, ast.MatchMapping) else node.name
+        if name:
+            self._bind(name, None)
+
+    visit_MatchAs = visit_MatchStar = visit_MatchMapping = _bind_capture
+
+    # --- присвоения ---
+
+    def _definition(self, node, kind, span):
+        context = self.context
+        return Def(node.lineno, kind, span, context.block, context.current_stmt, context.scope, self._order)
+
+    def leave_Assign(self, node):
+        """
+        query = "SELECT ... " + str(param), query = f"...{param}",
+        query = "...{}".format(param), query = "...%s" % param, query = base + ...
+        """
+        # leave_: имена привязываем после обхода значения - справа ещё видно старое значение
+        value = self._value(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name) and value is not None:
+                self._bind(target.id, with_def(value, self._definition(node, 'assign', _node_span(node.value))))
+            else:
+                self._bind_targets(target)
+
+    def leave_AnnAssign(self, node):
+        if node.value is None:
+            return
+        value = self._value(node.value)
+        if isinstance(node.target, ast.Name) and value is not None:
+            self._bind(node.target.id, with_def(value, self._definition(node, 'assign', _node_span(node.value))))
+        else:
+            self._bind_targets(node.target)
+
+    def leave_NamedExpr(self, node):
+        """
+        (query := "SELECT ... " + str(param)) - присвоение внутри выражения (в условии,
+        в генераторе) переписывать не берёмся: значение неточное.
+        """
+        value = self._value(node.value)
+        if value is not None:
+            value = with_def(value, self._definition(node, 'assign', _node_span(node.value)), exact=False)
+        self._bind(node.target.id, value)
 
-        return updated_node
+    def leave_AugAssign(self, node):
+        """
+        query += " AND name = " + str(param)
+        """
+        if not isinstance(node.target, ast.Name):
+            return
+        name = node.target.id
+        old = self._resolve(name)
+        added = self._value(node.value) if isinstance(node.op, ast.Add) else None
+        if added is None and (old is None or not isinstance(node.op, ast.Add)):
+            self._bind(name, None)
+            return
+        # Точно переписать '+=' можно, только если всё накопление - подряд в одном блоке
+        context = self.context
+        exact = context.loops == 0 and old is not None and all(d.block == context.block for d in old.defs)
+        value = concat(old if old is not None else param(node.target),
+                       added if added is not None else param(node.value))
+        self._bind(name, with_def(value, self._definition(node, 'augassign', _node_span(node)), exact))
+
+    # --- стоки ---
+
+    def leave_Call(self, node):
+        """
+        Ищем cursor.execute(query): запрос - переменная или выражение,
+        собранные из данных.
+        """
+        if not (isinstance(node.func, ast.Attribute) and node.func.attr == 'execute' and node.args):
+            return
+        query_arg = node.args[0]
+        value = self._value(query_arg)
+        if value is None or not value.tainted:
+            return
+
+        var_name = query_arg.id if isinstance(query_arg, ast.Name) else None
+        last = value.defs[-1] if var_name and value.defs else None
+        fixable = (value.exact and len(node.args) == 1 and not node.keywords
+                   and (last is None or last.kind == 'assign' or last.block == self.context.block)
+                   and not substitutes_identifier(value))
+        if fixable and value.defs:
+            # Фикс передаёт подстановки в execute: там они должны значить то же, что при сборке запроса
+            fixable = (all(d.scope == self.context.scope for d in value.defs)
+                       and not self._rebound_since(_param_names(value), min(d.order for d in value.defs)))
+        params = value.params
+        self.vulnerabilities.append(SQLInjection(
+            file=self.filename,
+            lineno_assign=last.lineno if last else None,
+            var_name=var_name,
+            param_name=params[0],
+            params=params,
+            lineno_execute=node.lineno,
+            query_part=value.static_text,
+            query=query_template(value) if fixable else None,
+            is_simple=len(params) == 1 and len(value.defs) <= 1,
+            fixable=fixable,
+            augmented=last is not None and last.kind == 'augassign',
+            def_lines=tuple(sorted({d.lineno for d in value.defs})),
+            stmt_assign=last.stmt if last else None,
+            stmt_execute=self.context.current_stmt,
+            value_span=last.span if last else None,
+            args_span=(node.args[0].lineno, node.args[0].col_offset,
+                       node.args[-1].end_lineno, node.args[-1].end_col_offset),
+        ))
+        logger.debug("Found SQL injection sink at line %s in %s: %s <- %s",
+                     node.lineno, self.filename, var_name or '<inline>', ', '.join(params))
+
+
+def iter_sql_injections(path, **scan_options):
+    """
+    Генератор: отдаём уязвимости по мере того, как обработан очередной файл.
+    Опции scan_options (jobs, cache, files, line_filter, ...) - см. fixer_core.pipeline.iter_scan.
+    """
+    for _, results in iter_scan(path, ('sql',), **scan_options):
+        yield from results['sql']
 
 
-def analyze_sql_injections(path):
+def analyze_sql_injections(path, **scan_options):
     """
     Рекурсивно обходим каталоги, ищем .py‑файлы,
     запускаем SQLInjectionVisitor для сбора уязвимостей.
     """
-    vulnerabilities = []
-    for root, _, files in os.walk(path):
-        for filename in files:
-            if filename.endswith('.py'):
-                fullpath = os.path.join(root, filename)
-                with open(fullpath, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                try:
-                    tree = ast.parse(code, filename=fullpath)
-                    visitor = SQLInjectionVisitor(fullpath)
-                    visitor.visit(tree)
-                    vulnerabilities.extend(visitor.vulnerabilities)
-                except SyntaxError as e:
-                    print(f"[SYNTAX ERROR] {fullpath}: {e}")
-    return vulnerabilities
-
-
-def fix_sql_injections(vulnerabilities):
+    return list(iter_sql_injections(path, **scan_options))
+
+
+def fix_sql_injections(vulnerabilities, jobs=1, **fix_options):
     """
     Для каждого файла, у которого есть уязвимости,
     делаем трансформацию с помощью LibCST.
-    Результат пишем в "secure_<filename>".
+    Результат пишем в "secure_<filename>" (при jobs > 1 - в пуле процессов).
+    vulnerabilities - список находок или FindingSpool; fix_options - см. apply_fixes.
     """
-    from collections import defaultdict
-    vulns_by_file = defaultdict(list)
-    for v in vulnerabilities:
-        vulns_by_file[v['file']].append(v)
-
-    for file, vulns in vulns_by_file.items():
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-            cst_tree = cst.parse_module(source_code)
-
-            # Применяем фикс для SQLi
-            wrapper = MetadataWrapper(cst_tree)
-            fixer = SQLInjectionFixer(vulns)
-            new_tree = wrapper.visit(fixer)
-
-            # Пишем в новый файл
-            new_filename = f"secure_{os.path.basename(file)}"
-            secure_path = os.path.join(os.path.dirname(file), new_filename)
-            with open(secure_path, 'w', encoding='utf-8') as f_out:
-                f_out.write(new_tree.code)
-            print(f"[FIXED] Corrected file created: {secure_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to process {file}: {e}")
+    # LibCST и движок фиксов грузим только здесь: анализ без --fix их не импортирует
+    from fixer_core.fix_engine import apply_fixes
+
+    findings = vulnerabilities if hasattr(vulnerabilities, 'by_file') else {'sql': vulnerabilities}
+    apply_fixes(findings, jobs=jobs, **fix_options)
 
 
 def main():
-    # print("asdasdsad")
-    parser = argparse.ArgumentParser(description='Autofix SQL-injections (конкатенация + f‑строки).')
+    # CLI, отчёты и spool нужны только точке входа: модуль детектора грузят и воркеры
+    import argparse
+
+    from fixer_core.cli import add_scan_arguments, redirect_output_for, scan_options_from_args
+    from fixer_core.output import emit_report
+    from fixer_core.spool import FindingSpool, spooled_findings
+
+    parser = argparse.ArgumentParser(description='Autofix SQL-injections (конкатенация, +=, f‑строки, .format(), %).')
     parser.add_argument('path', help='Path to the directory with Python files')
     parser.add_argument('--fix', action='store_true', help='Automatically fix vulnerabilities')
+    add_scan_arguments(parser)
     args = parser.parse_args()
 
-    # Шаг 1. Сбор всех уязвимостей
-    vulnerabilities = analyze_sql_injections(args.path)
-    if vulnerabilities:
-        print("[!] SQL-injection vulnerabilities found:")
-        for v in vulnerabilities:
-            print(f" - {v['file']} (line {v['lineno_assign']}): dangerous concatenation "
-                  f"for variable '{v['var_name']}' -> {v['param_name']}")
-            if v['lineno_execute']:
+    # Шаг 1. Сбор всех уязвимостей (печатаем по мере нахождения;
+    # находки - и буферы с исходниками - откладываем только для --fix,
+    # при --max-memory - с выгрузкой на диск)
+    found = 0
+    with scan_options_from_args(args) as scan_options, FindingSpool.for_budget(args.max_memory) as spool:
+        results = iter_scan(args.path, ('sql',), **scan_options)
+        if args.format != 'text':
+            emit_report(results, args.format, ('sql',), spool=spool if args.fix else None)
+        else:
+            for v in spooled_findings(results, 'sql', spool if args.fix else None):
+                if not found:
+                    print("[!] SQL-injection vulnerabilities found:")
+                found += 1
+                params = ', '.join(v['params'])
+                if v['executed_in']:
+                    print(f" - {v['file']} (line {v['lineno_execute']}): query built here is executed "
+                          f"in {v['executed_in']}() -> {params}")
+                    print("      Cross-function finding: reported only, not auto-fixed")
+                    continue
+                if v['built_in']:
+                    print(f" - {v['file']} (line {v['lineno_execute']}): query built in {v['built_in']}() -> {params}")
+                elif v['var_name']:
+                    print(f" - {v['file']} (line {v['lineno_assign']}): dangerous concatenation "
+                          f"for variable '{v['var_name']}' -> {params}")
+                else:
+                    print(f" - {v['file']} (line {v['lineno_execute']}): dangerous query built in the call -> {params}")
                 print(f"      Found cursor.execute(...) on line {v['lineno_execute']}")
-
-        # Шаг 2. При необходимости делаем фиксы
-        if args.fix:
-            fix_sql_injections(vulnerabilities)
-    else:
-        print("No SQL-injection vulnerabilities found.")
+                if v['built_in']:
+                    print("      Cross-function finding: reported only, not auto-fixed")
+                elif not v['fixable']:
+                    print("      Query is built in a loop, a branch, another scope, from reassigned values "
+                          "or with a data-driven identifier: reported only, not auto-fixed")
+
+        if len(spool):
+            # Шаг 2. При необходимости делаем фиксы (внутри блока - чтобы попасть в --timings)
+            with redirect_output_for(args.format):
+                fix_sql_injections(spool, jobs=args.jobs, max_tasks_per_child=scan_options.get('max_tasks_per_child'),
+                                   max_memory=args.max_memory)
+        elif not found and args.format == 'text':
+            print("No SQL-injection vulnerabilities found.")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+import os
+import pickle
+
+from fixer_core.cache import ScanCache
+from fixer_core.pipeline import DETECTORS, scan_data
+
+
+class _Exploit:
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return open, (self.marker, 'w')
+
+
+def _scanned(tmp_path):
+    path = tmp_path / 'app.py'
+    path.write_text('def run(cursor, name):\n    cursor.execute("SELECT * FROM t WHERE n = " + name)\n')
+    fullpath = str(path)
+    file_scan = scan_data(fullpath, path.read_bytes(), ('sql',))
+    st = os.stat(fullpath)
+    return fullpath, (st.st_size, st.st_mtime_ns, file_scan.fingerprint[2]), file_scan.results
+
+
+def test_findings_round_trip(tmp_path):
+    fullpath, fingerprint, results = _scanned(tmp_path)
+    with ScanCache(str(tmp_path / 'cache')) as cache:
+        cache.store(fullpath, fingerprint, [DETECTORS['sql']], results)
+        cached, _ = cache.lookup(fullpath, [DETECTORS['sql']])
+    assert [finding.as_dict() for finding in cached['sql']] == [finding.as_dict() for finding in results['sql']]
+    assert isinstance(cached['sql'][0]['args_span'], tuple)
+
+
+def test_planted_payload_is_not_unpickled(tmp_path):
+    fullpath, fingerprint, results = _scanned(tmp_path)
+    marker = tmp_path / 'pwned'
+    with ScanCache(str(tmp_path / 'cache')) as cache:
+        cache.store(fullpath, fingerprint, [DETECTORS['sql']], results)
+        cache._conn.execute('UPDATE findings SET payload = ?', (pickle.dumps([_Exploit(str(marker))]),))
+        assert cache.lookup(fullpath, [DETECTORS['sql']]) is None
+        cache._conn.execute('UPDATE findings SET payload = ?', (b'{"file": 1}',))
+        assert cache.lookup(fullpath, [DETECTORS['sql']]) is None
+    assert not marker.exists()
@@ -0,0 +1,14 @@
+from fixer_core import client
+
+
+def test_watch_never_goes_to_the_daemon(monkeypatch):
+    calls = []
+    monkeypatch.delenv('AUTOFIXER_NO_DAEMON', raising=False)
+    monkeypatch.setattr(client, 'run_remote', lambda *args: calls.append('remote') or 0)
+    monkeypatch.setattr(client, 'run_local', lambda *args: calls.append('local') or 0)
+    for argv in (['all', '.', '--watch'], ['all', '.']):
+        try:
+            client.run('autofixer', argv)
+        except SystemExit:
+            pass
+    assert calls == ['local', 'remote']
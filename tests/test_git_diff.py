@@ -0,0 +1,23 @@
+import subprocess
+
+from fixer_core.git_diff import changed_line_ranges
+
+
+def _git(repo, *args):
+    subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+def test_added_line_starting_with_plus_plus_is_not_a_header(tmp_path):
+    repo = str(tmp_path)
+    _git(repo, 'init', '-q')
+    path = tmp_path / 'app.py'
+    path.write_text(''.join(f'x{i} = {i}\n' for i in range(10)))
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'base')
+    lines = path.read_text().splitlines(keepends=True)
+    lines[1] = '++ counter\n'
+    lines[8] = 'cursor.execute("SELECT " + name)\n'
+    path.write_text(''.join(lines))
+
+    assert changed_line_ranges('HEAD', repo) == {str(path): [(2, 2), (9, 9)]}
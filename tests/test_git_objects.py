@@ -0,0 +1,35 @@
+import subprocess
+
+from fixer_core.git_objects import iter_revision_scan, resolve_revisions
+from fixer_core.stats import ScanStats
+
+SOURCE = 'def run(cursor, uid):\n    cursor.execute("SELECT " + uid)\n'
+
+
+def _git(repo, *args):
+    subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+def test_identical_blobs_are_reported_under_every_name(tmp_path):
+    repo = str(tmp_path)
+    _git(repo, 'init', '-q')
+    (tmp_path / 'a.py').write_text(SOURCE)
+    (tmp_path / 'b.py').write_text(SOURCE)
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', '1')
+    _git(repo, 'tag', 'v1')
+    (tmp_path / 'c.py').write_text('x = 1\n')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', '2')
+    _git(repo, 'tag', 'v2')
+
+    stats = ScanStats()
+    revisions = resolve_revisions(repo, ['v1', 'v2'])
+    found = [(name, [finding['file'] for finding in results['sql']])
+             for name, results in iter_revision_scan(repo, revisions, ('sql',), stats=stats)]
+    assert found == [
+        ('v1:a.py', ['v1:a.py']), ('v1:b.py', ['v1:b.py']),
+        ('v2:a.py', ['v2:a.py']), ('v2:b.py', ['v2:b.py']), ('v2:c.py', []),
+    ]
+    assert stats.parsed == 1
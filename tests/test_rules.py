@@ -0,0 +1,21 @@
+import ast
+
+from fixer_core.rules import Rule
+
+
+class _Order(Rule):
+    def __init__(self, filename, context=None):
+        super().__init__(filename, context)
+        self.events = []
+
+    def visit_For(self, node):
+        self.events.append('enter')
+
+    def visit_Name(self, node):
+        self.events.append(node.id)
+
+
+def test_loop_iterable_is_walked_before_enter_handlers():
+    rule = _Order('example.py')
+    rule.visit(ast.parse('for q in q.split():\n    body\n'))
+    assert rule.events == ['q', 'enter', 'q', 'body']
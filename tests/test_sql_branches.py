@@ -0,0 +1,188 @@
+import ast
+import textwrap
+
+from sql_injection_fixer_v2.test_sql_fixer import SQLInjectionVisitor
+
+
+def _findings(code):
+    visitor = SQLInjectionVisitor('example.py')
+    visitor.visit(ast.parse(textwrap.dedent(code)))
+    return visitor.vulnerabilities
+
+
+def test_every_branch_is_reported_and_not_fixed():
+    found = _findings('''
+        def run(cursor, a, x, y):
+            if a:
+                q = "SELECT * FROM t WHERE a = " + str(x)
+            else:
+                q = "SELECT * FROM t WHERE b = " + str(y)
+            cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['params'] == ('x', 'y')
+    assert found[0]['def_lines'] == (4, 6)
+    assert not found[0]['fixable']
+    assert found[0]['query'] is None
+
+
+def test_conditional_safe_rebind_keeps_taint():
+    found = _findings('''
+        def run(cursor, flag, name):
+            q = "SELECT * FROM t WHERE n = '" + name + "'"
+            if flag:
+                q = "SELECT 1"
+            cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['params'] == ('name',)
+    assert not found[0]['fixable']
+
+
+def test_assignment_dominating_the_sink_stays_fixable():
+    found = _findings('''
+        def run(cursor, a, name):
+            q = "SELECT * FROM t WHERE n = '" + name + "'"
+            if a:
+                cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['fixable']
+    assert found[0]['query'] == 'SELECT * FROM t WHERE n = %s'
+
+
+def test_sibling_branch_value_does_not_leak():
+    found = _findings('''
+        def run(cursor, a, name):
+            q = "SELECT 1"
+            if a:
+                q = "SELECT * FROM t WHERE n = " + name
+            else:
+                cursor.execute(q)
+    ''')
+    assert found == []
+
+
+def test_param_reassigned_before_execute_is_not_fixable():
+    found = _findings('''
+        def run(cursor, uid):
+            q = "SELECT * FROM t WHERE id = {}".format(uid)
+            uid = 5
+            cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert not found[0]['fixable']
+    assert found[0]['query'] is None
+
+
+def test_param_reassigned_later_in_loop_is_not_fixable():
+    found = _findings('''
+        def run(cursor, uid, rows):
+            q = "SELECT * FROM t WHERE id = " + str(uid)
+            for row in rows:
+                cursor.execute(q)
+                uid = row
+    ''')
+    assert len(found) == 1
+    assert not found[0]['fixable']
+
+
+def test_query_rebuilt_in_each_iteration_stays_fixable():
+    found = _findings('''
+        def run(cursor, rows):
+            for uid in rows:
+                q = "SELECT * FROM t WHERE id = " + str(uid)
+                cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['fixable']
+
+
+def test_query_built_in_another_scope_is_not_fixable():
+    found = _findings('''
+        uid = input()
+        q = "SELECT * FROM t WHERE id = " + uid
+
+        def run(cursor):
+            cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert not found[0]['fixable']
+
+
+def test_query_from_try_is_inexact_in_except():
+    found = _findings('''
+        def run(cursor, name):
+            try:
+                q = "SELECT * FROM t WHERE n = '" + name + "'"
+                prepare()
+            except ValueError:
+                cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert not found[0]['fixable']
+
+
+def test_query_rebound_in_except_is_merged_after_try():
+    found = _findings('''
+        def run(cursor, a, b):
+            try:
+                q = "SELECT * FROM t WHERE a = " + str(a)
+            except ValueError:
+                q = "SELECT * FROM t WHERE b = " + str(b)
+            cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['params'] == ('a', 'b')
+    assert not found[0]['fixable']
+
+
+def test_query_executed_inside_try_stays_fixable():
+    found = _findings('''
+        def run(cursor, name):
+            try:
+                q = "SELECT * FROM t WHERE n = '" + name + "'"
+                cursor.execute(q)
+            except ValueError:
+                pass
+            finally:
+                cursor.close()
+    ''')
+    assert len(found) == 1
+    assert found[0]['fixable']
+
+
+def test_else_continues_try_body():
+    found = _findings('''
+        def run(cursor, name):
+            try:
+                q = "SELECT * FROM t WHERE n = '" + name + "'"
+            except ValueError:
+                q = "SELECT 1"
+            else:
+                cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert found[0]['fixable']
+
+
+def test_walrus_target_is_bound_inexact():
+    found = _findings('''
+        def run(cursor, name):
+            q = "SELECT 1"
+            if (q := "SELECT * FROM t WHERE n = " + name):
+                cursor.execute(q)
+    ''')
+    assert len(found) == 1
+    assert not found[0]['fixable']
+
+
+def test_match_capture_rebinds_query():
+    found = _findings('''
+        def run(cursor, name, command):
+            q = "SELECT * FROM t WHERE n = '" + name + "'"
+            match command:
+                case {"query": q}:
+                    cursor.execute(q)
+    ''')
+    assert found == []
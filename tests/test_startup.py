@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from fixer_core.bench import STARTUP_BUDGET_MS, check_startup, generate_corpus, measure_startup
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Нужны только точкам входа (CLI, отчёты, spool, кэш) - модули детекторов грузят и воркеры
+ENTRY_POINT_ONLY = ('argparse', 'sqlite3', 'pickle', 'tempfile', 'pathlib', 'urllib.parse', 'tracemalloc',
+                    'fixer_core.cli', 'fixer_core.output', 'fixer_core.spool', 'libcst')
+
+
+def test_analysis_startup_within_budget(tmp_path):
+    corpus = str(tmp_path / 'corpus')
+    generate_corpus(corpus, files=5, blocks=10)
+    assert check_startup(measure_startup(corpus), STARTUP_BUDGET_MS) == []
+
+
+def test_detector_modules_do_not_import_entry_point_modules():
+    code = ('import sys, sql_injection_fixer_v2.test_sql_fixer, eval_fixer.eval_fixer; '
+            f'print(",".join(name for name in {ENTRY_POINT_ONLY!r} if name in sys.modules))')
+    proc = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ''